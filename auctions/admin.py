@@ -1,19 +1,43 @@
 from django.contrib import admin
-from .models import Auction, Watchlist, Bid, Comment
+from .models import Auction, BidRequest, CategoryStats, FacetCount, PriceRollup, ProxyBid, RelatedAuction, Watchlist, Bid, Comment
 
 class AuctionAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "description", "price", "category", "user", "created_at")
+    list_display = ("id", "title", "description", "price", "current_bid", "bid_count", "watcher_count", "bidder_count", "category", "user", "created_at", "ends_at", "is_close")
 
 
 class BidAdmin(admin.ModelAdmin):
-    list_display = ("id", "auction", "amount", "user")
+    list_display = ("id", "auction", "amount", "user", "created_at")
+
+class ProxyBidAdmin(admin.ModelAdmin):
+    list_display = ("id", "auction", "user", "max_amount", "created_at")
+
+class BidRequestAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "key", "auction_id", "amount", "max_amount", "created_at")
+
+class RelatedAuctionAdmin(admin.ModelAdmin):
+    list_display = ("id", "auction", "rank", "related", "score")
+
+class PriceRollupAdmin(admin.ModelAdmin):
+    list_display = ("id", "auction", "bucket", "low", "high", "bid_count")
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("id", "message", "user", "created_at")
 
+class CategoryStatsAdmin(admin.ModelAdmin):
+    list_display = ("category", "open_count", "total_count", "min_price", "max_price", "last_activity")
+
+class FacetCountAdmin(admin.ModelAdmin):
+    list_display = ("category", "price_band", "is_close", "has_image", "count")
+
 
 # Register your models here.
 admin.site.register(Auction, AuctionAdmin)
 admin.site.register(Watchlist)
 admin.site.register(Bid, BidAdmin)
-admin.site.register(Comment, CommentAdmin)
\ No newline at end of file
+admin.site.register(ProxyBid, ProxyBidAdmin)
+admin.site.register(BidRequest, BidRequestAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(CategoryStats, CategoryStatsAdmin)
+admin.site.register(FacetCount, FacetCountAdmin)
+admin.site.register(RelatedAuction, RelatedAuctionAdmin)
+admin.site.register(PriceRollup, PriceRollupAdmin)
\ No newline at end of file
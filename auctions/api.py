@@ -0,0 +1,169 @@
+"""
+Read-only JSON API for auctions (version 1).
+
+Every response carries an ETag hashed from the auction columns it is built
+from: the denormalized price, bid and watcher summaries, the image fields and
+the seller's profile timestamp. Clients that send it back in If-None-Match
+get 304 Not Modified before any serialisation happens, so polling an
+unchanged auction costs a single primary-key lookup and an unchanged list
+page a single keyset query.
+"""
+import hashlib
+
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .images import derivative_url
+from .models import Auction
+from .pagination import AFTER_PARAM, BEFORE_PARAM, paginate_auctions
+from .price_history import DEFAULT_POINTS, MAX_POINTS, MIN_POINTS, price_series
+
+
+API_VERSION = 1
+
+# Auctions per page of the list endpoint
+PAGE_SIZE = 20
+
+# Columns the detail output depends on; any change to them changes its ETag
+DETAIL_STATE_FIELDS = (
+    'id', 'title', 'description', 'category', 'price', 'current_bid', 'bid_count', 'bidder_count',
+    'watcher_count', 'is_close', 'ends_at', 'image', 'image_url', 'leader__username', 'user__username',
+    'user__profile__updated_at',
+)
+
+
+def _etag(states):
+    digest = hashlib.blake2b(repr((API_VERSION, states)).encode(), digest_size=16)
+    return digest.hexdigest()
+
+
+def _image(request, auction, sizes):
+    if not (auction.image or auction.image_url):
+        return None
+    return {
+        size: {fmt: request.build_absolute_uri(derivative_url(auction, size, fmt)) for fmt in ('webp', 'jpeg')}
+        for size in sizes
+    }
+
+
+def serialize_auction(request, auction, detail=False):
+    """JSON-serialisable summary of an auction (with description and seller ratings if detail)."""
+    data = {
+        'id': auction.id,
+        'title': auction.title,
+        'category': auction.category,
+        'starting_price': str(auction.price),
+        'current_bid': str(auction.current_bid),
+        'bid_count': auction.bid_count,
+        'bidder_count': auction.bidder_count,
+        'watcher_count': auction.watcher_count,
+        'leader': auction.leader.username if auction.leader else None,
+        'is_closed': auction.is_close,
+        'created_at': auction.created_at.isoformat(),
+        'ends_at': auction.ends_at.isoformat() if auction.ends_at else None,
+        'images': _image(request, auction, ('card', 'detail', 'zoom') if detail else ('card',)),
+        'seller': {'id': auction.user_id, 'username': auction.user.username},
+        'url': request.build_absolute_uri(reverse('api_auction_detail', args=(auction.id,))),
+    }
+    if detail:
+        data['description'] = auction.description
+        profile = getattr(auction.user, 'profile', None)
+        data['seller'].update({
+            'rating': str(profile.seller_rating_avg) if profile else None,
+            'ratings_count': profile.total_ratings_count if profile else 0,
+        })
+    return data
+
+
+def _list_queryset(request):
+    auctions = Auction.objects.filter(is_close=False).select_related('user', 'leader')
+    if request.GET.get('category'):
+        auctions = auctions.filter(category=request.GET['category'])
+    return auctions
+
+
+def _list_page(request):
+    # The page is needed for both the ETag and the body, so fetch it once
+    if not hasattr(request, '_auction_page'):
+        request._auction_page = paginate_auctions(request, _list_queryset(request), per_page=PAGE_SIZE, estimate_cap=None)
+    return request._auction_page
+
+
+def _list_etag(request):
+    return _etag([
+        (auction.id, auction.title, auction.category, auction.price, auction.current_bid, auction.bid_count,
+         auction.bidder_count, auction.watcher_count, auction.is_close, auction.ends_at, auction.image.name,
+         auction.image_url, auction.leader_id, auction.user.username)
+        for auction in _list_page(request)
+    ])
+
+
+def _detail_etag(request, auction_id):
+    state = Auction.objects.filter(id=auction_id).values_list(*DETAIL_STATE_FIELDS).first()
+    return _etag(state) if state else None
+
+
+def _price_history_etag(request, auction_id):
+    state = Auction.objects.filter(id=auction_id).values_list('bid_count', 'current_bid').first()
+    return _etag((auction_id, state, request.GET.get('points'))) if state else None
+
+
+def _page_link(request, param, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop(AFTER_PARAM, None)
+    query.pop(BEFORE_PARAM, None)
+    query[param] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=_list_etag)
+def auction_list(request):
+    """Open auctions, newest (or ?sort=popular) first, optionally filtered by ?category=."""
+    page = _list_page(request)
+    return JsonResponse({
+        'version': API_VERSION,
+        'results': [serialize_auction(request, auction) for auction in page],
+        'next': _page_link(request, AFTER_PARAM, page.next_cursor),
+        'previous': _page_link(request, BEFORE_PARAM, page.previous_cursor),
+    })
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=_detail_etag)
+def auction_detail(request, auction_id):
+    """One auction with its description, every image rendition and the seller's ratings."""
+    auction = Auction.objects.select_related('user__profile', 'leader').filter(id=auction_id).first()
+    if auction is None:
+        raise Http404("Auction not found.")
+    return JsonResponse({'version': API_VERSION, 'auction': serialize_auction(request, auction, detail=True)})
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=_price_history_etag)
+def auction_price_history(request, auction_id):
+    """Downsampled price history of an auction for charting (?points= sets the resolution)."""
+    try:
+        points = int(request.GET.get('points', DEFAULT_POINTS))
+    except ValueError:
+        return JsonResponse({'error': f"points must be an integer from {MIN_POINTS} to {MAX_POINTS}.",
+                             'success': False}, status=400)
+
+    auction = Auction.objects.filter(id=auction_id).only('id', 'bid_count').first()
+    if auction is None:
+        raise Http404("Auction not found.")
+
+    resolution, series = price_series(auction, points)
+    return JsonResponse({
+        'version': API_VERSION,
+        'auction_id': auction.id,
+        'resolution': resolution,
+        'points': [[at.isoformat(), str(amount)] for at, amount in series],
+    })
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AuctionsConfig(AppConfig):
     name = 'auctions'
     default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import auctions.signals
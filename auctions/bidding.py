@@ -0,0 +1,312 @@
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Auction, Bid, BidRequest, ProxyBid
+
+
+# Rejection reasons returned by place_bid()
+REJECT_NOT_FOUND = 'not_found'
+REJECT_CLOSED = 'closed'
+REJECT_INVALID_AMOUNT = 'invalid_amount'
+REJECT_TOO_LOW = 'too_low'
+REJECT_KEY_REUSED = 'idempotency_key_reused'
+
+# Most bids accepted by one place_bids() call
+MAX_BATCH_BIDS = 100
+
+# Step used when bidding automatically on behalf of a proxy bidder
+PROXY_INCREMENT = Decimal('1.00')
+
+# Largest amount the money columns (max_digits=6, decimal_places=2) can hold
+MAX_AMOUNT = Decimal('9999.99')
+
+
+@dataclass
+class BidResult:
+    """Outcome of a bid placement attempt."""
+    accepted: bool
+    message: str
+    bid: Optional[Bid] = None
+    reason: Optional[str] = None
+    current_amount: Decimal = Decimal('0')
+
+    def as_dict(self):
+        """JSON-serialisable form used by the bid API."""
+        return {
+            'accepted': self.accepted,
+            'message': self.message,
+            'reason': self.reason,
+            'bid_id': self.bid.id if self.bid else None,
+            'current_bid': str(self.current_amount),
+        }
+
+
+def to_amount(value):
+    """Convert a form value (float, str or Decimal) to a 2-place Decimal, or None if invalid or above MAX_AMOUNT."""
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return amount if amount.is_finite() and amount <= MAX_AMOUNT else None
+
+
+def clean_amounts(amount, max_amount=None):
+    """
+    Validate a bid and its optional maximum.
+
+    Returns (amount, max_amount, rejection): the amounts as Decimals (None if
+    invalid) and a BidResult rejection when the bid cannot be placed.
+    """
+    amount = to_amount(amount)
+    if amount is None or amount <= 0:
+        return amount, None, BidResult(False, "Please enter a valid bid amount.", reason=REJECT_INVALID_AMOUNT)
+    if max_amount is not None:
+        max_amount = to_amount(max_amount)
+        if max_amount is None or max_amount < amount:
+            return amount, max_amount, BidResult(
+                False, "Your maximum bid should be at least your bid.", reason=REJECT_INVALID_AMOUNT
+            )
+    return amount, max_amount, None
+
+
+def _apply_bid(auction_id, user_id, amount, now):
+    """
+    Record a bid if it beats the current bid, returning the Bid or None.
+
+    Conditional UPDATE: only succeeds while the auction is open and the
+    offer beats the stored current bid, so the check and the write are
+    a single statement and cannot interleave with another bidder.
+    Auctions past ends_at refuse bids even before the closer runs.
+    """
+    updated = Auction.objects.filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        pk=auction_id,
+        is_close=False,
+        current_bid__lt=amount
+    ).update(
+        current_bid=amount,
+        bid_count=F('bid_count') + 1,
+        leader_id=user_id
+    )
+    if not updated:
+        return None
+    return Bid.objects.create(amount=amount, auction_id=auction_id, user_id=user_id, created_at=now)
+
+
+def _rejection(auction, amount, max_amount, now):
+    """Return why a bid cannot win against an auction snapshot dict (None if missing), or None if it may."""
+    if auction is None:
+        return BidResult(False, "Auction not found.", reason=REJECT_NOT_FOUND)
+    if auction['is_close'] or (auction['ends_at'] and auction['ends_at'] <= now):
+        return BidResult(False, "This auction has already been closed.",
+                         reason=REJECT_CLOSED, current_amount=auction['current_bid'])
+    if amount <= auction['current_bid'] and (not max_amount or max_amount <= auction['current_bid']):
+        return BidResult(False, "Your bid should be greater than the current bid.",
+                         reason=REJECT_TOO_LOW, current_amount=auction['current_bid'])
+    return None
+
+
+def resolve_proxy_bids(auction_id, now=None):
+    """
+    Settle competing proxy bids on an auction in one step.
+
+    The proxy with the highest maximum (earliest wins ties) ends up leading
+    at one PROXY_INCREMENT above the strongest rival, capped at its maximum.
+    The runner-up's proxy is recorded as a bid at its own maximum, so the
+    whole bidding war costs at most two bids instead of one per increment.
+    Must be called inside the transaction that placed the triggering bid.
+
+    Returns:
+        The list of bids placed on behalf of proxy bidders
+    """
+    now = now or timezone.now()
+    auction = Auction.objects.filter(pk=auction_id).values('current_bid', 'leader_id').first()
+    if auction is None:
+        return []
+    price, leader_id = auction['current_bid'], auction['leader_id']
+
+    proxies = list(
+        ProxyBid.objects.filter(auction_id=auction_id, max_amount__gt=price)
+        .order_by('-max_amount', 'created_at', 'id')[:2]
+    )
+    if not proxies:
+        return []
+
+    top, runner = proxies[0], proxies[1] if len(proxies) > 1 else None
+    rivals = [runner.max_amount] if runner else []
+    if top.user_id != leader_id:
+        rivals.append(price)
+    if not rivals:
+        # The top proxy already leads and nobody is challenging it
+        return []
+
+    target = min(top.max_amount, max(rivals) + PROXY_INCREMENT)
+    placed = []
+    if runner and runner.max_amount < target:
+        placed.append(_apply_bid(auction_id, runner.user_id, runner.max_amount, now))
+    placed.append(_apply_bid(auction_id, top.user_id, target, now))
+    return [bid for bid in placed if bid]
+
+
+def place_bid(auction_id, user, amount, max_amount=None):
+    """
+    Validate and commit a bid in a single transaction.
+
+    The price check is a conditional UPDATE on the auction's denormalized
+    current_bid, so two concurrent bidders can never both be accepted against
+    the same current price, and the bid row is only inserted when it wins.
+    Any proxy bids the new bid triggers are settled in the same transaction.
+
+    Args:
+        auction_id: Primary key of the auction being bid on
+        user: The bidder
+        amount: The offered amount
+        max_amount: Optional maximum to keep bidding up to automatically
+
+    Returns:
+        A BidResult describing whether the bid was accepted
+    """
+    amount, max_amount, rejection = clean_amounts(amount, max_amount)
+    if rejection:
+        return rejection
+
+    with transaction.atomic():
+        now = timezone.now()
+        bid = _apply_bid(auction_id, user.id, amount, now)
+
+        if not bid:
+            auction = Auction.objects.filter(pk=auction_id).values('is_close', 'ends_at', 'current_bid').first()
+            rejection = _rejection(auction, amount, max_amount, now)
+            if rejection:
+                return rejection
+
+        if max_amount:
+            ProxyBid.objects.update_or_create(
+                auction_id=auction_id,
+                user=user,
+                defaults={'max_amount': max_amount, 'created_at': now}
+            )
+
+        proxy_bids = resolve_proxy_bids(auction_id, now)
+        auction = Auction.objects.filter(pk=auction_id).values('current_bid', 'leader_id').get()
+
+    # Report the user's last bid, whether typed in or placed by their proxy
+    own_bids = ([bid] if bid else []) + [b for b in proxy_bids if b.user_id == user.id]
+    bid = own_bids[-1] if own_bids else None
+
+    if auction['leader_id'] != user.id:
+        return BidResult(True, "Your bid was placed, but another bidder's automatic bid is higher.",
+                         bid=bid, current_amount=auction['current_bid'])
+    if max_amount:
+        return BidResult(True, f"You are the highest bidder. We will bid for you up to {max_amount}.",
+                         bid=bid, current_amount=auction['current_bid'])
+    return BidResult(True, "Your bid now is the current bid.", bid=bid, current_amount=auction['current_bid'])
+
+
+def _replay(request, auction_id, amount, max_amount):
+    """Return the stored outcome of an idempotent bid, unless the key was reused for another bid."""
+    if (request.auction_id, request.amount, request.max_amount) != (auction_id, amount, max_amount):
+        return dict(
+            BidResult(False, "This idempotency key was already used for a different bid.",
+                      reason=REJECT_KEY_REUSED).as_dict(),
+            replayed=False
+        )
+    return dict(request.result, replayed=True)
+
+
+def place_bids(user, items):
+    """
+    Place a batch of bids across auctions, e.g. for the JSON bid API.
+
+    Every auction in the batch is read once up front and bids that cannot win
+    against those prices (missing or closed auctions, amounts not above the
+    current bid) are rejected without a write transaction. The rest go
+    through place_bid() one by one, in order, so it stays the authority.
+
+    A bid with an idempotency_key is recorded with its outcome in the same
+    transaction as the bid itself; submitting the key again returns the
+    recorded outcome instead of bidding twice, even when the retry races the
+    original request.
+
+    Args:
+        user: The bidder
+        items: Dicts with auction_id, amount and optionally max_amount and
+            idempotency_key (at most MAX_BATCH_BIDS)
+
+    Returns:
+        One result dict per item, in order
+    """
+    keys = {item['idempotency_key'] for item in items if item.get('idempotency_key')}
+    recorded = {request.key: request for request in BidRequest.objects.filter(user=user, key__in=keys)}
+    snapshot = {
+        auction['id']: auction
+        for auction in Auction.objects.filter(
+            id__in={item['auction_id'] for item in items}
+        ).values('id', 'is_close', 'ends_at', 'current_bid')
+    }
+    now = timezone.now()
+
+    results = []
+    for item in items:
+        auction_id, key = item['auction_id'], item.get('idempotency_key')
+        # Invalid amounts (including ones too large to store) never reach the transaction
+        amount, max_amount, invalid = clean_amounts(item.get('amount'), item.get('max_amount'))
+
+        if key in recorded:
+            outcome = _replay(recorded[key], auction_id, amount, max_amount)
+        else:
+            try:
+                with transaction.atomic():
+                    request = BidRequest.objects.create(
+                        user=user, key=key, auction_id=auction_id, amount=amount, max_amount=max_amount
+                    ) if key else None
+
+                    rejection = invalid or _rejection(snapshot.get(auction_id), amount, max_amount, now)
+                    result = rejection or place_bid(auction_id, user, amount, max_amount=max_amount)
+                    outcome = dict(result.as_dict(), replayed=False)
+
+                    if request:
+                        request.result = result.as_dict()
+                        request.save(update_fields=['result'])
+                        recorded[key] = request
+            except IntegrityError:
+                # Another request with this key committed first
+                request = BidRequest.objects.get(user=user, key=key)
+                recorded[key] = request
+                outcome = _replay(request, auction_id, amount, max_amount)
+
+        results.append(dict(outcome, auction_id=auction_id, idempotency_key=key))
+    return results
+
+
+def refresh_bid_summary(auctions=None):
+    """
+    Recompute current_bid, bid_count and leader from the Bid table.
+
+    Runs as a single UPDATE with correlated subqueries, so it is safe to use as
+    a backfill after importing bids directly or as a periodic repair job.
+
+    Args:
+        auctions: Optional Auction queryset to limit the refresh to
+
+    Returns:
+        The number of auctions updated
+    """
+    if auctions is None:
+        auctions = Auction.objects.all()
+
+    bids = Bid.objects.filter(auction=OuterRef('pk'))
+    top_bids = bids.order_by('-amount', 'id')
+    bid_counts = bids.order_by().values('auction').annotate(total=Count('id')).values('total')
+
+    return auctions.update(
+        current_bid=Coalesce(Subquery(top_bids.values('amount')[:1]), Value(Decimal('0'))),
+        bid_count=Coalesce(Subquery(bid_counts), Value(0)),
+        leader=Subquery(top_bids.values('user')[:1])
+    )
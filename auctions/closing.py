@@ -0,0 +1,111 @@
+"""
+Closing auctions in bulk.
+
+close_auctions() is the single path for ending auctions outside the admin:
+the owner's close button and the `close_expired_auctions` scheduler both use
+it. Each batch is one UPDATE, one notification insert and one stats update
+per category (and per facet combination) instead of a save() (and its
+signals) per auction.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from notifications.utils import create_auction_ended_notifications
+
+from .events import auction_state, publish_auction_event
+from .facets import facet_state, record_facet_changes
+from .models import Auction
+from .page_cache import invalidate_pages
+from .stats import record_auctions_closed
+
+
+# Auctions closed per transaction by close_expired_auctions()
+BATCH_SIZE = 500
+
+
+def close_auctions(auctions, now=None):
+    """
+    Close open auctions, notify owners and winners and publish close events.
+
+    The winner of each auction is its denormalized leader at the moment of
+    closing. On databases with row locks, auctions already locked by another
+    closer are skipped and left for it.
+
+    Args:
+        auctions: Auction queryset to close (already closed rows are ignored)
+        now: Closing time, recorded as ends_at unless the auction ended earlier
+
+    Returns:
+        The list of auctions that were closed
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        closing = list(
+            auctions.filter(is_close=False)
+            .select_related('leader')
+            .select_for_update(skip_locked=True, of=('self',))
+        )
+        if not closing:
+            return []
+
+        ids = [auction.id for auction in closing]
+        Auction.objects.filter(id__in=ids).update(
+            is_close=True,
+            ends_at=Case(When(ends_at__lte=now, then=F('ends_at')), default=Value(now))
+        )
+        facet_changes = []
+        for auction in closing:
+            old_values = auction._facet_values
+            auction.is_close = True
+            if auction.ends_at is None or auction.ends_at > now:
+                auction.ends_at = now
+            auction.remember_stats_state()
+            facet_changes.append((facet_state(old_values), facet_state(auction._facet_values)))
+
+        record_auctions_closed([auction.category for auction in closing])
+        record_facet_changes(facet_changes)
+        invalidate_pages({auction.category for auction in closing})
+        create_auction_ended_notifications(closing)
+
+        states = [(auction.id, auction_state(auction)) for auction in closing]
+        transaction.on_commit(lambda: [publish_auction_event(auction_id, 'close', state) for auction_id, state in states])
+
+    return closing
+
+
+def close_expired_auctions(now=None, batch_size=BATCH_SIZE):
+    """
+    Close every open auction whose ends_at has passed, oldest first.
+
+    Expired auctions are found through the partial (ends_at, id) index on
+    open auctions and closed batch_size at a time, so each transaction stays
+    short while thousands of auctions ending together are still drained in
+    a single run. Returns the number of auctions closed.
+    """
+    now = now or timezone.now()
+    expired = Auction.objects.filter(is_close=False, ends_at__lte=now).order_by('ends_at', 'id')
+
+    total = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        closed = close_auctions(Auction.objects.filter(id__in=ids), now=now)
+        total += len(closed)
+        if len(closed) < batch_size:
+            return total
+
+
+def next_expiry(now=None, horizon=timedelta(minutes=1)):
+    """Return seconds until the next open auction expires, capped at horizon."""
+    now = now or timezone.now()
+    ends_at = Auction.objects.filter(
+        is_close=False, ends_at__gt=now
+    ).order_by('ends_at').values_list('ends_at', flat=True).first()
+    if ends_at is None:
+        return horizon.total_seconds()
+    return min(ends_at - now, horizon).total_seconds()
@@ -0,0 +1,49 @@
+"""
+Paginated, cached comment threads.
+
+Auction pages render only the newest COMMENTS_PER_PAGE comments; older ones
+are fetched a page at a time from the auction_comments endpoint using a
+keyset cursor over the (auction, created_at, id) index. Rendered pages are
+cached under the auction's denormalized comment_count, so a new or deleted
+comment moves every page of that thread to fresh keys.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .loaders import auction_comments, profile_loader
+from .pagination import CursorPaginator
+
+
+# Comments rendered inline and per "load more" request
+COMMENTS_PER_PAGE = 20
+
+
+def _cache_key(auction, after):
+    cursor = hashlib.md5((after or '').encode()).hexdigest()
+    return f'comments:{auction.id}:{auction.comment_count}:{cursor}'
+
+
+def comment_page(request, auction, after=None):
+    """
+    Render one page of an auction's comments, newest first.
+
+    after is the cursor returned with the previous page (None for the first).
+    Returns (html, next_cursor), next_cursor being None on the last page.
+    """
+    key = _cache_key(auction, after)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    page = CursorPaginator(
+        auction_comments(auction.id), COMMENTS_PER_PAGE, estimate_cap=None
+    ).page(after=after)
+    profile_loader(request).prime([comment.user for comment in page])
+
+    html = render_to_string('auctions/partials/comments.html', {'comments': page, 'auction': auction})
+    result = (html, page.next_cursor)
+    cache.set(key, result, settings.COMMENT_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,67 @@
+"""
+Denormalized watcher, bidder and comment counters on Auction.
+
+Counters move with single-row F() updates from the watchlist m2m_changed,
+Bid post_save and Comment post_save/post_delete signals. A bid already holds
+its auction's row lock for the current_bid update, so bumping bidder_count
+in the same transaction adds no new contention. reconcile_counters()
+recomputes all three from their source tables.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Auction, Bid, Comment, Watchlist
+
+
+WatchedAuction = Watchlist.auctions.through
+
+
+def adjust_watchers(auction_ids, delta):
+    """Add delta watchers to each of the given auctions."""
+    if auction_ids and delta:
+        Auction.objects.filter(id__in=auction_ids).update(watcher_count=Greatest(F('watcher_count') + delta, 0))
+
+
+def record_bidder(bid):
+    """Count the bidder of a new bid if it is their first bid on the auction (owners are not counted)."""
+    first_bid = not Bid.objects.filter(
+        auction_id=bid.auction_id, user_id=bid.user_id
+    ).exclude(pk=bid.pk).exists()
+    if first_bid:
+        Auction.objects.filter(pk=bid.auction_id).exclude(user_id=bid.user_id).update(
+            bidder_count=F('bidder_count') + 1
+        )
+
+
+def adjust_comments(auction_id, delta):
+    """Add delta comments to an auction's comment count."""
+    if auction_id and delta:
+        Auction.objects.filter(pk=auction_id).update(comment_count=Greatest(F('comment_count') + delta, 0))
+
+
+def reconcile_counters(auctions=None):
+    """
+    Recompute watcher_count, bidder_count and comment_count from their source tables.
+
+    Returns the number of auctions updated, optionally limited to an Auction queryset.
+    """
+    if auctions is None:
+        auctions = Auction.objects.all()
+
+    watchers = WatchedAuction.objects.filter(
+        auction=OuterRef('pk')
+    ).order_by().values('auction').annotate(total=Count('id')).values('total')
+    bidders = Bid.objects.filter(
+        auction=OuterRef('pk')
+    ).exclude(user=OuterRef('user')).order_by().values('auction').annotate(
+        total=Count('user', distinct=True)
+    ).values('total')
+    comments = Comment.objects.filter(
+        auction=OuterRef('pk')
+    ).order_by().values('auction').annotate(total=Count('id')).values('total')
+
+    return auctions.update(
+        watcher_count=Coalesce(Subquery(watchers), Value(0)),
+        bidder_count=Coalesce(Subquery(bidders), Value(0)),
+        comment_count=Coalesce(Subquery(comments), Value(0))
+    )
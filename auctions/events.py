@@ -0,0 +1,219 @@
+"""
+Live auction events (new bids, price changes, closes) for Server-Sent Events.
+
+Publishers call publish_auction_event() from synchronous code; subscribers are
+async SSE views that read from an asyncio.Queue. The broker is selected by the
+AUCTION_EVENT_BROKER setting:
+
+    auctions.events.InProcessBroker   single process (default)
+    auctions.events.DatabaseBroker    several workers sharing one database
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+
+# Milliseconds the browser waits before reconnecting a dropped stream
+RECONNECT_DELAY = 3000
+
+
+class InProcessBroker:
+    """Fan out auction events to subscribers living in this process."""
+
+    # Events are full state snapshots, so a slow consumer can safely drop old ones
+    queue_size = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, auction_id):
+        """Register the running event loop for events on auction_id and return its queue."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(auction_id, set()).add(subscriber)
+        return queue
+
+    def unsubscribe(self, auction_id, queue):
+        """Remove a queue returned by subscribe()."""
+        with self._lock:
+            subscribers = self._subscribers.get(auction_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(auction_id, None)
+
+    def subscribed_auctions(self):
+        """Return the ids of auctions with at least one subscriber."""
+        with self._lock:
+            return list(self._subscribers)
+
+    def has_listeners(self, auction_id):
+        """Return whether an event on auction_id could reach any subscriber."""
+        with self._lock:
+            return auction_id in self._subscribers
+
+    def publish(self, auction_id, event_type, data):
+        """Deliver an event to every subscriber of auction_id. Safe to call from any thread."""
+        self.dispatch(auction_id, {'type': event_type, 'data': data})
+
+    def dispatch(self, auction_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(auction_id, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                self.unsubscribe(auction_id, queue)
+
+    @staticmethod
+    def _offer(queue, event):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Broker stand-in for multi-worker deployments without a message server.
+
+    Events are written to the AuctionEvent table and a daemon thread in each
+    worker polls for rows on auctions that have local subscribers, then fans
+    them out in-process.
+    """
+
+    poll_interval = 0.5
+    retention = timedelta(minutes=10)
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+        self._last_id = None
+
+    def has_listeners(self, auction_id):
+        # Subscribers may live in any worker
+        return True
+
+    def publish(self, auction_id, event_type, data):
+        from .models import AuctionEvent
+
+        AuctionEvent.objects.create(auction_id=auction_id, event_type=event_type, data=data)
+
+    def subscribe(self, auction_id):
+        queue = super().subscribe(auction_id)
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll, name='auction-events', daemon=True)
+                self._poller.start()
+        return queue
+
+    def _poll(self):
+        from .models import AuctionEvent
+
+        last_prune = 0
+        while True:
+            try:
+                close_old_connections()
+                if self._last_id is None:
+                    latest = AuctionEvent.objects.order_by('-id').values_list('id', flat=True).first()
+                    self._last_id = latest or 0
+
+                auction_ids = self.subscribed_auctions()
+                if auction_ids:
+                    events = AuctionEvent.objects.filter(
+                        id__gt=self._last_id,
+                        auction_id__in=auction_ids
+                    ).order_by('id')
+                    for event in events:
+                        self._last_id = event.id
+                        self.dispatch(event.auction_id, {'type': event.event_type, 'data': event.data})
+
+                if time.monotonic() - last_prune > 60:
+                    AuctionEvent.objects.filter(created_at__lt=timezone.now() - self.retention).delete()
+                    last_prune = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error polling auction events: {e}")
+
+            time.sleep(self.poll_interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by AUCTION_EVENT_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.AUCTION_EVENT_BROKER)()
+    return _broker
+
+
+def auction_state(auction):
+    """Serialize the live fields of an auction for an event payload."""
+    return {
+        'auction_id': auction.id,
+        'current_bid': str(auction.current_bid),
+        'bid_count': auction.bid_count,
+        'leader': auction.leader.username if auction.leader_id else None,
+        'is_close': auction.is_close,
+    }
+
+
+def publish_auction_event(auction_id, event_type, data):
+    """Publish an event, logging instead of raising so callers never fail on delivery."""
+    try:
+        get_broker().publish(auction_id, event_type, data)
+    except Exception as e:
+        logger.error(f"Error publishing {event_type} event for auction {auction_id}: {e}")
+
+
+def format_sse(event_type, data, retry=None):
+    """Encode one Server-Sent Events frame."""
+    frame = f"retry: {retry}\n" if retry else ""
+    return f"{frame}event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_auction_events(auction_id, state, live=True):
+    """
+    Yield SSE frames for an auction: a 'price' snapshot, then live events.
+
+    When the server is not running under ASGI (live=False) only the snapshot is
+    sent and the browser's reconnect delay turns the stream into cheap polling.
+    """
+    if not live or state['is_close']:
+        yield format_sse('price', state, retry=RECONNECT_DELAY if live else RECONNECT_DELAY * 2)
+        return
+
+    broker = get_broker()
+    queue = broker.subscribe(auction_id)
+    try:
+        yield format_sse('price', state, retry=RECONNECT_DELAY)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            yield format_sse(event['type'], event['data'])
+            if event['type'] == 'close':
+                return
+    finally:
+        broker.unsubscribe(auction_id, queue)
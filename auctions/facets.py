@@ -0,0 +1,250 @@
+"""
+Faceted browsing of auctions by category, price band, status and image.
+
+FacetCount holds how many auctions share each combination of facet values
+(categories x price bands x 2 x 2 rows, all of them present so a change is
+a single UPDATE), kept up to date from Auction signals and bulk closing like
+CategoryStats. facet_counts() reads that table in a single query and derives
+every facet's counts from it, so the cost of the facet sidebar does not
+depend on the size of the catalog. Each facet is counted with the
+selections of the other facets applied but not its own, so its other
+values show what selecting them would add.
+
+Price bands are over the listed (starting) price, which bids do not change.
+Anything that bypasses the ORM signals (bulk inserts or updates, raw SQL)
+should be followed by `manage.py rebuild_facets`.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import BooleanField, Case, CharField, Count, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import CATEGORY_CHOICES, Auction, FacetCount
+
+
+# Query string parameters of the facets, each may be repeated to select several values
+CATEGORY_PARAM = 'category'
+PRICE_PARAM = 'price'
+STATUS_PARAM = 'status'
+IMAGE_PARAM = 'image'
+FACET_PARAMS = (CATEGORY_PARAM, PRICE_PARAM, STATUS_PARAM, IMAGE_PARAM)
+
+# (value, label, lower bound inclusive, upper bound exclusive) of each price band
+PRICE_BANDS = [
+    ('under-100', 'Under EGP100', None, Decimal('100')),
+    ('100-500', 'EGP100 - 500', Decimal('100'), Decimal('500')),
+    ('500-1000', 'EGP500 - 1,000', Decimal('500'), Decimal('1000')),
+    ('1000-2500', 'EGP1,000 - 2,500', Decimal('1000'), Decimal('2500')),
+    ('2500-plus', 'EGP2,500 and up', Decimal('2500'), None),
+]
+
+STATUS_CHOICES = [('open', 'Open'), ('closed', 'Closed')]
+IMAGE_CHOICES = [('yes', 'With photo'), ('no', 'Without photo')]
+
+# Sidebar heading of each facet
+FACET_TITLES = {
+    CATEGORY_PARAM: 'Category',
+    PRICE_PARAM: 'Price',
+    STATUS_PARAM: 'Status',
+    IMAGE_PARAM: 'Photo',
+}
+
+FACET_CHOICES = {
+    CATEGORY_PARAM: CATEGORY_CHOICES,
+    PRICE_PARAM: [(value, label) for value, label, _, _ in PRICE_BANDS],
+    STATUS_PARAM: STATUS_CHOICES,
+    IMAGE_PARAM: IMAGE_CHOICES,
+}
+
+# Auction fields the facet values are derived from
+FACET_FIELDS = frozenset({'category', 'price', 'is_close', 'image', 'image_url'})
+
+# Auctions with an uploaded image or an external image URL
+HAS_IMAGE = (Q(image__isnull=False) & ~Q(image='')) | (Q(image_url__isnull=False) & ~Q(image_url=''))
+
+
+def _band_filter(low, high):
+    band = Q()
+    if low is not None:
+        band &= Q(price__gte=low)
+    if high is not None:
+        band &= Q(price__lt=high)
+    return band
+
+
+def price_band(price):
+    """Return the value of the price band a price falls into."""
+    for value, _, low, high in PRICE_BANDS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return value
+    return PRICE_BANDS[-1][0]
+
+
+def facet_state(values):
+    """Return the (category, price band, is_close, has_image) of Auction.facet_values(), or None."""
+    if values is None:
+        return None
+    category, price, is_close, has_image = values
+    return (category, price_band(price), is_close, has_image)
+
+
+def _adjust(state, delta):
+    category, band, is_close, has_image = state
+    rows = FacetCount.objects.filter(category=category, price_band=band, is_close=is_close, has_image=has_image)
+    if not rows.update(count=Greatest(F('count') + delta, 0)):
+        _, created = FacetCount.objects.get_or_create(
+            category=category, price_band=band, is_close=is_close, has_image=has_image,
+            defaults={'count': max(delta, 0)}
+        )
+        if not created:
+            rows.update(count=Greatest(F('count') + delta, 0))
+
+
+def record_facet_changes(changes):
+    """
+    Move auctions between facet states.
+
+    changes are (old_state, new_state) pairs from facet_state(); old_state is
+    None for created auctions and new_state None for deleted ones.
+    """
+    deltas = Counter()
+    for old_state, new_state in changes:
+        if old_state == new_state:
+            continue
+        if old_state:
+            deltas[old_state] -= 1
+        if new_state:
+            deltas[new_state] += 1
+
+    for state, delta in deltas.items():
+        if delta:
+            _adjust(state, delta)
+
+
+def _with_every_combination(counts):
+    combinations = {
+        (category, band, is_close, has_image): 0
+        for category, _ in CATEGORY_CHOICES
+        for band, _, _, _ in PRICE_BANDS
+        for is_close in (False, True)
+        for has_image in (False, True)
+    }
+    combinations.update(counts)
+    return combinations
+
+
+def rebuild_facets():
+    """Recompute the facet counts in one grouped query, returning the number of combinations written."""
+    counts = Counter()
+    rows = Auction.objects.annotate(
+        band=Case(
+            *[When(_band_filter(low, high), then=Value(value)) for value, _, low, high in PRICE_BANDS],
+            output_field=CharField()
+        ),
+        has_image=ExpressionWrapper(HAS_IMAGE, output_field=BooleanField()),
+    ).values('category', 'band', 'is_close', 'has_image').annotate(total=Count('id')).order_by()
+
+    for row in rows:
+        counts[(row['category'], row['band'], row['is_close'], row['has_image'])] = row['total']
+
+    facets = [
+        FacetCount(category=category, price_band=band, is_close=is_close, has_image=has_image, count=count)
+        for (category, band, is_close, has_image), count in _with_every_combination(counts).items()
+    ]
+    FacetCount.objects.all().delete()
+    FacetCount.objects.bulk_create(facets, batch_size=1000)
+    return len(facets)
+
+
+def parse_facets(params):
+    """
+    Return {facet param: set of selected values} from a query string.
+
+    Unknown values are ignored instead of returning nothing, and unfiltered
+    facets are left out.
+    """
+    selected = {}
+    for param in FACET_PARAMS:
+        known = dict(FACET_CHOICES[param])
+        values = {value for value in params.getlist(param) if value in known}
+        # Selecting every value of a facet is the same as selecting none
+        if values and len(values) < len(known):
+            selected[param] = values
+    return selected
+
+
+def facet_filter(selected):
+    """Return the Q object matching auctions with every selected facet."""
+    query = Q()
+    if CATEGORY_PARAM in selected:
+        query &= Q(category__in=selected[CATEGORY_PARAM])
+    if PRICE_PARAM in selected:
+        bands = Q()
+        for value, _, low, high in PRICE_BANDS:
+            if value in selected[PRICE_PARAM]:
+                bands |= _band_filter(low, high)
+        query &= bands
+    if STATUS_PARAM in selected:
+        query &= Q(is_close='closed' in selected[STATUS_PARAM])
+    if IMAGE_PARAM in selected:
+        query &= HAS_IMAGE if 'yes' in selected[IMAGE_PARAM] else ~HAS_IMAGE
+    return query
+
+
+def facet_querysets(selected):
+    """
+    Return the auctions matching a selection as a list of disjoint querysets.
+
+    Several selected categories give one queryset per category, to be merged
+    by MergedCursorPaginator, so each is read in order from the (category,
+    key, id) indexes; otherwise the list holds a single queryset.
+    """
+    categories = sorted(selected.get(CATEGORY_PARAM, ()))
+    if len(categories) < 2:
+        return [Auction.objects.filter(facet_filter(selected))]
+    others = {param: values for param, values in selected.items() if param != CATEGORY_PARAM}
+    auctions = Auction.objects.filter(facet_filter(others))
+    return [auctions.filter(category=category) for category in categories]
+
+
+def facet_counts(selected):
+    """
+    Count the auctions of every facet value under the current selection.
+
+    Args:
+        selected: Output of parse_facets()
+
+    Returns:
+        (facets, total) where facets is a list of (param, title, options),
+        options being (value, label, count, is_selected) for every value of
+        the facet, and total is the number of auctions matching the whole
+        selection
+    """
+    counts = {param: Counter() for param in FACET_PARAMS}
+    total = 0
+    for category, band, is_close, has_image, count in FacetCount.objects.filter(count__gt=0).values_list(
+        'category', 'price_band', 'is_close', 'has_image', 'count'
+    ):
+        values = {
+            CATEGORY_PARAM: category,
+            PRICE_PARAM: band,
+            STATUS_PARAM: 'closed' if is_close else 'open',
+            IMAGE_PARAM: 'yes' if has_image else 'no',
+        }
+        misses = [param for param, value in values.items() if param in selected and value not in selected[param]]
+        if not misses:
+            total += count
+        # A row only counts towards a facet if it matches the other facets' selections
+        for param in FACET_PARAMS:
+            if not misses or misses == [param]:
+                counts[param][values[param]] += count
+
+    facets = [
+        (param, FACET_TITLES[param], [
+            (value, label, counts[param][value], value in selected.get(param, ()))
+            for value, label in FACET_CHOICES[param]
+        ])
+        for param in FACET_PARAMS
+    ]
+    return facets, total
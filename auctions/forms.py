@@ -1,6 +1,17 @@
 from django import forms
+from .bidding import MAX_AMOUNT
 from .models import CATEGORY_CHOICES
 
+
+# Auction lengths offered when listing an item, in days
+DURATION_CHOICES = [
+    ('', 'No end date (close manually)'),
+    ('1', '1 day'),
+    ('3', '3 days'),
+    ('7', '7 days'),
+    ('14', '14 days'),
+]
+
 class AuctionForm(forms.Form):
     image = forms.ImageField(
         label="Upload Image",
@@ -56,6 +67,16 @@ class AuctionForm(forms.Form):
             'required': True
         })
     )
+    duration = forms.TypedChoiceField(
+        label="Duration",
+        choices=DURATION_CHOICES,
+        coerce=int,
+        empty_value=None,
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'w-full px-3 py-2 pl-10 border border-gray-300 rounded text-gray-700 focus:outline-none focus:ring-1 focus:ring-primary-500 focus:border-primary-500 transition-all duration-300'
+        })
+    )
     amount = forms.FloatField(
         label="Starting Bid",
         widget=forms.NumberInput(attrs={
@@ -71,6 +92,7 @@ class AuctionForm(forms.Form):
 class BidForm(forms.Form):
     bid = forms.FloatField(
         label="",
+        max_value=float(MAX_AMOUNT),
         widget=forms.NumberInput(attrs={
             'class': 'w-full px-3 py-2 pl-10 border border-gray-300 rounded text-gray-700 focus:outline-none focus:ring-1 focus:ring-primary-500 focus:border-primary-500 transition-all duration-300',
             'placeholder': 'Enter your bid amount',
@@ -80,6 +102,18 @@ class BidForm(forms.Form):
             'autocomplete': 'off'
         })
     )
+    max_bid = forms.FloatField(
+        label="",
+        max_value=float(MAX_AMOUNT),
+        required=False,
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full px-3 py-2 pl-10 border border-gray-300 rounded text-gray-700 focus:outline-none focus:ring-1 focus:ring-primary-500 focus:border-primary-500 transition-all duration-300',
+            'placeholder': 'Bid automatically up to (optional)',
+            'min': '0.01',
+            'step': '0.01',
+            'autocomplete': 'off'
+        })
+    )
 
 
 class CommentForm(forms.Form):
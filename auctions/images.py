@@ -0,0 +1,370 @@
+"""
+Resized JPEG and WebP derivatives of auction images.
+
+Each upload gets card, detail and zoom renditions stored next to it under
+"derivatives/". They are generated right after the auction is saved and,
+for older uploads, lazily by the auction_image view the first time a page
+asks for them. Templates use the auction_images tags to build srcset lists.
+Once every rendition of an auction's image exists its name is recorded in
+Auction.image_renditions, and the tags link the media store directly
+without checking storage; until then they link the auction_image view.
+
+The media store serves the renditions itself, so the web server must send
+"Cache-Control: public, max-age=IMAGE_CACHE_MAX_AGE" for them, as
+auctions.views.serve_media does in development. Rendition names never
+change for an upload, and a new upload gets a new name.
+
+Auctions that only have an external image_url are proxied: the remote image
+is downloaded once, validated, shrunk to the zoom size and stored under
+"remote_images/", then goes through the same rendition pipeline, so browsers
+stop hotlinking the third-party origin. Downloads never run in a request:
+saving an auction and the first request for a missing copy queue the URL
+for a background thread, and the auction_image view redirects to the
+original URL until the copy exists. Each connection goes to the address
+that was checked to be public, so DNS cannot be rebound in between.
+"""
+import hashlib
+import http.client
+import ipaddress
+import logging
+import os
+import queue
+import socket
+import threading
+import urllib.request
+from io import BytesIO
+from urllib.error import URLError
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Auction
+
+logger = logging.getLogger(__name__)
+
+# Where proxied copies of external images are stored
+REMOTE_DIR = 'remote_images'
+
+# Longest edge in pixels of each rendition, smallest first
+RENDITIONS = {
+    'card': 480,
+    'detail': 960,
+    'zoom': 1920,
+}
+
+# Output formats with their file extension and encoder options
+FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
+def derivative_name(image_name, size, fmt):
+    """Return the storage name of one rendition of an uploaded image."""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    extension = FORMATS[fmt][0]
+    return os.path.join(directory, 'derivatives', f'{stem}-{size}.{extension}')
+
+
+def _render(original, size, fmt):
+    image = original.copy()
+    image.thumbnail((RENDITIONS[size], RENDITIONS[size]), Image.Resampling.LANCZOS)
+
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha channel, so flatten transparent images onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, format=fmt.upper(), **FORMATS[fmt][1])
+    return buffer.getvalue()
+
+
+def generate_derivatives(image_name, overwrite=False, storage=default_storage):
+    """
+    Write every size and format rendition of an uploaded image.
+
+    Args:
+        image_name: Storage name of the original upload
+        overwrite: Regenerate renditions that already exist
+
+    Returns:
+        The storage names written, or an empty list if the original is unreadable
+    """
+    wanted = [
+        (size, fmt, derivative_name(image_name, size, fmt))
+        for size in RENDITIONS for fmt in FORMATS
+    ]
+    if not overwrite:
+        wanted = [(size, fmt, name) for size, fmt, name in wanted if not storage.exists(name)]
+    if not wanted:
+        return []
+
+    try:
+        with storage.open(image_name, 'rb') as source:
+            original = Image.open(source)
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    except (OSError, UnidentifiedImageError) as e:
+        logger.error(f"Error reading auction image {image_name}: {e}")
+        return []
+
+    written = []
+    for size, fmt, name in wanted:
+        if storage.exists(name):
+            storage.delete(name)
+        written.append(storage.save(name, ContentFile(_render(original, size, fmt))))
+    return written
+
+
+def record_renditions(auctions, image_name, storage=default_storage):
+    """Link the renditions of image_name directly on an Auction queryset, once they all exist."""
+    if all(storage.exists(derivative_name(image_name, size, fmt)) for size in RENDITIONS for fmt in FORMATS):
+        auctions.exclude(image_renditions=image_name).update(image_renditions=image_name)
+
+
+def generate_auction_derivatives(auction_id, image_name, storage=default_storage):
+    """Write the renditions of an auction's upload and record them while it is still its image."""
+    generate_derivatives(image_name, storage=storage)
+    record_renditions(Auction.objects.filter(pk=auction_id, image=image_name), image_name, storage)
+
+
+def ensure_derivative(image_name, size, fmt, storage=default_storage):
+    """Return the storage name of a rendition, generating the set if it is missing."""
+    name = derivative_name(image_name, size, fmt)
+    if not storage.exists(name):
+        generate_derivatives(image_name, storage=storage)
+    return name if storage.exists(name) else None
+
+
+def derivative_url(auction, size, fmt, storage=default_storage):
+    """
+    URL of an auction image rendition for templates.
+
+    Recorded renditions are linked straight from the media store; others
+    point at the auction_image view, which generates them on first hit.
+    """
+    source = source_image_name(auction)
+    if source and auction.image_renditions == source:
+        return storage.url(derivative_name(source, size, fmt))
+    return reverse('auction_image', args=(auction.id, size, FORMATS[fmt][0]))
+
+
+def srcset(auction, fmt, storage=default_storage):
+    """Return a srcset attribute value covering every rendition of an auction image."""
+    return ', '.join(
+        f'{derivative_url(auction, size, fmt, storage)} {width}w'
+        for size, width in RENDITIONS.items()
+    )
+
+
+class RemoteImageError(Exception):
+    """An external image could not be fetched or is not an acceptable image."""
+
+
+def remote_image_name(url):
+    """Return the storage name of the proxied copy of an external image."""
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(REMOTE_DIR, digest[:2], f'{digest}.webp')
+
+
+def source_image_name(auction):
+    """Storage name renditions are made from: the upload, else the proxied image_url."""
+    if auction.image:
+        return auction.image.name
+    if auction.image_url:
+        return remote_image_name(auction.image_url)
+    return None
+
+
+def _check_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise RemoteImageError(f"unsupported URL {url}")
+
+
+def _create_public_connection(address, timeout, source_address=None):
+    """Connect to (host, port), refusing hosts that resolve to non-public addresses."""
+    if settings.REMOTE_IMAGE_ALLOW_PRIVATE:
+        return socket.create_connection(address, timeout, source_address)
+    host, port = address
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+    except socket.gaierror as e:
+        raise RemoteImageError(f"cannot resolve {host}: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global:
+            raise RemoteImageError(f"{host} resolves to non-public address {ip}")
+
+    # Connect to the checked addresses themselves instead of resolving the host again
+    error = None
+    for address in dict.fromkeys(addresses):
+        try:
+            return socket.create_connection((address, port), timeout, source_address)
+        except OSError as e:
+            error = e
+    raise error
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def download_remote_image(url):
+    """Download an external image, enforcing the REMOTE_IMAGE_* limits. Returns the raw bytes."""
+    _check_url(url)
+    # No proxies: a proxy would resolve the host itself, past the address check
+    opener = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _CheckedRedirectHandler
+    )
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mazadi image proxy'})
+    limit = settings.REMOTE_IMAGE_MAX_BYTES
+
+    try:
+        with opener.open(request, timeout=settings.REMOTE_IMAGE_TIMEOUT) as response:
+            content_type = response.headers.get_content_type()
+            if not content_type.startswith('image/'):
+                raise RemoteImageError(f"{url} returned {content_type}")
+            data = response.read(limit + 1)
+    except (URLError, OSError) as e:
+        raise RemoteImageError(f"cannot fetch {url}: {e}")
+
+    if len(data) > limit:
+        raise RemoteImageError(f"{url} is larger than {limit} bytes")
+    return data
+
+
+def fetch_remote_image(url, storage=default_storage):
+    """
+    Store a validated, resized copy of an external image in the media store.
+
+    Failures are remembered for REMOTE_IMAGE_RETRY_AFTER seconds so a broken
+    origin is not hit on every page view.
+
+    Returns:
+        The storage name of the copy, or None if it could not be fetched
+    """
+    name = remote_image_name(url)
+    if storage.exists(name):
+        return name
+    failure_key = f'remote-image:failed:{name}'
+    if cache.get(failure_key):
+        return None
+
+    try:
+        data = download_remote_image(url)
+        Image.open(BytesIO(data)).verify()
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        image.thumbnail((RENDITIONS['zoom'], RENDITIONS['zoom']), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        buffer = BytesIO()
+        image.save(buffer, format='WEBP', quality=90)
+    except (RemoteImageError, OSError, UnidentifiedImageError, Image.DecompressionBombError, ValueError) as e:
+        logger.warning(f"Error proxying remote image {url}: {e}")
+        cache.set(failure_key, True, settings.REMOTE_IMAGE_RETRY_AFTER)
+        return None
+
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+# External image URLs waiting for the background fetcher, and the thread running it
+_fetch_queue = queue.Queue()
+_queued_urls = set()
+_fetch_lock = threading.Lock()
+_fetcher = None
+
+
+def queue_remote_image(url):
+    """Fetch an external image and render its renditions in a background thread."""
+    global _fetcher
+    with _fetch_lock:
+        if url in _queued_urls:
+            return
+        _queued_urls.add(url)
+        if _fetcher is None or not _fetcher.is_alive():
+            _fetcher = threading.Thread(target=_fetch_queued_images, name='remote-images', daemon=True)
+            _fetcher.start()
+    _fetch_queue.put(url)
+
+
+def _fetch_queued_images():
+    while True:
+        url = _fetch_queue.get()
+        try:
+            # Storage only, no database: auctions are marked when their renditions are next requested
+            name = fetch_remote_image(url)
+            if name:
+                generate_derivatives(name)
+        except Exception as e:
+            logger.error(f"Error fetching remote image {url}: {e}")
+        finally:
+            with _fetch_lock:
+                _queued_urls.discard(url)
+            _fetch_queue.task_done()
+
+
+def ensure_auction_derivative(auction, size, fmt, storage=default_storage):
+    """
+    Return the storage name of an auction image rendition, generating it as needed.
+
+    A missing copy of an external image is queued for the background fetcher
+    and None is returned until it exists.
+    """
+    if auction.image:
+        source = auction.image.name
+    elif auction.image_url:
+        source = remote_image_name(auction.image_url)
+        if not storage.exists(source):
+            queue_remote_image(auction.image_url)
+            return None
+    else:
+        return None
+
+    name = ensure_derivative(source, size, fmt, storage)
+    if name and auction.image_renditions != source:
+        record_renditions(Auction.objects.filter(pk=auction.pk), source, storage)
+    return name
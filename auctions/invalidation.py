@@ -0,0 +1,17 @@
+"""
+Cache invalidation around database transactions.
+"""
+from django.db import transaction
+
+
+def invalidate_now_and_on_commit(invalidate):
+    """
+    Run a cache invalidation immediately and again once the current transaction commits.
+
+    The first run stops readers from using the old entry right away. A reader
+    outside the transaction can still cache the old data again before the
+    commit, so the second run discards whatever was cached in between.
+    Outside a transaction both runs happen at once.
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
@@ -0,0 +1,66 @@
+"""
+Query presets and batched loaders for auction pages.
+
+Templates follow auction.user.profile, auction.leader.profile and
+comment.user.profile; loaded naively each of those is one query per row.
+The presets below join what a page needs up front, and ProfileLoader fills
+in user profiles for any number of users with a single query per request,
+so the query count of a page does not grow with its comments or cards.
+"""
+from accounts.models import User, UserProfile
+
+from .models import Auction, Comment
+
+
+# select_related() presets
+AUCTION_DETAIL_RELATED = ('user__profile', 'leader__profile')
+COMMENT_RELATED = ('user',)
+
+
+def auction_detail(auction_id):
+    """Return an auction with its seller and leader (and their profiles) joined in."""
+    return Auction.objects.select_related(*AUCTION_DETAIL_RELATED).get(id=auction_id)
+
+
+def auction_comments(auction_id):
+    """Comments on an auction with their authors joined in (profiles via ProfileLoader)."""
+    return Comment.objects.filter(auction=auction_id).select_related(*COMMENT_RELATED)
+
+
+class ProfileLoader:
+    """
+    Load UserProfile rows for many users in one query and cache them on the users.
+
+    Profiles already loaded (by select_related or an earlier load) are reused,
+    so priming the same users twice costs nothing.
+    """
+
+    def __init__(self):
+        self._profiles = {}
+
+    def prime(self, users):
+        """Attach profiles to users so user.profile never hits the database."""
+        users = [
+            user for user in users
+            if user is not None and user.is_authenticated and not User.profile.related.is_cached(user)
+        ]
+        missing = {user.id for user in users} - self._profiles.keys()
+        if missing:
+            self._profiles.update(dict.fromkeys(missing))
+            for profile in UserProfile.objects.filter(user_id__in=missing):
+                self._profiles[profile.user_id] = profile
+
+        for user in users:
+            profile = self._profiles[user.id]
+            # A cached None makes user.profile raise DoesNotExist, which templates render as empty
+            User.profile.related.set_cached_value(user, profile)
+            if profile is not None:
+                UserProfile.user.field.set_cached_value(profile, user)
+        return users
+
+
+def profile_loader(request):
+    """Return the ProfileLoader shared by everything rendering this request."""
+    if not hasattr(request, '_profile_loader'):
+        request._profile_loader = ProfileLoader()
+    return request._profile_loader
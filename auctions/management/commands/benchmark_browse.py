@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from accounts.models import User
+from auctions.facets import rebuild_facets
+from auctions.models import CATEGORY_CHOICES, Auction
+from auctions.pagination import encode_cursor
+
+
+# Auctions inserted per bulk_create()
+INSERT_BATCH = 10000
+
+# Faceted browse requests timed against the synthetic catalog
+SCENARIOS = [
+    ('no filters', ''),
+    ('one category', 'category=laptops'),
+    ('two categories and a price band', 'category=laptops&category=tablets&price=500-1000'),
+    ('closed, most expensive', 'status=closed&price=2500-plus'),
+    ('every facet', 'category=cameras&price=under-100&status=closed&image=no'),
+    ('rare combination', 'category=other&price=2500-plus&status=closed&image=no'),
+    ('most watched in a price band', 'sort=popular&price=100-500'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the faceted auction browse page against a synthetic catalog built in a '
+        'throwaway test database, failing if a request exceeds the latency budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--auctions',
+            type=int,
+            default=500000,
+            help='Size of the synthetic catalog (default: 500000)',
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=150,
+            help='Largest acceptable median time of each request in milliseconds (default: 150)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed requests per scenario (default: 20)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the synthetic catalog (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.build_catalog(options['auctions'], random.Random(options['seed']))
+            results = self.run_scenarios(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        budget = options['budget_ms']
+        over = [name for name, median, _ in results if median > budget]
+        for name, median, slowest in results:
+            line = f'{name:<32} median {median:7.1f} ms   max {slowest:7.1f} ms'
+            self.stdout.write(self.style.ERROR(line) if median > budget else line)
+
+        if over:
+            raise CommandError(f'{len(over)} scenarios exceeded the {budget:g} ms budget: {", ".join(over)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully browsed {options["auctions"]} auctions within the {budget:g} ms budget'
+        ))
+
+    def build_catalog(self, size, rng):
+        """Insert size auctions with a realistic spread of categories, prices, states and images."""
+        self.stdout.write(f'Building a synthetic catalog of {size} auctions...')
+        sellers = [User.objects.create_user(f'seller{i}', password='benchmark') for i in range(20)]
+        categories = [category for category, _ in CATEGORY_CHOICES]
+        # A long tail: the first categories hold most auctions
+        weights = [1 / (rank + 1) for rank in range(len(categories))]
+
+        for start in range(0, size, INSERT_BATCH):
+            count = min(INSERT_BATCH, size - start)
+            picked = rng.choices(categories, weights, k=count)
+            Auction.objects.bulk_create([
+                Auction(
+                    title=f'Synthetic item {start + i}',
+                    description='Synthetic auction for the browse benchmark',
+                    # Log-uniform between 5 and 9999.99
+                    price=Decimal(f'{min(5 * 2000 ** rng.random(), 9999.99):.2f}'),
+                    current_bid=Decimal('0'),
+                    category=picked[i],
+                    is_close=rng.random() < 0.3,
+                    image_url='https://example.com/item.jpg' if rng.random() < 0.8 else None,
+                    watcher_count=int(rng.expovariate(0.2)),
+                    user=sellers[i % len(sellers)],
+                )
+                for i in range(count)
+            ])
+
+        rebuild_facets()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def run_scenarios(self, repeat):
+        """Return (name, median ms, max ms) of each scenario, the page cache being disabled."""
+        client = Client()
+        scenarios = list(SCENARIOS)
+        middle = Auction.objects.order_by('-created_at', '-id')[Auction.objects.count() // 2]
+        scenarios.append(('page in the middle', f'after={encode_cursor(middle)}'))
+
+        results = []
+        with override_settings(PAGE_CACHE_TIMEOUT=0):
+            for name, query in scenarios:
+                url = f'/auctions?{query}'
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                results.append((name, statistics.median(timings), max(timings)))
+        return results
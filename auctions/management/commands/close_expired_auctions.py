@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from auctions.closing import BATCH_SIZE, close_expired_auctions, next_expiry
+
+
+class Command(BaseCommand):
+    help = 'Close auctions whose end time has passed and notify their owners and winners'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, waking up whenever the next auction is due',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60,
+            help='Longest time in seconds to sleep between checks with --loop (default: 60)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Auctions closed per transaction (default: {BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            closed = close_expired_auctions(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Successfully closed {closed} expired auctions'))
+            return
+
+        self.stdout.write('Closing expired auctions, press CTRL+C to stop...')
+        horizon = timedelta(seconds=options['interval'])
+        try:
+            while True:
+                close_old_connections()
+                closed = close_expired_auctions(batch_size=options['batch_size'])
+                if closed:
+                    self.stdout.write(self.style.SUCCESS(f'Successfully closed {closed} expired auctions'))
+                time.sleep(max(next_expiry(horizon=horizon), 0.1))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
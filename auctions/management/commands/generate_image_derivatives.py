@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from auctions.images import fetch_remote_image, generate_derivatives, record_renditions
+from auctions.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Generate card, detail and zoom JPEG/WebP renditions of auction images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Regenerate renditions that already exist',
+        )
+        parser.add_argument(
+            '--fetch-remote',
+            action='store_true',
+            help='Also download external image URLs into the media store',
+        )
+
+    def handle(self, *args, **options):
+        image_names = Auction.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)
+
+        self.stdout.write('Generating auction image renditions...')
+        written = 0
+        for image_name in list(image_names):
+            written += len(generate_derivatives(image_name, overwrite=options['overwrite']))
+            record_renditions(Auction.objects.filter(image=image_name), image_name)
+
+        if options['fetch_remote']:
+            image_urls = Auction.objects.filter(
+                Q(image='') | Q(image__isnull=True)
+            ).exclude(image_url='').exclude(image_url__isnull=True).values_list('image_url', flat=True)
+            for image_url in list(image_urls):
+                image_name = fetch_remote_image(image_url)
+                if image_name:
+                    written += len(generate_derivatives(image_name, overwrite=options['overwrite']))
+                    record_renditions(Auction.objects.filter(image_url=image_url), image_name)
+            record_renditions(Auction.objects.filter(image=image_name), image_name)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {written} image renditions'))
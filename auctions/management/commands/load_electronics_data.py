@@ -6,6 +6,9 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
+from auctions.bidding import refresh_bid_summary
+from auctions.recommendations import rebuild_recommendations
+from auctions.stats import rebuild_category_stats
 from auctions.models import Auction, Bid, CATEGORY_CHOICES
 from django.conf import settings
 
@@ -272,4 +275,10 @@ class Command(BaseCommand):
                 total_created += 1
                 self.stdout.write(f'  - Created auction: {item["title"]}')
         
+        # Bids were created directly, so sync the denormalized bid summaries
+        # and the category price ranges that depend on them
+        refresh_bid_summary()
+        rebuild_category_stats()
+        rebuild_recommendations()
+
         self.stdout.write(self.style.SUCCESS(f'Successfully loaded {total_created} electronics items'))
@@ -8,6 +8,9 @@ from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from auctions.bidding import refresh_bid_summary
+from auctions.recommendations import rebuild_recommendations
+from auctions.stats import rebuild_category_stats
 from auctions.models import Auction, Bid, Comment, Watchlist, CATEGORY_CHOICES
 from accounts.models import Rating, UserProfile
 from django.conf import settings
@@ -252,6 +255,12 @@ class Command(BaseCommand):
         # Close some auctions and create ratings
         self.close_auctions_and_create_ratings(users, auctions)
 
+        # Bids were created directly, so sync the denormalized bid summaries
+        # and the category price ranges that depend on them
+        refresh_bid_summary()
+        rebuild_category_stats()
+        rebuild_recommendations()
+
         self.stdout.write(self.style.SUCCESS('Successfully populated database with fake data'))
 
     def clear_existing_data(self):
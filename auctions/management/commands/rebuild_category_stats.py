@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from auctions.stats import rebuild_category_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-category auction statistics from the auction table'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding category statistics...')
+        categories = rebuild_category_stats()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt statistics for {categories} categories'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from auctions.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the faceted browse counts from the auction table'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding facet counts...')
+        combinations = rebuild_facets()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {combinations} facet combinations'))
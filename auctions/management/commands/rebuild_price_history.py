@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from auctions.price_history import rebuild_price_history
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-auction price history rollups from the bid table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'auction_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild the price history of these auctions (default: all auctions)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding auction price history...')
+        written = rebuild_price_history(options['auction_ids'] or None)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {written} price history buckets'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from auctions.recommendations import TOP_K, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed related-auction recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'auction_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild the recommendations of these auctions (default: all open auctions)',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only build recommendations for open auctions that have none yet',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=TOP_K,
+            help=f'Recommendations stored per auction (default: {TOP_K})',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding related-auction recommendations...')
+        updated = rebuild_recommendations(
+            auction_ids=options['auction_ids'] or None,
+            missing=options['missing'],
+            k=options['top']
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt recommendations for {updated} auctions'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from auctions.search import rebuild_index, uses_fts5
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for auctions (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not uses_fts5():
+            self.stdout.write('This database indexes auctions automatically, nothing to rebuild.')
+            return
+
+        self.stdout.write('Rebuilding auction search index...')
+        indexed = rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {indexed} auctions'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from auctions.counters import reconcile_counters
+from auctions.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized watcher, bidder and comment counters on auctions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'auction_ids',
+            nargs='*',
+            type=int,
+            help='Only reconcile these auctions (default: all auctions)',
+        )
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.all()
+        if options['auction_ids']:
+            auctions = auctions.filter(id__in=options['auction_ids'])
+
+        self.stdout.write('Reconciling auction watcher, bidder and comment counters...')
+        updated = reconcile_counters(auctions)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully reconciled {updated} auctions'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from auctions.bidding import refresh_bid_summary
+from auctions.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the denormalized current bid, bid count and leader on auctions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'auction_ids',
+            nargs='*',
+            type=int,
+            help='Only refresh these auctions (default: all auctions)',
+        )
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.all()
+        if options['auction_ids']:
+            auctions = auctions.filter(id__in=options['auction_ids'])
+
+        self.stdout.write('Refreshing auction bid summaries...')
+        updated = refresh_bid_summary(auctions)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully refreshed {updated} auctions'))
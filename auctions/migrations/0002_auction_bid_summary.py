@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_summary(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    bids = Bid.objects.filter(auction=OuterRef('pk'))
+    top_bids = bids.order_by('-amount', 'id')
+    bid_counts = bids.order_by().values('auction').annotate(total=Count('id')).values('total')
+
+    Auction.objects.update(
+        current_bid=Coalesce(Subquery(top_bids.values('amount')[:1]), Value(0), output_field=models.DecimalField()),
+        bid_count=Coalesce(Subquery(bid_counts), Value(0)),
+        leader=Subquery(top_bids.values('user')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='current_bid',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=6),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='leader',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_auctions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_bid_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0002_auction_bid_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('auction_id', models.BigIntegerField()),
+                ('event_type', models.CharField(max_length=16)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['auction_id', 'id'], name='auctions_au_auction_f51eec_idx')],
+            },
+        ),
+    ]
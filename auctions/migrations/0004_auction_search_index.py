@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+FTS_TABLE = 'auctions_auction_fts'
+
+SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('english', coalesce(auctions_auction.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(auctions_auction.description, '')), 'B'))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"title, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+            f"SELECT id, title, description FROM auctions_auction"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS auctions_auction_search_idx "
+            f"ON auctions_auction USING GIN ({SEARCH_VECTOR_SQL})"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS auctions_auction_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0003_auctionevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
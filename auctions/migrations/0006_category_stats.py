@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def backfill_category_stats(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    CategoryStats = apps.get_model('auctions', 'CategoryStats')
+
+    open_auctions = Q(is_close=False)
+    rows = Auction.objects.values('category').annotate(
+        total=Count('id'),
+        open=Count('id', filter=open_auctions),
+        min_price=Min('current_bid', filter=open_auctions),
+        max_price=Max('current_bid', filter=open_auctions),
+        last_created=Max('created_at')
+    ).order_by()
+    CategoryStats.objects.bulk_create([
+        CategoryStats(
+            category=row['category'],
+            total_count=row['total'],
+            open_count=row['open'],
+            min_price=row['min_price'],
+            max_price=row['max_price'],
+            last_activity=row['last_created']
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_auction_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('smartphones', 'Smartphones'), ('tablets', 'Tablets'), ('laptops', 'Laptops'), ('desktops', 'Desktop Computers'), ('monitors', 'Monitors'), ('tvs', 'Televisions'), ('cameras', 'Cameras'), ('audio', 'Audio Equipment'), ('gaming', 'Gaming Consoles'), ('accessories', 'Accessories'), ('wearables', 'Wearable Technology'), ('networking', 'Networking Equipment'), ('storage', 'Storage Devices'), ('components', 'Computer Components'), ('other', 'Other Electronics')], max_length=64, unique=True)),
+                ('open_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'category stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['category', 'is_close', 'current_bid'], name='auction_category_price_idx'),
+        ),
+        migrations.RunPython(backfill_category_stats, migrations.RunPython.noop),
+    ]
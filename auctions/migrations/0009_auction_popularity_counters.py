@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+    Watchlist = apps.get_model('auctions', 'Watchlist')
+
+    watchers = Watchlist.auctions.through.objects.filter(
+        auction=OuterRef('pk')
+    ).order_by().values('auction').annotate(total=Count('id')).values('total')
+    bidders = Bid.objects.filter(
+        auction=OuterRef('pk')
+    ).exclude(user=OuterRef('user')).order_by().values('auction').annotate(
+        total=Count('user', distinct=True)
+    ).values('total')
+
+    Auction.objects.update(
+        watcher_count=Coalesce(Subquery(watchers), Value(0)),
+        bidder_count=Coalesce(Subquery(bidders), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0008_proxybid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bidder_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='watcher_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['-watcher_count', '-id'], name='auction_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['category', '-watcher_count', '-id'], name='auction_category_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', 'user'], name='bid_auction_user_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
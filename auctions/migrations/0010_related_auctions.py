@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_auction_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedAuction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='auctions.auction')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_with', to='auctions.auction')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('auction', 'rank'), name='unique_related_auction_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Comment = apps.get_model('auctions', 'Comment')
+
+    comments = Comment.objects.filter(
+        auction=OuterRef('pk')
+    ).order_by().values('auction').annotate(total=Count('id')).values('total')
+
+    Auction.objects.update(comment_count=Coalesce(Subquery(comments), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_bid_requests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['auction', 'created_at', 'id'], name='comment_auction_created_idx'),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
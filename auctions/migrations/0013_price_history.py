@@ -0,0 +1,87 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:07
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+
+
+# auctions.price_history.BUCKET_SECONDS when this migration was written
+BUCKET_SECONDS = 300
+
+
+def backfill_bid_times(apps, schema_editor):
+    # Bids placed before bids were timestamped only have their auction's
+    # creation time as a known bound; their order is kept by id
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+    PriceRollup = apps.get_model('auctions', 'PriceRollup')
+
+    Bid.objects.filter(auction__isnull=False).update(
+        created_at=Subquery(Auction.objects.filter(pk=OuterRef('auction')).values('created_at')[:1])
+    )
+
+    rollups = []
+    summaries = (
+        Bid.objects.filter(auction__isnull=False).order_by().values('auction')
+        .annotate(low=Min('amount'), high=Max('amount'), at=Min('created_at'), total=Count('id'))
+    )
+    for summary in summaries.iterator():
+        at = summary['at']
+        rollups.append(PriceRollup(
+            auction_id=summary['auction'],
+            bucket=datetime.datetime.fromtimestamp(
+                int(at.timestamp()) // BUCKET_SECONDS * BUCKET_SECONDS, tz=datetime.timezone.utc
+            ),
+            low=summary['low'],
+            high=summary['high'],
+            first_bid_at=at,
+            last_bid_at=at,
+            bid_count=summary['total'],
+        ))
+    PriceRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0012_comment_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('low', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('first_bid_at', models.DateTimeField()),
+                ('last_bid_at', models.DateTimeField()),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', 'created_at', 'id'], name='bid_auction_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='pricerollup',
+            name='auction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='auctions.auction'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricerollup',
+            constraint=models.UniqueConstraint(fields=('auction', 'bucket'), name='unique_price_rollup_bucket'),
+        ),
+        migrations.RunPython(backfill_bid_times, migrations.RunPython.noop),
+    ]
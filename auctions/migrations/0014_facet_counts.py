@@ -0,0 +1,80 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:14
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Case, CharField, Count, ExpressionWrapper, Q, Value, When
+
+
+# Categories of auctions.models.CATEGORY_CHOICES and auctions.facets.PRICE_BANDS when this migration was written
+CATEGORIES = [
+    'smartphones', 'tablets', 'laptops', 'desktops', 'monitors', 'tvs', 'cameras', 'audio', 'gaming',
+    'accessories', 'wearables', 'networking', 'storage', 'components', 'other',
+]
+PRICE_BANDS = [
+    ('under-100', None, Decimal('100')),
+    ('100-500', Decimal('100'), Decimal('500')),
+    ('500-1000', Decimal('500'), Decimal('1000')),
+    ('1000-2500', Decimal('1000'), Decimal('2500')),
+    ('2500-plus', Decimal('2500'), None),
+]
+
+
+def backfill_facet_counts(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    FacetCount = apps.get_model('auctions', 'FacetCount')
+
+    bands = []
+    for value, low, high in PRICE_BANDS:
+        band = Q()
+        if low is not None:
+            band &= Q(price__gte=low)
+        if high is not None:
+            band &= Q(price__lt=high)
+        bands.append(When(band, then=Value(value)))
+    has_image = (Q(image__isnull=False) & ~Q(image='')) | (Q(image_url__isnull=False) & ~Q(image_url=''))
+
+    rows = Auction.objects.annotate(
+        band=Case(*bands, output_field=CharField()),
+        has_image=ExpressionWrapper(has_image, output_field=BooleanField()),
+    ).values('category', 'band', 'is_close', 'has_image').annotate(total=Count('id')).order_by()
+    # Every combination gets a row, so keeping the counts up to date is a single UPDATE
+    counts = {
+        (category, band, is_close, image): 0
+        for category in CATEGORIES
+        for band, _, _ in PRICE_BANDS
+        for is_close in (False, True)
+        for image in (False, True)
+    }
+    for row in rows:
+        counts[(row['category'], row['band'], row['is_close'], row['has_image'])] = row['total']
+
+    FacetCount.objects.bulk_create([
+        FacetCount(category=category, price_band=band, is_close=is_close, has_image=image, count=count)
+        for (category, band, is_close, image), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('smartphones', 'Smartphones'), ('tablets', 'Tablets'), ('laptops', 'Laptops'), ('desktops', 'Desktop Computers'), ('monitors', 'Monitors'), ('tvs', 'Televisions'), ('cameras', 'Cameras'), ('audio', 'Audio Equipment'), ('gaming', 'Gaming Consoles'), ('accessories', 'Accessories'), ('wearables', 'Wearable Technology'), ('networking', 'Networking Equipment'), ('storage', 'Storage Devices'), ('components', 'Computer Components'), ('other', 'Other Electronics')], max_length=64)),
+                ('price_band', models.CharField(max_length=16)),
+                ('is_close', models.BooleanField()),
+                ('has_image', models.BooleanField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'price_band', 'is_close', 'has_image'), name='unique_facet_count')],
+            },
+        ),
+        migrations.RunPython(backfill_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_facet_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['-current_bid', '-id'], name='auction_live_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['category', '-current_bid', '-id'], name='auction_category_live_idx'),
+        ),
+    ]
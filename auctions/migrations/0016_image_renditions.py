@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_live_price_sort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='image_renditions',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Use the User model from accounts app
 User = settings.AUTH_USER_MODEL
@@ -34,13 +35,108 @@ class Auction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     image = models.ImageField(upload_to='auction_images/', null=True, blank=True)
     image_url = models.URLField(blank=True, null=True)  # Keep for backward compatibility
+    # Source image whose renditions all exist, so templates link them without probing storage (see auctions.images)
+    image_renditions = models.CharField(max_length=255, blank=True, default='')
     is_close = models.BooleanField(default=False)
+    # Closed automatically by `manage.py close_expired_auctions` (see auctions.closing)
+    ends_at = models.DateTimeField(null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="auctions")
 
+    # Highest bid summary, maintained by auctions.bidding.place_bid()
+    # (repair with `manage.py refresh_bid_summary`)
+    current_bid = models.DecimalField(decimal_places=2, max_digits=6, default=0, db_index=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    leader = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="leading_auctions", null=True, blank=True)
+
+    # Popularity counters, maintained from watchlist, bid and comment signals
+    # (repair with `manage.py reconcile_auction_counters`)
+    watcher_count = models.PositiveIntegerField(default=0)
+    bidder_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Keyset pagination indexes (see auctions.pagination)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='auction_newest_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='auction_category_newest_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='auction_user_newest_idx'),
+            models.Index(fields=['-watcher_count', '-id'], name='auction_popular_idx'),
+            models.Index(fields=['category', '-watcher_count', '-id'], name='auction_category_popular_idx'),
+            models.Index(fields=['-current_bid', '-id'], name='auction_live_price_idx'),
+            models.Index(fields=['category', '-current_bid', '-id'], name='auction_category_live_idx'),
+            # Open price range per category (see auctions.stats)
+            models.Index(fields=['category', 'is_close', 'current_bid'], name='auction_category_price_idx'),
+            # Expiry scan, only open auctions are indexed
+            models.Index(fields=['ends_at', 'id'], condition=models.Q(is_close=False), name='auction_open_expiry_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_stats_state()
+        return instance
+
+    def remember_stats_state(self):
+        # Remember the (category, is_close) last written to the database so
+        # category statistics can tell when an auction moves between states
+        if 'category' in self.__dict__ and 'is_close' in self.__dict__:
+            self._stats_state = (self.category, self.is_close)
+        else:
+            self._stats_state = None
+        # ... and the values its facet counts were recorded under (see auctions.facets)
+        if all(field in self.__dict__ for field in ('category', 'price', 'is_close', 'image', 'image_url')):
+            self._facet_values = self.facet_values()
+        else:
+            self._facet_values = None
+
+    def facet_values(self):
+        return (self.category, self.price, self.is_close, bool(self.image or self.image_url))
+
     def __str__(self):
         return f"{self.title} ({self.price})"
 
 
+# Per-category summary, maintained incrementally by auctions.stats
+# (repair with `manage.py rebuild_category_stats`)
+class CategoryStats(models.Model):
+    category = models.CharField(max_length=64, choices=CATEGORY_CHOICES, unique=True)
+    open_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(decimal_places=2, max_digits=6, null=True, blank=True)
+    max_price = models.DecimalField(decimal_places=2, max_digits=6, null=True, blank=True)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "category stats"
+
+    @property
+    def count(self):
+        return self.total_count
+
+    def __str__(self):
+        return f"{self.category}: {self.open_count} open / {self.total_count} total"
+
+
+# Number of auctions per combination of facet values, maintained from Auction
+# signals by auctions.facets (repair with `manage.py rebuild_facets`)
+class FacetCount(models.Model):
+    category = models.CharField(max_length=64, choices=CATEGORY_CHOICES)
+    price_band = models.CharField(max_length=16)
+    is_close = models.BooleanField()
+    has_image = models.BooleanField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'price_band', 'is_close', 'has_image'], name='unique_facet_count'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category} / {self.price_band} / closed={self.is_close} / image={self.has_image}: {self.count}"
+
+
 # Watchlist model
 class Watchlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="watchlists", null=True)
@@ -56,11 +152,100 @@ class Bid(models.Model):
     amount = models.DecimalField(decimal_places=2, max_digits=6)
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="bids", null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bids", null=True)
+    # Not auto_now_add, so imported bids can keep their original time
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # "Has this user bid here before?" check for Auction.bidder_count
+            models.Index(fields=['auction', 'user'], name='bid_auction_user_idx'),
+            # Price history of an auction in time order (see auctions.price_history)
+            models.Index(fields=['auction', 'created_at', 'id'], name='bid_auction_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.auction}: {self.user} bid with {self.amount}"
 
 
+# Bids of an auction summarised per BUCKET_SECONDS time bucket, maintained from
+# Bid signals by auctions.price_history (repair with `manage.py rebuild_price_history`)
+class PriceRollup(models.Model):
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="price_rollups")
+    bucket = models.DateTimeField()
+    low = models.DecimalField(decimal_places=2, max_digits=6)
+    high = models.DecimalField(decimal_places=2, max_digits=6)
+    first_bid_at = models.DateTimeField()
+    last_bid_at = models.DateTimeField()
+    bid_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index the price history is read through
+            models.UniqueConstraint(fields=['auction', 'bucket'], name='unique_price_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.auction} @ {self.bucket}: {self.low}-{self.high} ({self.bid_count} bids)"
+
+
+# Proxy (automatic) bid: the platform bids for the user up to max_amount
+# (resolved by auctions.bidding.place_bid())
+class ProxyBid(models.Model):
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="proxy_bids")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="proxy_bids")
+    max_amount = models.DecimalField(decimal_places=2, max_digits=6)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['auction', 'user'], name='unique_proxy_bid_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['auction', '-max_amount', 'created_at'], name='proxy_bid_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.auction}: {self.user} bids automatically up to {self.max_amount}"
+
+
+# Outcome of a bid submitted through the JSON API with an idempotency key,
+# replayed when the client retries (see auctions.bidding.place_bids())
+class BidRequest(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bid_requests")
+    key = models.CharField(max_length=64)
+    auction_id = models.BigIntegerField()
+    amount = models.DecimalField(decimal_places=2, max_digits=6, null=True)
+    max_amount = models.DecimalField(decimal_places=2, max_digits=6, null=True)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_bid_request_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} bid request {self.key} on auction {self.auction_id}"
+
+
+# Precomputed "related auctions" list, best match first
+# (built by `manage.py rebuild_recommendations`, see auctions.recommendations)
+class RelatedAuction(models.Model):
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="recommendations")
+    related = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="recommended_with")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also the index the detail page reads recommendations through
+            models.UniqueConstraint(fields=['auction', 'rank'], name='unique_related_auction_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.auction} -> {self.related} ({self.score:.3f})"
+
+
 # Comment model
 class Comment(models.Model):
     message = models.TextField()
@@ -68,5 +253,27 @@ class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comment", null=True)
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="comment", null=True)
 
+    class Meta:
+        indexes = [
+            # Comment pages of an auction, newest first (see auctions.comments)
+            models.Index(fields=['auction', 'created_at', 'id'], name='comment_auction_created_idx'),
+        ]
+
+    def __str__(self):
+        return f" {self.user} has commented on auction called ({self.auction})"
+
+
+# Live auction event, used by auctions.events.DatabaseBroker to fan out across workers
+class AuctionEvent(models.Model):
+    auction_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=16)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['auction_id', 'id']),
+        ]
+
     def __str__(self):
-        return f" {self.user} has commented on auction called ({self.auction})"
\ No newline at end of file
+        return f"{self.event_type} on auction {self.auction_id}"
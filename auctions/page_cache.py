@@ -0,0 +1,143 @@
+"""
+Full-page cache of the public listing pages for anonymous visitors.
+
+home, index, categories and the category pages look the same to every
+anonymous visitor, so their rendered responses are cached per URL (path and
+sorted query string). Each cache key embeds the version stamps of the
+scopes a page depends on:
+
+* the listing scope, for every page listing or counting auctions across
+  categories (home, index, categories),
+* one scope per category, for its page and the index page, whose cards
+  show live prices and counters,
+* the featured scope, for the auctions featured on the home page.
+
+Saving or deleting an auction and closing auctions bump the listing scope
+and the affected categories. Bids and watchlist changes only move prices
+and counters, so they bump the auction's category and, for a bid on a
+featured auction, the featured scope. A purge is a single increment and
+stale pages are never read again; they just expire.
+
+Stamps live in the "pages" cache next to the pages. Every worker sharing
+that cache (the file backend, or any shared backend) sees a bump at once;
+the local-memory backend is per process and suits a single worker only.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .invalidation import invalidate_now_and_on_commit
+from .models import CATEGORY_CHOICES, Auction
+
+
+PAGE_CACHE_ALIAS = 'pages'
+
+# Version scope of the pages listing every category (home, index, categories)
+LISTING_SCOPE = 'listing'
+
+# Version scope of the home page's featured auctions, the open ones with the highest live price
+FEATURED_SCOPE = 'featured'
+FEATURED_COUNT = 3
+
+
+def category_scope(category):
+    """Version scope of one category page."""
+    return f'category:{category}'
+
+
+# Scopes of a page showing auctions of any category
+ALL_CATEGORY_SCOPES = [category_scope(category) for category, _ in CATEGORY_CHOICES]
+
+
+def featured_auctions():
+    """The open auctions featured on the home page."""
+    return Auction.objects.filter(is_close=False).order_by('-current_bid')[:FEATURED_COUNT]
+
+
+def _version_key(scope):
+    return f'pagecache:version:{scope}'
+
+
+def get_versions(scopes):
+    """Return the current version stamp of each scope, starting missing ones."""
+    cache = caches[PAGE_CACHE_ALIAS]
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+
+    # Start from the clock so a stamp lost to eviction never repeats an old one
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def _bump(scopes):
+    cache = caches[PAGE_CACHE_ALIAS]
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), timeout=None)
+
+
+def invalidate_pages(categories=()):
+    """Purge the cached listing pages and the pages of the given categories."""
+    scopes = [LISTING_SCOPE] + sorted({category_scope(category) for category in categories if category})
+    invalidate_now_and_on_commit(lambda: _bump(scopes))
+
+
+def invalidate_auction_pages(auction_ids, featured=False):
+    """
+    Purge the cached pages showing the live price or counters of the given auctions.
+
+    Those are their category pages and the index page, plus with featured
+    the home page if one of them is featured there. The listing scope is
+    left alone, as the categories and their counts did not change.
+    """
+    if not auction_ids:
+        return
+    scopes = sorted({
+        category_scope(category)
+        for category in Auction.objects.filter(id__in=auction_ids).values_list('category', flat=True).distinct()
+    })
+    if featured and set(auction_ids) & set(featured_auctions().values_list('id', flat=True)):
+        scopes.append(FEATURED_SCOPE)
+    invalidate_now_and_on_commit(lambda: _bump(scopes))
+
+
+def cache_anonymous_page(scopes):
+    """
+    Cache a view's responses for anonymous GET requests.
+
+    scopes maps the view's URL arguments to the version scopes the page depends on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if (timeout <= 0 or request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                    or len(get_messages(request))):
+                return view(request, *args, **kwargs)
+
+            cache = caches[PAGE_CACHE_ALIAS]
+            versions = get_versions(scopes(*args, **kwargs))
+            query = sorted(request.GET.lists())
+            key = 'pagecache:page:' + hashlib.md5(repr((request.path, query, versions)).encode()).hexdigest()
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,200 @@
+"""
+Keyset (cursor) pagination for auction listings and comment threads.
+
+Pages are addressed by an opaque cursor holding the (key, id) of the row at
+the page boundary instead of an OFFSET, so page 500 costs the same index
+range scan as page 1 and no COUNT(*) over the whole table is needed. The
+key is created_at (newest first) or watcher_count (most watched first).
+"""
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import Auction
+
+
+# Query string parameters carrying the cursor and sort order
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+SORT_PARAM = 'sort'
+
+# Sort orders accepted in SORT_PARAM, mapped to their (indexed) key field
+SORT_KEYS = {
+    'newest': 'created_at',
+    'popular': 'watcher_count',
+    'price': 'current_bid',
+}
+
+
+def encode_cursor(auction, key='created_at'):
+    """Encode the (key, id) of an auction as a URL-safe token."""
+    value = getattr(auction, key)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = f"{value}|{auction.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, key='created_at', model=Auction):
+    """Decode a token from encode_cursor(), returning None if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        value = model._meta.get_field(key).to_python(value)
+        return (value, int(row_id)) if value is not None else None
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+        return None
+
+
+class CursorPage:
+    """One page of results with links to its neighbours."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, estimated_total, total_is_estimate):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_total = estimated_total
+        self.total_is_estimate = total_is_estimate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset (auctions, or any model with the key field) by (key, id), highest first.
+
+    Args:
+        queryset: The rows to paginate (any existing ordering is replaced)
+        per_page: Number of auctions per page
+        key: Field to order by, 'created_at' (default), 'watcher_count' or 'current_bid'
+        estimate_cap: Count at most this many rows for the total; larger result
+            sets report "estimate_cap+" instead of paying for an exact COUNT(*).
+            Pass None to skip the total entirely.
+    """
+
+    def __init__(self, queryset, per_page, estimate_cap=1000, key='created_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.estimate_cap = estimate_cap
+        self.key = key
+
+    def page(self, after=None, before=None):
+        """Return the page following the `after` cursor, or preceding the `before` cursor."""
+        key = self.key
+        model = self.queryset.model
+        after_key = decode_cursor(after, key, model) if after else None
+        before_key = decode_cursor(before, key, model) if before else None
+
+        if before_key:
+            value, row_id = before_key
+            rows = list(
+                self.queryset.filter(
+                    Q(**{f'{key}__gte': value}) & (Q(**{f'{key}__gt': value}) | Q(id__gt=row_id))
+                ).order_by(key, 'id')[:self.per_page + 1]
+            )
+            has_more_before = len(rows) > self.per_page
+            object_list = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more_before, True
+        else:
+            rows = self.queryset.order_by(f'-{key}', '-id')
+            if after_key:
+                value, row_id = after_key
+                # The redundant bound lets the database seek the index instead of scanning to the cursor
+                rows = rows.filter(
+                    Q(**{f'{key}__lte': value}) & (Q(**{f'{key}__lt': value}) | Q(id__lt=row_id))
+                )
+            rows = list(rows[:self.per_page + 1])
+            object_list = rows[:self.per_page]
+            has_previous, has_next = after_key is not None, len(rows) > self.per_page
+
+        next_cursor = encode_cursor(object_list[-1], key) if has_next and object_list else None
+        previous_cursor = encode_cursor(object_list[0], key) if has_previous and object_list else None
+
+        estimated_total, total_is_estimate = self.estimate_total()
+        return CursorPage(object_list, next_cursor, previous_cursor, estimated_total, total_is_estimate)
+
+    def estimate_total(self):
+        """Return (total, is_estimate), counting no more than estimate_cap + 1 rows."""
+        if self.estimate_cap is None:
+            return None, False
+        counted = self.queryset.order_by()[:self.estimate_cap + 1].count()
+        if counted > self.estimate_cap:
+            return self.estimate_cap, True
+        return counted, False
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Paginate the union of several disjoint querysets by (key, id), highest first.
+
+    Each queryset is paged on its own and the pages are merged, so a filter
+    such as category IN (a, b) costs one short range scan of the (category,
+    key, id) index per value instead of sorting every matching row. Totals
+    are not counted.
+    """
+
+    def __init__(self, querysets, per_page, key='created_at'):
+        super().__init__(querysets[0], per_page, estimate_cap=None, key=key)
+        self.querysets = querysets
+
+    def page(self, after=None, before=None):
+        key = self.key
+        model = self.queryset.model
+        pages = [
+            CursorPaginator(queryset, self.per_page, estimate_cap=None, key=key).page(after=after, before=before)
+            for queryset in self.querysets
+        ]
+        rows = sorted(
+            (row for page in pages for row in page),
+            key=lambda row: (getattr(row, key), row.id),
+            reverse=True
+        )
+
+        if before and decode_cursor(before, key, model):
+            object_list = rows[-self.per_page:]
+            has_previous = len(rows) > self.per_page or any(page.has_previous() for page in pages)
+            has_next = True
+        else:
+            object_list = rows[:self.per_page]
+            has_previous = bool(after and decode_cursor(after, key, model))
+            has_next = len(rows) > self.per_page or any(page.has_next() for page in pages)
+
+        next_cursor = encode_cursor(object_list[-1], key) if has_next and object_list else None
+        previous_cursor = encode_cursor(object_list[0], key) if has_previous and object_list else None
+        return CursorPage(object_list, next_cursor, previous_cursor, None, False)
+
+
+def paginate_auctions(request, queryset, per_page=12, estimate_cap=1000):
+    """
+    Return the CursorPage selected by the request's sort/after/before query parameters.
+
+    queryset may also be a list of disjoint querysets to merge (see MergedCursorPaginator).
+    """
+    key = SORT_KEYS.get(request.GET.get(SORT_PARAM), SORT_KEYS['newest'])
+    querysets = queryset if isinstance(queryset, list) else [queryset]
+    if len(querysets) > 1:
+        paginator = MergedCursorPaginator(querysets, per_page, key=key)
+    else:
+        paginator = CursorPaginator(querysets[0], per_page, estimate_cap=estimate_cap, key=key)
+    return paginator.page(
+        after=request.GET.get(AFTER_PARAM),
+        before=request.GET.get(BEFORE_PARAM)
+    )
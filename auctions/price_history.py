@@ -0,0 +1,202 @@
+"""
+Price history of auctions, downsampled for charting.
+
+Every bid is timestamped and also folded into a PriceRollup row per
+auction and BUCKET_SECONDS time bucket (lowest and highest amount, first and
+last bid time, bid count), maintained from the Bid post_save signal. Bids
+deleted or written without signals are only reflected after
+`manage.py rebuild_price_history`.
+
+price_series() reads the raw bids of auctions with at most RAW_BID_LIMIT
+bids and reduces them with Largest-Triangle-Three-Buckets, which keeps the
+visually significant points. Busier auctions are read from their rollups
+instead, merged into at most points / 2 groups of which the lowest and
+highest price are kept, so a chart of tens of thousands of bids reads a few
+hundred rows. Series are cached under the auction's bid_count.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
+
+from .models import Bid, PriceRollup
+
+
+# Width of a rollup bucket
+BUCKET_SECONDS = 300
+
+# Auctions with more bids than this are charted from their rollups
+RAW_BID_LIMIT = 5000
+
+# Points returned by default, and the range clients may ask for
+DEFAULT_POINTS = 200
+MIN_POINTS = 10
+MAX_POINTS = 1000
+
+RESOLUTION_BIDS = 'bids'
+RESOLUTION_BUCKETS = 'buckets'
+
+
+def bucket_start(moment):
+    """Start of the rollup bucket a moment falls into."""
+    seconds = int(moment.timestamp()) // BUCKET_SECONDS * BUCKET_SECONDS
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def record_bid(bid):
+    """Fold a new bid into its auction's rollup bucket."""
+    bucket = bucket_start(bid.created_at)
+    rollups = PriceRollup.objects.filter(auction_id=bid.auction_id, bucket=bucket)
+    values = {
+        'low': Least(F('low'), bid.amount),
+        'high': Greatest(F('high'), bid.amount),
+        'first_bid_at': Least(F('first_bid_at'), bid.created_at),
+        'last_bid_at': Greatest(F('last_bid_at'), bid.created_at),
+        'bid_count': F('bid_count') + 1,
+    }
+    if not rollups.update(**values):
+        _, created = PriceRollup.objects.get_or_create(
+            auction_id=bid.auction_id,
+            bucket=bucket,
+            defaults={
+                'low': bid.amount, 'high': bid.amount, 'first_bid_at': bid.created_at,
+                'last_bid_at': bid.created_at, 'bid_count': 1,
+            }
+        )
+        if not created:
+            rollups.update(**values)
+
+
+def rebuild_price_history(auction_ids=None):
+    """Recompute the rollups of the given auctions (default: all) from their bids, returning the rows written."""
+    bids = Bid.objects.filter(auction__isnull=False)
+    if auction_ids is not None:
+        bids = bids.filter(auction_id__in=auction_ids)
+
+    rollups = {}
+    for auction_id, created_at, amount in bids.values_list('auction_id', 'created_at', 'amount').iterator():
+        key = (auction_id, bucket_start(created_at))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollups[key] = PriceRollup(
+                auction_id=auction_id, bucket=key[1], low=amount, high=amount,
+                first_bid_at=created_at, last_bid_at=created_at, bid_count=1
+            )
+            continue
+        rollup.low, rollup.high = min(rollup.low, amount), max(rollup.high, amount)
+        rollup.first_bid_at = min(rollup.first_bid_at, created_at)
+        rollup.last_bid_at = max(rollup.last_bid_at, created_at)
+        rollup.bid_count += 1
+
+    with transaction.atomic():
+        stale = PriceRollup.objects.all()
+        if auction_ids is not None:
+            stale = stale.filter(auction_id__in=auction_ids)
+        stale.delete()
+        PriceRollup.objects.bulk_create(rollups.values(), batch_size=1000)
+    return len(rollups)
+
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    slices in between, the point forming the largest triangle with the
+    previously kept point and the average of the next slice.
+
+    Args:
+        xs: Ascending x values
+        ys: y value of each point
+        threshold: Points to keep
+
+    Returns:
+        Indexes of the kept points, ascending
+    """
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    kept = [0]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+    for slice_index in range(threshold - 2):
+        start = int(slice_index * every) + 1
+        end = int((slice_index + 1) * every) + 1
+        next_end = min(int((slice_index + 2) * every) + 1, count)
+
+        next_xs, next_ys = xs[end:next_end], ys[end:next_end]
+        average_x = sum(next_xs) / len(next_xs)
+        average_y = sum(next_ys) / len(next_ys)
+
+        ax, ay = xs[previous], ys[previous]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((ax - average_x) * (ys[index] - ay) - (ax - xs[index]) * (average_y - ay))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+
+def _bid_points(auction_id, points):
+    bids = list(
+        Bid.objects.filter(auction_id=auction_id)
+        .order_by('created_at', 'id')
+        .values_list('created_at', 'amount')
+    )
+    kept = lttb([at.timestamp() for at, _ in bids], [float(amount) for _, amount in bids], points)
+    return [bids[index] for index in kept]
+
+
+def _bucket_points(auction_id, points):
+    rollups = list(
+        PriceRollup.objects.filter(auction_id=auction_id)
+        .order_by('bucket')
+        .values_list('first_bid_at', 'last_bid_at', 'low', 'high')
+    )
+    groups = max(points // 2, 1)
+    size = -(-len(rollups) // groups)
+
+    series = []
+    for start in range(0, len(rollups), size):
+        group = rollups[start:start + size]
+        first_at, last_at = group[0][0], group[-1][1]
+        low, high = min(row[2] for row in group), max(row[3] for row in group)
+        # Accepted bids only ever raise the price, so the low comes first
+        series.append((first_at, low))
+        if last_at != first_at or high != low:
+            series.append((last_at, high))
+    return series
+
+
+def price_series(auction, points=DEFAULT_POINTS):
+    """
+    Downsampled price history of an auction, oldest first.
+
+    Args:
+        auction: The auction, with an up-to-date bid_count
+        points: Most points to return (MIN_POINTS to MAX_POINTS)
+
+    Returns:
+        (resolution, [(time, amount), ...]), resolution being RESOLUTION_BIDS
+        when the points are actual bids and RESOLUTION_BUCKETS when they are
+        the lowest and highest price of merged rollup buckets
+    """
+    points = min(max(points, MIN_POINTS), MAX_POINTS)
+    key = f'price-history:{auction.id}:{auction.bid_count}:{points}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    if auction.bid_count > RAW_BID_LIMIT:
+        result = (RESOLUTION_BUCKETS, _bucket_points(auction.id, points))
+    else:
+        result = (RESOLUTION_BIDS, _bid_points(auction.id, points))
+    cache.set(key, result, settings.PRICE_HISTORY_CACHE_TIMEOUT)
+    return result
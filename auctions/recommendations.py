@@ -0,0 +1,218 @@
+"""
+Related-auction recommendations.
+
+Open auctions are compared by TF-IDF vectors of their title and description
+(cosine similarity, plus a small bonus for sharing a category). Terms are
+hashed into N_FEATURES buckets, so there is no vocabulary to keep and a few
+auctions can be refreshed without rebuilding everything. The vectors are
+kept in compressed sparse row form, only their nonzero weights in memory,
+and scored block by block against blocks of candidates, keeping a running
+top k, so memory does not grow with the square of the open auctions or
+with N_FEATURES per auction. The TOP_K best
+matches of each auction are stored in RelatedAuction, which the detail page
+reads in one indexed query.
+
+Run `manage.py rebuild_recommendations` periodically (a full rebuild also
+lets new auctions appear in other auctions' lists) and with --missing more
+often to cover auctions created since.
+"""
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+
+from .models import Auction, RelatedAuction
+
+
+# Hashed feature space
+N_FEATURES = 2 ** 11
+
+# Recommendations stored per auction
+TOP_K = 8
+
+# Title terms count this many times more than description terms
+TITLE_WEIGHT = 2
+
+# Added to the similarity of auctions in the same category
+CATEGORY_BONUS = 0.1
+
+# Auctions whose neighbours are found together, and candidates scored against
+# them per matrix product. A product densifies both blocks, so memory stays
+# around (BLOCK_SIZE + CANDIDATE_BLOCK_SIZE) * N_FEATURES * 4 bytes
+BLOCK_SIZE = 512
+CANDIDATE_BLOCK_SIZE = 4096
+
+# Words in any script (Arabic titles included), as in search.fts5_query()
+TOKEN_RE = re.compile(r'\w+')
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its new of on or
+    the this that to with without very good great condition item comes used
+""".split())
+
+
+def tokenize(text):
+    """Lower-case words of text, without stop words and single characters."""
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in STOP_WORDS]
+
+
+def term_counts(title, description):
+    """Return {feature bucket: weighted count} for an auction's text."""
+    counts = Counter()
+    for weight, text in ((TITLE_WEIGHT, title), (1, description)):
+        for token in tokenize(text or ''):
+            counts[zlib.crc32(token.encode()) % N_FEATURES] += weight
+    return counts
+
+
+class SparseMatrix:
+    """Rows of feature weights in compressed sparse row form."""
+
+    def __init__(self, indptr, indices, data):
+        # Row r holds data[indptr[r]:indptr[r + 1]] in the columns indices[indptr[r]:indptr[r + 1]]
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def dense(self, rows):
+        """Return the given rows as a dense float32 array."""
+        rows = np.asarray(rows)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        # Position of each stored weight of the rows in indices and data
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        block = np.zeros((len(rows), N_FEATURES), dtype=np.float32)
+        block[owner, self.indices[positions]] = self.data[positions]
+        return block
+
+
+def build_matrix(documents):
+    """Build L2-normalised TF-IDF vectors of (title, description) pairs with sublinear term frequencies."""
+    indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+    indices, counts = [], []
+    for row, (title, description) in enumerate(documents):
+        document_counts = term_counts(title, description)
+        indices += document_counts.keys()
+        counts += document_counts.values()
+        indptr[row + 1] = len(indices)
+    indices = np.array(indices, dtype=np.int64)
+    data = 1 + np.log(np.array(counts, dtype=np.float32))
+
+    document_frequency = np.bincount(indices, minlength=N_FEATURES)
+    data *= (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)[indices]
+
+    # Every stored weight is positive, so rows with any term have a nonzero norm
+    owner = np.repeat(np.arange(len(documents)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(owner, weights=data * data, minlength=len(documents))).astype(np.float32)
+    data /= norms[owner]
+    return SparseMatrix(indptr, indices, data)
+
+
+def nearest_neighbours(matrix, categories, rows, k=TOP_K):
+    """
+    Find the k best matches of some rows of a build_matrix() matrix among all of its rows.
+
+    categories is an array with the category of each row. Yields
+    (row, [(neighbour row, score), ...]) with the best match first.
+    """
+    k = min(k, len(matrix) - 1)
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = np.asarray(rows[start:start + BLOCK_SIZE])
+        if k <= 0:
+            yield from ((int(row), []) for row in block)
+            continue
+
+        queries = matrix.dense(block)
+        best_scores = np.full((len(block), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(block), k), dtype=np.int64)
+        for candidate_start in range(0, len(matrix), CANDIDATE_BLOCK_SIZE):
+            candidates = np.arange(candidate_start, min(candidate_start + CANDIDATE_BLOCK_SIZE, len(matrix)))
+            scores = queries @ matrix.dense(candidates).T
+            scores += CATEGORY_BONUS * (categories[block, None] == categories[None, candidates])
+            scores[block[:, None] == candidates[None, :]] = -np.inf
+
+            # Keep the k best of the previous best and this block's candidates
+            scores = np.hstack([best_scores, scores])
+            candidate_rows = np.hstack([best_rows, np.broadcast_to(candidates, (len(block), len(candidates)))])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(candidate_rows, top, axis=1)
+
+        for i, row in enumerate(block):
+            order = np.argsort(-best_scores[i], kind='stable')
+            yield int(row), [
+                (int(best_rows[i, j]), float(best_scores[i, j])) for j in order if best_scores[i, j] > 0
+            ]
+
+
+def rebuild_recommendations(auction_ids=None, missing=False, k=TOP_K):
+    """
+    Recompute stored recommendations.
+
+    Candidates are always every open auction. Without arguments every open
+    auction's list is rebuilt and lists of closed auctions are dropped.
+
+    Args:
+        auction_ids: Only rebuild the lists of these auctions
+        missing: Only rebuild open auctions that have no list yet
+        k: Recommendations stored per auction
+
+    Returns:
+        The number of auctions whose recommendations were written
+    """
+    open_auctions = list(
+        Auction.objects.filter(is_close=False).order_by('id').values_list('id', 'category', 'title', 'description')
+    )
+    ids = [auction[0] for auction in open_auctions]
+    position = {auction_id: row for row, auction_id in enumerate(ids)}
+
+    full = auction_ids is None and not missing
+    if missing:
+        auction_ids = Auction.objects.filter(is_close=False, recommendations__isnull=True).values_list('id', flat=True)
+    if full:
+        auction_ids = ids
+    targets = sorted(position[auction_id] for auction_id in set(auction_ids) if auction_id in position)
+
+    recommendations = []
+    if targets:
+        matrix = build_matrix([(title, description) for _, _, title, description in open_auctions])
+        categories = np.array([category for _, category, _, _ in open_auctions])
+        for row, neighbours in nearest_neighbours(matrix, categories, targets, k):
+            recommendations += [
+                RelatedAuction(auction_id=ids[row], related_id=ids[neighbour], rank=rank, score=score)
+                for rank, (neighbour, score) in enumerate(neighbours)
+            ]
+
+    with transaction.atomic():
+        stale = RelatedAuction.objects.all()
+        if not full:
+            stale = stale.filter(auction_id__in=[ids[row] for row in targets])
+        stale.delete()
+        RelatedAuction.objects.bulk_create(recommendations, batch_size=1000)
+    return len(targets)
+
+
+def related_auctions(auction, limit=4):
+    """
+    Open auctions to show next to an auction, best match first.
+
+    Auctions without a stored list yet fall back to the newest open auctions
+    in the same category.
+    """
+    related = list(
+        Auction.objects.filter(recommended_with__auction=auction.id, is_close=False)
+        .order_by('recommended_with__rank')[:limit]
+    )
+    if related:
+        return related
+    return list(
+        Auction.objects.filter(category=auction.category, is_close=False)
+        .exclude(id=auction.id)
+        .order_by('-created_at')[:limit]
+    )
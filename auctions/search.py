@@ -0,0 +1,199 @@
+"""
+Full-text search over auction titles and descriptions.
+
+On SQLite the index is the auctions_auction_fts FTS5 virtual table (rowid is
+the auction id), kept in sync from Auction signals. On PostgreSQL a GIN
+expression index over SEARCH_VECTOR_SQL is used and needs no syncing. Other
+backends fall back to icontains filtering.
+"""
+import re
+
+from django.db import connection
+
+from .models import Auction
+
+
+FTS_TABLE = 'auctions_auction_fts'
+
+# Must match the expression indexed by migration 0004 exactly
+SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('english', coalesce(auctions_auction.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(auctions_auction.description, '')), 'B'))"
+)
+
+# Relative weight of title vs. description matches in FTS5 bm25() ranking
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Status filter values accepted by search_auctions()
+STATUS_OPEN = 'open'
+STATUS_CLOSED = 'closed'
+
+
+def uses_fts5():
+    return connection.vendor == 'sqlite'
+
+
+def fts5_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term ("iphone"* "pro"*) so punctuation
+    or FTS5 operators typed by users can never cause a syntax error.
+    """
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_auction(auction):
+    """Insert or replace an auction's row in the FTS5 index."""
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [auction.id])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)",
+            [auction.id, auction.title, auction.description]
+        )
+
+
+def unindex_auction(auction_id):
+    """Remove an auction from the FTS5 index."""
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [auction_id])
+
+
+def rebuild_index():
+    """Rebuild the FTS5 index from the auction table. Returns the number of rows indexed."""
+    if not uses_fts5():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+            f"SELECT id, title, description FROM auctions_auction"
+        )
+        return cursor.rowcount
+
+
+class SearchResults:
+    """
+    Lazily evaluated, ranked search results.
+
+    Implements count() and slicing so it can be handed straight to Django's
+    Paginator: each page runs one LIMIT/OFFSET query for ids plus one query
+    for the Auction rows, and the total is only counted when asked for.
+    """
+
+    def __init__(self, query, category=None, status=None):
+        self.query = query
+        self.category = category
+        self.status = status
+        self._count = None
+
+    def _filters(self):
+        clauses, params = [], []
+        if self.category:
+            clauses.append("auctions_auction.category = %s")
+            params.append(self.category)
+        if self.status == STATUS_OPEN:
+            clauses.append("auctions_auction.is_close = %s")
+            params.append(False)
+        elif self.status == STATUS_CLOSED:
+            clauses.append("auctions_auction.is_close = %s")
+            params.append(True)
+        return clauses, params
+
+    def _sql(self, select, ranked):
+        """Build the search SQL and its parameters for the active backend."""
+        clauses, params = self._filters()
+
+        if uses_fts5():
+            sql = (
+                f"SELECT {select} FROM {FTS_TABLE} "
+                f"JOIN auctions_auction ON auctions_auction.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s"
+            )
+            params = [fts5_query(self.query)] + params
+            order = f"bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}), auctions_auction.id DESC"
+        else:
+            sql = (
+                f"SELECT {select} FROM auctions_auction "
+                f"WHERE {SEARCH_VECTOR_SQL} @@ websearch_to_tsquery('english', %s)"
+            )
+            params = [self.query] + params
+            order = f"ts_rank({SEARCH_VECTOR_SQL}, websearch_to_tsquery('english', %s)) DESC, auctions_auction.id DESC"
+            if ranked:
+                params = params + [self.query]
+
+        for clause in clauses:
+            sql += f" AND {clause}"
+        if ranked:
+            sql += f" ORDER BY {order}"
+        return sql, params
+
+    def count(self):
+        if self._count is None:
+            if not self.query.strip() or (uses_fts5() and not fts5_query(self.query)):
+                self._count = 0
+            elif connection.vendor not in ('sqlite', 'postgresql'):
+                self._count = self._fallback().count()
+            else:
+                sql, params = self._sql("COUNT(*)", ranked=False)
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if stop <= start or not self.query.strip():
+            return []
+
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            return list(self._fallback()[start:stop])
+        if uses_fts5() and not fts5_query(self.query):
+            return []
+
+        sql, params = self._sql("auctions_auction.id", ranked=True)
+        sql += " LIMIT %s OFFSET %s"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        auctions = Auction.objects.in_bulk(ids)
+        return [auctions[auction_id] for auction_id in ids if auction_id in auctions]
+
+    def _fallback(self):
+        auctions = Auction.objects.filter(title__icontains=self.query) | Auction.objects.filter(
+            description__icontains=self.query
+        )
+        if self.category:
+            auctions = auctions.filter(category=self.category)
+        if self.status in (STATUS_OPEN, STATUS_CLOSED):
+            auctions = auctions.filter(is_close=self.status == STATUS_CLOSED)
+        return auctions.order_by('-created_at', '-id')
+
+
+def search_auctions(query, category=None, status=None):
+    """
+    Search auctions by title and description.
+
+    Args:
+        query: Free text entered by the user
+        category: Optional CATEGORY_CHOICES key to restrict results to
+        status: Optional 'open' or 'closed'
+
+    Returns:
+        A SearchResults object, ranked best match first
+    """
+    return SearchResults(query, category=category, status=status)
@@ -0,0 +1,215 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .counters import WatchedAuction, adjust_comments, adjust_watchers, record_bidder
+from .images import generate_auction_derivatives, queue_remote_image
+from .events import auction_state, get_broker, publish_auction_event
+from .facets import FACET_FIELDS, facet_state, record_facet_changes
+from .models import Auction, Bid, Comment, Watchlist
+from .page_cache import invalidate_auction_pages, invalidate_pages
+from .price_history import record_bid as record_price
+from .search import index_auction, unindex_auction
+from .stats import record_auction_change, record_bid
+from .watchlist import invalidate_watched_ids
+
+
+def publish_state(auction_id, event_type):
+    """Publish the committed state of an auction to live subscribers."""
+    # Nobody is streaming this auction: skip reading its state
+    if not get_broker().has_listeners(auction_id):
+        return
+    auction = Auction.objects.select_related('leader').filter(pk=auction_id).first()
+    if auction:
+        publish_auction_event(auction_id, event_type, auction_state(auction))
+
+
+@receiver(post_save, sender=Bid)
+def bid_event(sender, instance, created, **kwargs):
+    """Push new bids (and the resulting price) once the bid is committed."""
+    if created and instance.auction_id:
+        auction_id = instance.auction_id
+        transaction.on_commit(lambda: publish_state(auction_id, 'bid'))
+
+
+@receiver(post_save, sender=Auction)
+def close_event(sender, instance, update_fields=None, **kwargs):
+    """Push a close event when an auction is closed."""
+    if instance.is_close and (update_fields is None or 'is_close' in update_fields):
+        auction_id = instance.id
+        transaction.on_commit(lambda: publish_state(auction_id, 'close'))
+
+
+@receiver(post_save, sender=Auction)
+def search_index_auction(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text index in sync when an auction's text changes."""
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        index_auction(instance)
+
+
+@receiver(post_delete, sender=Auction)
+def search_unindex_auction(sender, instance, **kwargs):
+    """Drop deleted auctions from the full-text index."""
+    unindex_auction(instance.id)
+
+
+# Runs before category_stats_auction_saved() replaces the remembered old state
+@receiver(post_save, sender=Auction)
+@receiver(post_delete, sender=Auction)
+def page_cache_auction(sender, instance, **kwargs):
+    """Purge the cached pages listing an auction (and its old category if it moved)."""
+    old_state = getattr(instance, '_stats_state', None)
+    invalidate_pages({instance.category, old_state[0] if old_state else None})
+
+
+@receiver(post_save, sender=Auction)
+def facet_counts_auction_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Count new auctions and auctions whose category, price, status or image changed."""
+    if update_fields is not None and not FACET_FIELDS & set(update_fields):
+        return
+
+    old_values = None if created else getattr(instance, '_facet_values', None)
+    if created or old_values:
+        new_values = instance.facet_values()
+        record_facet_changes([(facet_state(old_values), facet_state(new_values))])
+        instance._facet_values = new_values
+
+
+@receiver(post_delete, sender=Auction)
+def facet_counts_auction_deleted(sender, instance, **kwargs):
+    """Remove deleted auctions from their facet counts."""
+    old_values = getattr(instance, '_facet_values', None) or instance.facet_values()
+    record_facet_changes([(facet_state(old_values), None)])
+
+
+@receiver(post_save, sender=Auction)
+def category_stats_auction_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Count new auctions and auctions that were closed or re-categorised."""
+    if update_fields is not None and not {'category', 'is_close'} & set(update_fields):
+        return
+
+    old_state = None if created else getattr(instance, '_stats_state', None)
+    if created or old_state:
+        record_auction_change(old_state, (instance.category, instance.is_close))
+    instance.remember_stats_state()
+
+
+@receiver(post_delete, sender=Auction)
+def category_stats_auction_deleted(sender, instance, **kwargs):
+    """Remove deleted auctions from their category's counts."""
+    old_state = getattr(instance, '_stats_state', None) or (instance.category, instance.is_close)
+    record_auction_change(old_state, None)
+
+
+@receiver(post_save, sender=Bid)
+def category_stats_bid(sender, instance, created, **kwargs):
+    """Refresh the category price range once a new bid is committed."""
+    if created and instance.auction_id:
+        auction_id = instance.auction_id
+        transaction.on_commit(lambda: record_bid(auction_id))
+
+
+@receiver(m2m_changed, sender=Watchlist.auctions.through)
+def watchlist_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached watched auction ids when a watchlist changes."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif pk_set:
+        user_ids = Watchlist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+    else:
+        user_ids = instance.watchlisted.values_list('user_id', flat=True)
+    invalidate_watched_ids(list(user_ids))
+
+
+@receiver(m2m_changed, sender=Watchlist.auctions.through)
+def watcher_counter(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Auction.watcher_count in step with watchlist additions and removals."""
+    if action == 'post_add' and pk_set:
+        # Django only reports the rows it actually inserted
+        if reverse:
+            adjust_watchers([instance.pk], len(pk_set))
+        else:
+            adjust_watchers(pk_set, 1)
+        return
+
+    # Removals report what was asked for, so count the rows that really exist
+    if action not in ('pre_remove', 'pre_clear'):
+        return
+    if reverse:
+        rows = WatchedAuction.objects.filter(auction=instance)
+        if action == 'pre_remove':
+            rows = rows.filter(watchlist_id__in=pk_set)
+        adjust_watchers([instance.pk], -rows.count())
+    else:
+        rows = WatchedAuction.objects.filter(watchlist=instance)
+        if action == 'pre_remove':
+            rows = rows.filter(auction_id__in=pk_set)
+        adjust_watchers(list(rows.values_list('auction_id', flat=True)), -1)
+
+
+@receiver(pre_delete, sender=Watchlist)
+def watcher_counter_watchlist_deleted(sender, instance, **kwargs):
+    """Stop counting the watchers of a deleted watchlist (its rows cascade without m2m_changed)."""
+    adjust_watchers(list(WatchedAuction.objects.filter(watchlist=instance).values_list('auction_id', flat=True)), -1)
+
+
+@receiver(post_save, sender=Bid)
+def bidder_counter(sender, instance, created, **kwargs):
+    """Count each user's first bid on an auction."""
+    if created and instance.auction_id and instance.user_id:
+        record_bidder(instance)
+
+
+@receiver(post_save, sender=Bid)
+def price_rollup(sender, instance, created, **kwargs):
+    """Fold new bids into their auction's price history rollups."""
+    if created and instance.auction_id:
+        record_price(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_counter_added(sender, instance, created, **kwargs):
+    """Count new comments on their auction."""
+    if created:
+        adjust_comments(instance.auction_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_counter_removed(sender, instance, **kwargs):
+    """Uncount deleted comments."""
+    adjust_comments(instance.auction_id, -1)
+
+
+@receiver(post_save, sender=Auction)
+def image_derivatives(sender, instance, update_fields=None, **kwargs):
+    """Render the card, detail and zoom sizes of a new upload once it is committed."""
+    if instance.image and (update_fields is None or 'image' in update_fields):
+        image_name = instance.image.name
+        transaction.on_commit(lambda: generate_auction_derivatives(instance.pk, image_name))
+
+
+@receiver(post_save, sender=Auction)
+def remote_image_copy(sender, instance, update_fields=None, **kwargs):
+    """Start copying a new external image into the media store once the auction is committed."""
+    if not instance.image and instance.image_url and (update_fields is None or 'image_url' in update_fields):
+        image_url = instance.image_url
+        transaction.on_commit(lambda: queue_remote_image(image_url))
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+def page_cache_bid(sender, instance, **kwargs):
+    """Purge the cached pages showing the price of the auction bid on."""
+    if instance.auction_id:
+        invalidate_auction_pages([instance.auction_id], featured=True)
+
+
+@receiver(m2m_changed, sender=Watchlist.auctions.through)
+def page_cache_watchlist(sender, instance, action, reverse, pk_set, **kwargs):
+    """Purge the cached pages showing the watcher counts that changed."""
+    if action in ('post_add', 'post_remove') and pk_set:
+        invalidate_auction_pages([instance.pk] if reverse else list(pk_set))
+    elif action == 'pre_clear':
+        invalidate_auction_pages([instance.pk] if reverse else list(instance.auctions.values_list('id', flat=True)))
@@ -0,0 +1,108 @@
+"""
+Per-category statistics read model.
+
+CategoryStats rows are kept up to date incrementally from Auction and Bid
+signals so category navigation never has to aggregate the auction table.
+Counts are adjusted with F() expressions; the open price range is re-read
+with two index seeks on (category, is_close, current_bid). Anything that
+bypasses the ORM signals (bulk updates, raw SQL) should be followed by
+`manage.py rebuild_category_stats`.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, Max, Min, Q, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CATEGORY_CHOICES, Auction, CategoryStats
+
+
+def _update(category, **values):
+    """Apply an UPDATE to a category's row, creating the row first if needed."""
+    if not CategoryStats.objects.filter(category=category).update(**values):
+        CategoryStats.objects.get_or_create(category=category)
+        CategoryStats.objects.filter(category=category).update(**values)
+
+
+def _open_price(category, ordering):
+    return Subquery(
+        Auction.objects.filter(category=category, is_close=False)
+        .order_by(ordering)
+        .values('current_bid')[:1]
+    )
+
+
+def refresh_price_range(category):
+    """Re-read the min/max current price of the open auctions in a category."""
+    _update(
+        category,
+        min_price=_open_price(category, 'current_bid'),
+        max_price=_open_price(category, '-current_bid'),
+        last_activity=timezone.now()
+    )
+
+
+def adjust_counts(category, is_close, delta):
+    """Add delta (+1 or -1) auctions in the given state to a category's counts."""
+    values = {'total_count': Greatest(F('total_count') + delta, 0)}
+    if not is_close:
+        values['open_count'] = Greatest(F('open_count') + delta, 0)
+    _update(category, **values)
+
+
+def record_auction_change(old_state, new_state):
+    """Move an auction between (category, is_close) states, None meaning created or deleted."""
+    if old_state == new_state:
+        return
+    if old_state:
+        adjust_counts(*old_state, -1)
+    if new_state:
+        adjust_counts(*new_state, 1)
+
+    for category in {state[0] for state in (old_state, new_state) if state}:
+        refresh_price_range(category)
+
+
+def record_auctions_closed(categories):
+    """Move auctions closed in bulk from open to closed, given the category of each one."""
+    for category, closed in Counter(categories).items():
+        _update(category, open_count=Greatest(F('open_count') - closed, 0))
+        refresh_price_range(category)
+
+
+def rebuild_category_stats():
+    """Recompute every category's statistics, returning the number of categories written."""
+    summary = {
+        row['category']: row
+        for row in Auction.objects.values('category').annotate(
+            total=Count('id'),
+            open=Count('id', filter=Q(is_close=False)),
+            min_price=Min('current_bid', filter=Q(is_close=False)),
+            max_price=Max('current_bid', filter=Q(is_close=False)),
+            last_created=Max('created_at')
+        ).order_by()
+    }
+
+    categories = [key for key, label in CATEGORY_CHOICES]
+    categories += [category for category in summary if category not in categories]
+
+    for category in categories:
+        row = summary.get(category, {})
+        CategoryStats.objects.update_or_create(
+            category=category,
+            defaults={
+                'total_count': row.get('total', 0),
+                'open_count': row.get('open', 0),
+                'min_price': row.get('min_price'),
+                'max_price': row.get('max_price'),
+                'last_activity': row.get('last_created'),
+            }
+        )
+    return len(categories)
+
+
+def record_bid(auction_id):
+    """Refresh the price range of the category an auction that received a bid belongs to."""
+    category = Auction.objects.filter(pk=auction_id).values_list('category', flat=True).first()
+    if category:
+        refresh_price_range(category)
@@ -0,0 +1,39 @@
+from django import template
+
+from auctions.images import derivative_url, srcset
+
+register = template.Library()
+
+# Layout widths used for the sizes attribute of each rendition
+SIZES = {
+    'card': '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw',
+    'detail': '(min-width: 1024px) 60vw, 100vw',
+    'zoom': '100vw',
+}
+
+
+@register.simple_tag
+def image_url(auction, size='card', fmt='jpeg'):
+    """URL of one rendition of an auction's image"""
+    return derivative_url(auction, size, fmt)
+
+
+@register.simple_tag
+def image_srcset(auction, fmt='webp'):
+    """srcset value listing every rendition of an auction's image"""
+    return srcset(auction, fmt)
+
+
+@register.inclusion_tag('auctions/partials/auction_picture.html')
+def auction_picture(auction, size='card', css_class='', img_id='', zoom=False):
+    """Responsive <picture> for an auction's image (WebP with JPEG fallback)"""
+    return {
+        'auction': auction,
+        'src': derivative_url(auction, size, 'jpeg'),
+        'webp_srcset': srcset(auction, 'webp'),
+        'jpeg_srcset': srcset(auction, 'jpeg'),
+        'sizes': SIZES.get(size, '100vw'),
+        'css_class': css_class,
+        'img_id': img_id,
+        'zoom_src': derivative_url(auction, 'zoom', 'jpeg') if zoom else '',
+    }
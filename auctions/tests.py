@@ -1,3 +1,1279 @@
-from django.test import TestCase
+import asyncio
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import User
+from notifications.models import Notification
+from . import images
+from .closing import close_auctions, close_expired_auctions
+from .comments import COMMENTS_PER_PAGE, comment_page
+from .counters import reconcile_counters
+from .images import derivative_name, fetch_remote_image, generate_derivatives, remote_image_name
+from .bidding import (
+    place_bid, refresh_bid_summary, REJECT_CLOSED, REJECT_INVALID_AMOUNT, REJECT_KEY_REUSED, REJECT_TOO_LOW
+)
+from .events import get_broker
+from .facets import facet_counts, parse_facets, rebuild_facets
+from .pagination import CursorPaginator, MergedCursorPaginator
+from .price_history import RAW_BID_LIMIT, RESOLUTION_BIDS, RESOLUTION_BUCKETS, lttb, price_series, rebuild_price_history
+from .recommendations import CATEGORY_BONUS, rebuild_recommendations, related_auctions, tokenize
+from .search import search_auctions
+from .stats import rebuild_category_stats
+from .watchlist import cache_key as watchlist_cache_key, is_watching, watch, watched_auction_ids
+from .views import serve_media
+from .models import Auction, Bid, BidRequest, CategoryStats, Comment, FacetCount, PriceRollup, ProxyBid, RelatedAuction, Watchlist
+
+
+def make_auction(user, **kwargs):
+    """Create an open auction with a starting bid owned by user."""
+    starting_bid = kwargs.pop('starting_bid', Decimal('10.00'))
+    auction = Auction.objects.create(
+        title=kwargs.pop('title', 'Test Phone'),
+        description=kwargs.pop('description', 'A phone in good condition'),
+        price=kwargs.pop('price', Decimal('10.00')),
+        category=kwargs.pop('category', 'smartphones'),
+        user=user,
+        **kwargs
+    )
+    place_bid(auction.id, user, starting_bid)
+    auction.refresh_from_db()
+    return auction
+
+
+class PlaceBidTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        self.auction = make_auction(self.seller)
+
+    def test_higher_bid_is_accepted(self):
+        result = place_bid(self.auction.id, self.bidder, 12.5)
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.bid.amount, Decimal('12.50'))
+        self.assertEqual(result.current_amount, Decimal('12.50'))
+
+    def test_equal_bid_is_rejected(self):
+        result = place_bid(self.auction.id, self.bidder, 10)
+        self.assertFalse(result.accepted)
+        self.assertEqual(result.reason, REJECT_TOO_LOW)
+        self.assertEqual(self.auction.bids.count(), 1)
+
+    def test_closed_auction_is_rejected(self):
+        self.auction.is_close = True
+        self.auction.save()
+        result = place_bid(self.auction.id, self.bidder, 50)
+        self.assertFalse(result.accepted)
+        self.assertEqual(result.reason, REJECT_CLOSED)
+
+    def test_invalid_amount_is_rejected(self):
+        result = place_bid(self.auction.id, self.bidder, 'abc')
+        self.assertEqual(result.reason, REJECT_INVALID_AMOUNT)
+
+    def test_amount_too_large_for_the_money_columns_is_rejected(self):
+        self.assertEqual(place_bid(self.auction.id, self.bidder, '12345678').reason, REJECT_INVALID_AMOUNT)
+        self.assertEqual(place_bid(self.auction.id, self.bidder, 20, max_amount='10000').reason, REJECT_INVALID_AMOUNT)
+        self.assertTrue(place_bid(self.auction.id, self.bidder, '9999.99').accepted)
+
+        self.client.login(username='bidder', password='password123')
+        response = self.client.post('/bid', {'auction_id': self.auction.id, 'bid': '12345678'})
+        self.assertRedirects(response, f'/auction/{self.auction.id}', fetch_redirect_response=False)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_bid, Decimal('9999.99'))
+
+    def test_accepted_bid_updates_summary(self):
+        place_bid(self.auction.id, self.bidder, 20)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_bid, Decimal('20.00'))
+        self.assertEqual(self.auction.bid_count, 2)
+        self.assertEqual(self.auction.leader, self.bidder)
+
+    def test_refresh_bid_summary_repairs_direct_bids(self):
+        Bid.objects.create(amount=Decimal('30.00'), auction=self.auction, user=self.bidder)
+        Auction.objects.filter(pk=self.auction.pk).update(current_bid=0, bid_count=0, leader=None)
+        refresh_bid_summary()
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_bid, Decimal('30.00'))
+        self.assertEqual(self.auction.bid_count, 2)
+        self.assertEqual(self.auction.leader, self.bidder)
+
+    def test_bid_view_places_bid(self):
+        self.client.login(username='bidder', password='password123')
+        response = self.client.post('/bid', {'auction_id': self.auction.id, 'bid': '15'})
+        self.assertRedirects(response, f'/auction/{self.auction.id}', fetch_redirect_response=False)
+        self.assertEqual(self.auction.bids.order_by('-amount').first().user, self.bidder)
+
+
+class ProxyBidTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.alice = User.objects.create_user('alice', password='password123')
+        self.bob = User.objects.create_user('bob', password='password123')
+        self.auction = make_auction(self.seller)
+
+    def assertLeader(self, user, amount):
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.leader_id, self.auction.current_bid), (user.id, Decimal(amount)))
+
+    def test_proxy_outbids_manual_bid_by_one_increment(self):
+        place_bid(self.auction.id, self.alice, 15, max_amount=100)
+        result = place_bid(self.auction.id, self.bob, 20)
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.current_amount, Decimal('21.00'))
+        self.assertLeader(self.alice, '21.00')
+
+    def test_competing_proxies_settle_in_one_step(self):
+        place_bid(self.auction.id, self.alice, 15, max_amount=100)
+        place_bid(self.auction.id, self.bob, 20, max_amount=60)
+        self.assertLeader(self.alice, '61.00')
+        self.assertEqual(
+            list(self.auction.bids.order_by('id').values_list('user__username', 'amount'))[-3:],
+            [('bob', Decimal('20.00')), ('bob', Decimal('60.00')), ('alice', Decimal('61.00'))]
+        )
+
+    def test_earliest_proxy_wins_a_tie(self):
+        place_bid(self.auction.id, self.alice, 15, max_amount=50)
+        result = place_bid(self.auction.id, self.bob, 20, max_amount=50)
+        self.assertLeader(self.alice, '50.00')
+        self.assertIn('automatic bid is higher', result.message)
+
+    def test_low_bid_with_higher_maximum_takes_the_lead(self):
+        place_bid(self.auction.id, self.bob, 30)
+        result = place_bid(self.auction.id, self.alice, 12, max_amount=80)
+        self.assertTrue(result.accepted)
+        self.assertLeader(self.alice, '31.00')
+
+    def test_maximum_below_bid_is_rejected(self):
+        result = place_bid(self.auction.id, self.alice, 20, max_amount=15)
+        self.assertEqual(result.reason, REJECT_INVALID_AMOUNT)
+        self.assertFalse(ProxyBid.objects.exists())
+
+
+class ConcurrentBidTests(TransactionTestCase):
+    """Hammer place_bid() from many threads and check only valid bids commit."""
+
+    threads = 16
+    bids_per_thread = 10
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidders = [
+            User.objects.create_user(f'bidder{i}', password='password123')
+            for i in range(self.threads)
+        ]
+        self.auction = make_auction(self.seller)
+
+    def test_concurrent_bids_never_accept_a_stale_price(self):
+        barrier = threading.Barrier(self.threads)
+        accepted = []
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for step in range(self.bids_per_thread):
+                    # Every thread competes for the same ladder of amounts
+                    amount = Decimal('11.00') + step
+                    result = place_bid(self.auction.id, self.bidders[index], amount)
+                    if result.accepted:
+                        accepted.append(result.bid.amount)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        # Each amount on the ladder can be won by exactly one bidder
+        self.assertEqual(len(accepted), len(set(accepted)))
+        amounts = list(
+            Bid.objects.filter(auction=self.auction).order_by('id').values_list('amount', flat=True)
+        )
+        self.assertEqual(amounts, sorted(amounts))
+        self.assertEqual(len(amounts), len(set(amounts)))
+        self.assertEqual(amounts[-1], Decimal('11.00') + self.bids_per_thread - 1)
+
+        # The denormalized summary agrees with the committed bids
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_bid, amounts[-1])
+        self.assertEqual(self.auction.bid_count, len(amounts))
+
+
+class AuctionEventStreamTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.auction = make_auction(self.seller)
+
+    async def test_stream_sends_snapshot_then_live_events(self):
+        await self.async_client.aforce_login(self.seller)
+        response = await self.async_client.get(f'/auction/{self.auction.id}/events')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        frames = aiter(response.streaming_content)
+        snapshot = await anext(frames)
+        self.assertIn(b'event: price', snapshot)
+        self.assertIn(b'"current_bid": "10.00"', snapshot)
+
+        get_broker().publish(self.auction.id, 'bid', {'current_bid': '12.00', 'is_close': False})
+        frame = await asyncio.wait_for(anext(frames), timeout=5)
+        self.assertIn(b'event: bid', frame)
+        self.assertIn(b'"current_bid": "12.00"', frame)
+        await frames.aclose()
+
+    def test_bids_are_only_published_to_listeners(self):
+        bidder = User.objects.create_user('bidder', password='password123')
+        with mock.patch('auctions.signals.publish_auction_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(self.auction.id, bidder, 20)
+            publish.assert_not_called()
+
+            with mock.patch.object(get_broker(), 'has_listeners', return_value=True), \
+                    self.captureOnCommitCallbacks(execute=True):
+                place_bid(self.auction.id, bidder, 30)
+            publish.assert_called_once()
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.phone = make_auction(self.seller, title='iPhone 15 Pro Max', description='Unlocked, 256GB')
+        self.laptop = make_auction(
+            self.seller, title='MacBook Pro', description='Works with the iPhone charger', category='laptops'
+        )
+
+    def test_title_matches_rank_first(self):
+        results = search_auctions('iphone')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(list(results[0:10]), [self.phone, self.laptop])
+
+    def test_prefix_and_filters(self):
+        self.assertEqual(list(search_auctions('macb')[0:10]), [self.laptop])
+        self.assertEqual(list(search_auctions('iphone', category='laptops')[0:10]), [self.laptop])
+        self.phone.is_close = True
+        self.phone.save(update_fields=['is_close'])
+        self.assertEqual(list(search_auctions('iphone', status='open')[0:10]), [self.laptop])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.phone.title = 'Galaxy S24'
+        self.phone.save()
+        self.assertEqual(search_auctions('galaxy').count(), 1)
+        self.phone.delete()
+        self.assertEqual(search_auctions('galaxy').count(), 0)
+
+    def test_operators_in_user_input_are_harmless(self):
+        self.assertEqual(list(search_auctions('"iphone" (max')[0:10]), [self.phone])
+        self.assertEqual(search_auctions('***').count(), 0)
+
+    def test_search_view(self):
+        response = self.client.get('/search', {'q': 'iphone', 'category': 'smartphones'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['auctions']), [self.phone])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(7)]
+        # Force ties on created_at so the id tie-breaker is exercised
+        Auction.objects.filter(id__in=[a.id for a in self.auctions[2:5]]).update(
+            created_at=self.auctions[2].created_at
+        )
+        self.newest_first = list(Auction.objects.order_by('-created_at', '-id'))
+
+    def test_walk_forward_and_back(self):
+        paginator = CursorPaginator(Auction.objects.all(), per_page=3, estimate_cap=5)
+
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        third = paginator.page(after=second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), self.newest_first)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        self.assertEqual((first.estimated_total, first.total_is_estimate), (5, True))
+
+        back = paginator.page(before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_previous())
+
+    def test_merged_querysets_walk_like_one(self):
+        ids = [auction.id for auction in self.auctions]
+        paginator = MergedCursorPaginator(
+            [Auction.objects.filter(id__in=ids[::2]), Auction.objects.filter(id__in=ids[1::2])], per_page=3
+        )
+
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        third = paginator.page(after=second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), self.newest_first)
+        self.assertEqual((first.has_previous(), third.has_next()), (False, False))
+
+        back = paginator.page(before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_previous())
+
+    def test_bad_cursor_starts_from_first_page(self):
+        page = CursorPaginator(Auction.objects.all(), per_page=3).page(after='not-a-cursor')
+        self.assertEqual(list(page), self.newest_first[:3])
+
+    def test_listing_views_paginate(self):
+        response = self.client.get('/category/smartphones')
+        self.assertEqual(len(response.context['auctions']), 7)
+        response = self.client.get('/auctions')
+        self.assertEqual(len(response.context['auctions']), 7)
+        self.client.force_login(self.seller)
+        response = self.client.get('/my-auctions')
+        self.assertEqual(response.context['stats'], {'total': 7, 'active': 7, 'closed': 0})
+
+
+class CategoryStatsTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap = make_auction(self.seller, starting_bid=Decimal('5.00'))
+            self.dear = make_auction(self.seller, starting_bid=Decimal('50.00'))
+            self.laptop = make_auction(self.seller, category='laptops')
+
+    def stats(self, category='smartphones'):
+        return CategoryStats.objects.get(category=category)
+
+    def assertMatchesRebuild(self):
+        incremental = list(CategoryStats.objects.order_by('category').values(
+            'category', 'open_count', 'total_count', 'min_price', 'max_price'
+        ))
+        rebuild_category_stats()
+        rebuilt = list(CategoryStats.objects.filter(total_count__gt=0).order_by('category').values(
+            'category', 'open_count', 'total_count', 'min_price', 'max_price'
+        ))
+        self.assertEqual([row for row in incremental if row['total_count']], rebuilt)
+
+    def test_create_counts_and_price_range(self):
+        stats = self.stats()
+        self.assertEqual((stats.open_count, stats.total_count), (2, 2))
+        self.assertEqual((stats.min_price, stats.max_price), (Decimal('5.00'), Decimal('50.00')))
+        self.assertEqual(self.stats('laptops').total_count, 1)
+        self.assertMatchesRebuild()
+
+    def test_bid_moves_price_range(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.cheap.id, self.bidder, Decimal('80.00'))
+        stats = self.stats()
+        self.assertEqual((stats.min_price, stats.max_price), (Decimal('50.00'), Decimal('80.00')))
+        self.assertMatchesRebuild()
+
+    def test_close_is_counted_once(self):
+        self.dear.is_close = True
+        self.dear.save(update_fields=['is_close'])
+        self.dear.save()
+        stats = self.stats()
+        self.assertEqual((stats.open_count, stats.total_count), (1, 2))
+        self.assertEqual(stats.max_price, Decimal('5.00'))
+        self.assertMatchesRebuild()
+
+    def test_delete_and_recategorise(self):
+        self.cheap.delete()
+        self.dear.category = 'laptops'
+        self.dear.save()
+        self.assertEqual(self.stats().total_count, 0)
+        self.assertIsNone(self.stats().min_price)
+        self.assertEqual(self.stats('laptops').open_count, 2)
+        self.assertMatchesRebuild()
+
+    def test_category_pages_do_not_scan_auctions(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/categories')
+            categories = list(response.context['categories'])
+        self.assertEqual([(c.category, c.count) for c in categories], [('laptops', 1), ('smartphones', 2)])
+
+
+class CloseExpiredAuctionsTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        self.past = timezone.now() - timedelta(minutes=1)
+
+    def make_expired(self, count, bids=0):
+        auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(count)]
+        for auction in auctions[:bids]:
+            place_bid(auction.id, self.bidder, Decimal('20.00'))
+        Auction.objects.filter(id__in=[a.id for a in auctions]).update(ends_at=self.past)
+        return auctions
+
+    def test_closes_expired_auctions_and_notifies_winners(self):
+        won, unsold = self.make_expired(2, bids=1)
+        running = make_auction(self.seller, ends_at=timezone.now() + timedelta(days=1))
+
+        self.assertEqual(close_expired_auctions(batch_size=1), 2)
+
+        self.assertEqual(set(Auction.objects.filter(is_close=True).values_list('id', flat=True)), {won.id, unsold.id})
+        self.assertFalse(Auction.objects.get(id=running.id).is_close)
+        self.assertEqual(Notification.objects.filter(notification_type='auction_ended').count(), 2)
+        winner = Notification.objects.get(notification_type='auction_won')
+        self.assertEqual((winner.user_id, winner.object_id), (self.bidder.id, won.id))
+        self.assertEqual(CategoryStats.objects.get(category='smartphones').open_count, 1)
+        self.assertEqual(close_expired_auctions(), 0)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        self.make_expired(3)
+        with self.assertNumQueries(11) as small:
+            close_expired_auctions()
+        self.make_expired(30)
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.assertEqual(close_expired_auctions(), 30)
+
+    def test_bids_are_refused_once_ends_at_has_passed(self):
+        auction, = self.make_expired(1)
+        result = place_bid(auction.id, self.bidder, Decimal('50.00'))
+        self.assertFalse(result.accepted)
+        self.assertEqual(result.reason, REJECT_CLOSED)
+
+
+class WatchlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.watcher = User.objects.create_user('watcher', password='password123')
+        self.auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(5)]
+        self.client.force_login(self.watcher)
+
+    def bulk(self, **payload):
+        return self.client.post('/watchlist/bulk', json.dumps(payload), content_type='application/json')
+
+    def test_bulk_add_and_remove(self):
+        ids = [a.id for a in self.auctions]
+        response = self.bulk(add=ids[:3] + [999999])
+        self.assertEqual(response.json()['added'], ids[:3])
+
+        response = self.bulk(add=ids[2:], remove=ids[:2])
+        self.assertEqual(response.json(), {
+            'success': True, 'added': ids[3:], 'removed': ids[:2], 'watched_count': 3
+        })
+        self.assertEqual(watched_auction_ids(self.watcher), frozenset(ids[2:]))
+
+    def test_bulk_rejects_bad_payload(self):
+        self.assertEqual(self.bulk(add=['x']).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.bulk(add=[self.auctions[0].id]).status_code, 401)
+
+    @override_settings(WATCHLIST_CACHE_TIMEOUT=300)
+    def test_cached_membership_is_invalidated(self):
+        auction = self.auctions[0]
+        self.assertFalse(is_watching(self.watcher, auction.id))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_watching(self.watcher, auction.id))
+
+        self.client.post('/watchlist', {'auction_id': auction.id})
+        self.assertTrue(is_watching(self.watcher, auction.id))
+
+        auction.watchlisted.clear()
+        self.assertFalse(is_watching(self.watcher, auction.id))
+
+    @override_settings(WATCHLIST_CACHE_TIMEOUT=300)
+    def test_ids_cached_before_commit_are_dropped_on_commit(self):
+        auction = self.auctions[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            watch(self.watcher, [auction.id])
+            # A concurrent request still seeing the old watchlist caches it
+            cache.set(watchlist_cache_key(self.watcher.id), frozenset(), 300)
+        self.assertTrue(is_watching(self.watcher, auction.id))
+
+    @override_settings(WATCHLIST_CACHE_TIMEOUT=0)
+    def test_uncached_membership_is_a_single_query(self):
+        self.bulk(add=[a.id for a in self.auctions])
+        with self.assertNumQueries(1):
+            self.assertTrue(is_watching(self.watcher, self.auctions[-1].id))
+
+
+class PopularityCounterTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.users = [User.objects.create_user(f'user{i}', password='password123') for i in range(3)]
+        self.auction = make_auction(self.seller)
+        self.other = make_auction(self.seller)
+
+    def counters(self, auction=None):
+        auction = auction or self.auction
+        auction.refresh_from_db()
+        return auction.watcher_count, auction.bidder_count
+
+    def test_watchers_follow_watchlist_changes(self):
+        lists = [Watchlist.objects.create(user=user) for user in self.users]
+        for watchlist in lists:
+            watchlist.auctions.add(self.auction, self.other)
+        lists[0].auctions.add(self.auction)
+        self.assertEqual(self.counters(), (3, 0))
+
+        lists[0].auctions.remove(self.auction, self.auction)
+        lists[1].auctions.clear()
+        self.auction.watchlisted.remove(lists[0])
+        self.assertEqual(self.counters(), (1, 0))
+        self.assertEqual(self.counters(self.other), (2, 0))
+
+        lists[2].delete()
+        self.assertEqual(self.counters(), (0, 0))
+        self.assertEqual(self.counters(self.other), (1, 0))
+
+    def test_bidders_count_distinct_users_except_owner(self):
+        place_bid(self.auction.id, self.users[0], 11)
+        place_bid(self.auction.id, self.users[1], 12)
+        place_bid(self.auction.id, self.users[0], 13)
+        place_bid(self.auction.id, self.seller, 14)
+        self.assertEqual(self.counters(), (0, 2))
+
+    def test_reconcile_repairs_drift(self):
+        Watchlist.objects.create(user=self.users[0]).auctions.add(self.auction)
+        place_bid(self.auction.id, self.users[1], 20)
+        Auction.objects.update(watcher_count=7, bidder_count=7)
+        reconcile_counters()
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(self.counters(self.other), (0, 0))
+
+    def test_most_watched_sort_pages_by_watcher_count(self):
+        auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(4)]
+        for count, auction in zip([2, 0, 3, 1], auctions):
+            for user in self.users[:count]:
+                Watchlist.objects.get_or_create(user=user)[0].auctions.add(auction)
+
+        page = CursorPaginator(Auction.objects.all(), per_page=2, key='watcher_count').page()
+        self.assertEqual([a.id for a in page], [auctions[2].id, auctions[0].id])
+        page = CursorPaginator(Auction.objects.all(), per_page=2, key='watcher_count').page(after=page.next_cursor)
+        self.assertEqual([a.id for a in page], [auctions[3].id, auctions[1].id])
+
+        response = self.client.get('/auctions', {'sort': 'popular'})
+        self.assertEqual(response.context['auctions'].object_list[0].id, auctions[2].id)
+
+    def test_cards_show_and_sort_by_live_price(self):
+        caches['pages'].clear()
+        cheap, dear = make_auction(self.seller, title='Cheap'), make_auction(self.seller, title='Dear')
+        place_bid(cheap.id, self.users[0], 40)
+        place_bid(dear.id, self.users[1], 350)
+        # No bids yet: the card falls back to the listed price
+        Auction.objects.filter(pk=self.other.pk).update(current_bid=0, price=Decimal('75.00'))
+
+        response = self.client.get('/auctions', {'sort': 'price'})
+        self.assertEqual([a.id for a in response.context['auctions'].object_list[:2]], [dear.id, cheap.id])
+        self.assertContains(response, 'EGP350.00')
+        self.assertContains(response, 'EGP40.00')
+        self.assertContains(response, 'EGP75.00')
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.seller = User.objects.create_user('seller', password='password123')
+        buffer = BytesIO()
+        Image.new('RGBA', (3000, 2000), (200, 30, 30, 128)).save(buffer, format='PNG')
+        self.auction = make_auction(self.seller)
+        self.auction.image.save('photo.png', ContentFile(buffer.getvalue()), save=False)
+        Auction.objects.filter(id=self.auction.id).update(image=self.auction.image.name)
+
+    def test_generates_every_size_and_format(self):
+        written = generate_derivatives(self.auction.image.name)
+        self.assertEqual(len(written), 6)
+
+        with default_storage.open(derivative_name(self.auction.image.name, 'card', 'webp')) as f:
+            card = Image.open(f)
+            self.assertEqual((card.format, card.size), ('WEBP', (480, 320)))
+        with default_storage.open(derivative_name(self.auction.image.name, 'zoom', 'jpeg')) as f:
+            zoom = Image.open(f)
+            self.assertEqual((zoom.format, zoom.mode, zoom.size), ('JPEG', 'RGB', (1920, 1280)))
+
+        self.assertEqual(generate_derivatives(self.auction.image.name), [])
+
+    def test_missing_renditions_are_generated_on_first_request(self):
+        html = Template('{% load auction_images %}{% auction_picture auction "card" %}').render(
+            Context({'auction': self.auction})
+        )
+        lazy_url = f'/auction/{self.auction.id}/image/card.webp'
+        self.assertIn(f'{lazy_url} 480w', html)
+
+        response = self.client.get(lazy_url)
+        name = derivative_name(self.auction.image.name, 'card', 'webp')
+        self.assertRedirects(response, default_storage.url(name), fetch_redirect_response=False)
+        self.assertTrue(default_storage.exists(name))
+
+        # Recorded renditions are linked without checking storage
+        self.auction.refresh_from_db()
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('storage probed')):
+            html = Template('{% load auction_images %}{% image_srcset auction "webp" %}').render(
+                Context({'auction': self.auction})
+            )
+        self.assertIn(f'{default_storage.url(name)} 480w', html)
+
+    def test_renditions_of_new_uploads_are_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auction.save()
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.image_renditions, self.auction.image.name)
+
+    def test_renditions_are_served_with_cache_headers(self):
+        generate_derivatives(self.auction.image.name)
+        path = derivative_name(self.auction.image.name, 'card', 'jpeg')
+        response = serve_media(RequestFactory().get(f'/media/{path}'), path, document_root=self.media_root)
+        self.assertIn(f'max-age={settings.IMAGE_CACHE_MAX_AGE}', response['Cache-Control'])
+
+    def test_unknown_rendition_is_404(self):
+        self.assertEqual(self.client.get(f'/auction/{self.auction.id}/image/huge.webp').status_code, 404)
+        self.assertEqual(self.client.get(f'/auction/{self.auction.id}/image/card.gif').status_code, 404)
+
+
+class ImageOrigin(BaseHTTPRequestHandler):
+    """Local stand-in for a remote image host, serving ImageOrigin.files by path."""
+    files = {}
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path not in self.files:
+            self.send_error(404)
+            return
+        content_type, body = self.files[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(REMOTE_IMAGE_ALLOW_PRIVATE=True, REMOTE_IMAGE_MAX_BYTES=200_000)
+class RemoteImageProxyTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        buffer = BytesIO()
+        Image.new('RGB', (2400, 1200), (20, 120, 200)).save(buffer, format='JPEG')
+        ImageOrigin.files = {
+            '/phone.jpg': ('image/jpeg', buffer.getvalue()),
+            '/page.html': ('text/html', b'<html></html>'),
+            '/broken.jpg': ('image/jpeg', b'not really a jpeg'),
+            '/huge.jpg': ('image/jpeg', b'\xff' * 300_000),
+        }
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageOrigin)
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.origin = f'http://127.0.0.1:{self.server.server_port}'
+
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.auction = make_auction(self.seller, image_url=f'{self.origin}/phone.jpg')
+
+    def test_remote_image_is_fetched_once_and_served_locally(self):
+        html = Template('{% load auction_images %}{% auction_picture auction "card" %}').render(
+            Context({'auction': self.auction})
+        )
+        self.assertNotIn(self.origin, html)
+        self.assertIn(f'/auction/{self.auction.id}/image/card.webp 480w', html)
+
+        # The copy is made in the background, the origin is linked meanwhile
+        response = self.client.get(f'/auction/{self.auction.id}/image/card.webp')
+        self.assertRedirects(response, self.auction.image_url, fetch_redirect_response=False)
+        self.assertIn('no-cache', response['Cache-Control'])
+        images._fetch_queue.join()
+
+        response = self.client.get(f'/auction/{self.auction.id}/image/card.webp')
+        name = derivative_name(remote_image_name(self.auction.image_url), 'card', 'webp')
+        self.assertRedirects(response, default_storage.url(name), fetch_redirect_response=False)
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        with default_storage.open(remote_image_name(self.auction.image_url)) as f:
+            self.assertEqual(Image.open(f).size, (1920, 960))
+        with default_storage.open(name) as f:
+            self.assertEqual(Image.open(f).size, (480, 240))
+
+        self.client.get(f'/auction/{self.auction.id}/image/detail.jpg')
+        self.assertEqual(self.server.hits, ['/phone.jpg'])
+
+    def test_invalid_responses_are_rejected_and_not_retried(self):
+        for path in ('/page.html', '/broken.jpg', '/huge.jpg', '/missing.jpg'):
+            with self.assertLogs('auctions.images', 'WARNING'):
+                self.assertIsNone(fetch_remote_image(f'{self.origin}{path}'))
+            self.assertIsNone(fetch_remote_image(f'{self.origin}{path}'))
+            self.assertFalse(default_storage.exists(remote_image_name(f'{self.origin}{path}')))
+        self.assertEqual(len(self.server.hits), 4)
+
+    def test_unreachable_origin_falls_back_to_the_original_url(self):
+        Auction.objects.filter(id=self.auction.id).update(image_url=f'{self.origin}/missing.jpg')
+        with self.assertLogs('auctions.images', 'WARNING'):
+            self.client.get(f'/auction/{self.auction.id}/image/card.jpg')
+            images._fetch_queue.join()
+        response = self.client.get(f'/auction/{self.auction.id}/image/card.jpg')
+        self.assertRedirects(response, f'{self.origin}/missing.jpg', fetch_redirect_response=False)
+        self.assertEqual(self.server.hits, ['/missing.jpg'])
+
+    def test_new_auctions_start_the_copy_once_committed(self):
+        ImageOrigin.files['/tablet.jpg'] = ImageOrigin.files['/phone.jpg']
+        with self.captureOnCommitCallbacks(execute=True):
+            make_auction(self.seller, image_url=f'{self.origin}/tablet.jpg')
+        images._fetch_queue.join()
+        self.assertTrue(default_storage.exists(
+            derivative_name(remote_image_name(f'{self.origin}/tablet.jpg'), 'card', 'webp')
+        ))
+
+    @override_settings(REMOTE_IMAGE_ALLOW_PRIVATE=False)
+    def test_connections_go_to_the_checked_address(self):
+        # The first lookup passes the check; a rebound second one would point at the local origin
+        lookups = [
+            [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 80))],
+            [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 80))],
+        ]
+        with mock.patch('socket.getaddrinfo', side_effect=lookups) as getaddrinfo, \
+                mock.patch('socket.create_connection', side_effect=ConnectionRefusedError) as connect, \
+                self.assertLogs('auctions.images', 'WARNING'):
+            self.assertIsNone(fetch_remote_image('http://images.example/phone.jpg'))
+
+        getaddrinfo.assert_called_once_with('images.example', 80, type=socket.SOCK_STREAM)
+        self.assertEqual(connect.call_args[0][0], ('93.184.216.34', 80))
+        self.assertEqual(self.server.hits, [])
+
+    @override_settings(REMOTE_IMAGE_ALLOW_PRIVATE=False)
+    def test_private_origins_are_refused_by_default(self):
+        with self.assertLogs('auctions.images', 'WARNING'):
+            self.assertIsNone(fetch_remote_image(self.auction.image_url))
+        self.assertEqual(self.server.hits, [])
+
+
+class RelatedAuctionTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.iphone = make_auction(self.seller, title='Apple iPhone 14 Pro', description='Unlocked iPhone smartphone, 256GB')
+        self.iphone_13 = make_auction(self.seller, title='Apple iPhone 13', description='Unlocked iPhone with 128GB storage')
+        self.pixel = make_auction(self.seller, title='Google Pixel 8', description='Android smartphone, 128GB')
+        self.galaxy = make_auction(self.seller, title='Samsung Galaxy S23', description='Android smartphone with a great camera')
+        self.macbook = make_auction(
+            self.seller, title='Apple MacBook Air', description='M2 laptop, 256GB SSD', category='laptops'
+        )
+
+    def test_recommendations_rank_by_content_similarity(self):
+        self.assertEqual(rebuild_recommendations(), 5)
+
+        self.assertEqual(related_auctions(self.iphone, limit=1), [self.iphone_13])
+        self.assertEqual(related_auctions(self.pixel, limit=1), [self.galaxy])
+        self.assertNotIn(self.iphone, related_auctions(self.iphone))
+
+        scores = list(RelatedAuction.objects.filter(auction=self.iphone).order_by('rank').values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_detail_page_reads_recommendations_in_one_query(self):
+        rebuild_recommendations()
+        self.iphone_13.is_close = True
+        self.iphone_13.save()
+
+        with self.assertNumQueries(1):
+            related = related_auctions(self.iphone)
+        self.assertNotIn(self.iphone_13, related)
+        self.assertTrue(all(auction.is_close is False for auction in related))
+
+        self.client.login(username='seller', password='password123')
+        response = self.client.get(f'/auction/{self.iphone.id}')
+        self.assertEqual(response.context['related_auctions'], related)
+
+    def test_missing_only_builds_new_auctions_and_falls_back_until_then(self):
+        rebuild_recommendations()
+        ipad = make_auction(self.seller, title='Apple iPad Air', description='Tablet', category='tablets')
+
+        self.assertEqual(related_auctions(ipad), [])
+        self.assertEqual(rebuild_recommendations(missing=True), 1)
+        self.assertTrue(RelatedAuction.objects.filter(auction=ipad).exists())
+        self.assertFalse(RelatedAuction.objects.filter(related=ipad).exists())
+
+        self.macbook.is_close = True
+        self.macbook.save()
+        rebuild_recommendations()
+        self.assertFalse(RelatedAuction.objects.filter(auction=self.macbook).exists())
+
+    def test_arabic_titles_are_matched(self):
+        self.assertEqual(tokenize('ساعة يد rolex'), ['ساعة', 'يد', 'rolex'])
+        watch = make_auction(self.seller, title='ساعة يد rolex', description='ساعة فاخرة', category='wearables')
+        other_watch = make_auction(self.seller, title='ساعة يد أوميغا', description='ساعة سويسرية', category='wearables')
+        make_auction(self.seller, title='سوار رياضي ذكي', description='يقيس النبض', category='wearables')
+        rebuild_recommendations()
+        self.assertEqual(related_auctions(watch, limit=1), [other_watch])
+        self.assertGreater(RelatedAuction.objects.get(auction=watch, rank=0).score, CATEGORY_BONUS)
+
+    def test_blocked_scoring_keeps_the_best_matches(self):
+        rebuild_recommendations()
+        expected = list(RelatedAuction.objects.order_by('auction', 'rank').values_list('auction', 'related', 'rank'))
+        with mock.patch('auctions.recommendations.BLOCK_SIZE', 2), \
+                mock.patch('auctions.recommendations.CANDIDATE_BLOCK_SIZE', 2):
+            rebuild_recommendations()
+        self.assertEqual(
+            list(RelatedAuction.objects.order_by('auction', 'rank').values_list('auction', 'related', 'rank')), expected
+        )
+
+
+class BidBatchTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.reseller = User.objects.create_user('reseller', password='password123')
+        self.auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(3)]
+        self.client.force_login(self.reseller)
+
+    def submit(self, *bids):
+        return self.client.post('/bid/batch', json.dumps({'bids': list(bids)}), content_type='application/json')
+
+    def test_batch_returns_a_result_per_bid(self):
+        closed = make_auction(self.seller, title='Closed item')
+        closed.is_close = True
+        closed.save()
+
+        response = self.submit(
+            {'auction_id': self.auctions[0].id, 'amount': '15.00'},
+            {'auction_id': self.auctions[1].id, 'amount': '5'},
+            {'auction_id': self.auctions[2].id, 'amount': 'ten'},
+            {'auction_id': closed.id, 'amount': 50},
+            {'auction_id': 999999, 'amount': 50},
+            {'auction_id': self.auctions[0].id, 'amount': 12},
+        )
+        body = response.json()
+
+        self.assertEqual(body['accepted'], 1)
+        self.assertEqual(
+            [(result['auction_id'], result['accepted'], result['reason']) for result in body['results']],
+            [
+                (self.auctions[0].id, True, None),
+                (self.auctions[1].id, False, REJECT_TOO_LOW),
+                (self.auctions[2].id, False, REJECT_INVALID_AMOUNT),
+                (closed.id, False, REJECT_CLOSED),
+                (999999, False, 'not_found'),
+                (self.auctions[0].id, False, REJECT_TOO_LOW),
+            ]
+        )
+        self.assertEqual(body['results'][5]['current_bid'], '15.00')
+        self.assertEqual(Bid.objects.filter(user=self.reseller).count(), 1)
+
+    def test_retries_with_the_same_key_do_not_bid_twice(self):
+        item = {'auction_id': self.auctions[0].id, 'amount': '20.00', 'idempotency_key': 'order-1'}
+        first = self.submit(item).json()['results'][0]
+        retry = self.submit(item, item).json()['results']
+
+        self.assertTrue(first['accepted'])
+        self.assertFalse(first['replayed'])
+        self.assertEqual([result['bid_id'] for result in retry], [first['bid_id']] * 2)
+        self.assertTrue(all(result['replayed'] for result in retry))
+        self.assertEqual(Bid.objects.filter(user=self.reseller).count(), 1)
+
+        reused = self.submit(dict(item, amount='30.00')).json()['results'][0]
+        self.assertEqual(reused['reason'], REJECT_KEY_REUSED)
+        self.assertEqual(BidRequest.objects.filter(user=self.reseller).count(), 1)
+
+    def test_rejected_bids_are_replayed_too(self):
+        item = {'auction_id': self.auctions[0].id, 'amount': '5.00', 'idempotency_key': 'low'}
+        self.assertEqual(self.submit(item).json()['results'][0]['reason'], REJECT_TOO_LOW)
+        place_bid(self.auctions[0].id, self.seller, 6)
+
+        retry = self.submit(item).json()['results'][0]
+        self.assertEqual((retry['reason'], retry['replayed'], retry['current_bid']), (REJECT_TOO_LOW, True, '10.00'))
+
+    def test_amounts_too_large_to_store_are_rejected_per_bid(self):
+        response = self.submit(
+            {'auction_id': self.auctions[0].id, 'amount': '12345678.90', 'idempotency_key': 'huge'},
+            {'auction_id': self.auctions[1].id, 'amount': '20', 'max_amount': '10000'},
+            {'auction_id': self.auctions[2].id, 'amount': '9999.99'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['accepted'], result['reason']) for result in response.json()['results']],
+            [(False, REJECT_INVALID_AMOUNT), (False, REJECT_INVALID_AMOUNT), (True, None)]
+        )
+        self.assertEqual(BidRequest.objects.get(key='huge').result['reason'], REJECT_INVALID_AMOUNT)
+        self.assertEqual(Bid.objects.filter(user=self.reseller).count(), 1)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.submit().status_code, 400)
+        self.assertEqual(self.submit({'amount': 5}).status_code, 400)
+        self.assertEqual(self.submit(*[{'auction_id': 1, 'amount': 5}] * 101).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.submit({'auction_id': self.auctions[0].id, 'amount': 50}).status_code, 401)
+
+
+class AuctionApiTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        self.auctions = [make_auction(self.seller, title=f'Item {i}') for i in range(3)]
+        self.auction = self.auctions[0]
+
+    def test_detail_and_conditional_get(self):
+        url = f'/api/v1/auctions/{self.auction.id}'
+        response = self.client.get(url)
+        data = response.json()['auction']
+        self.assertEqual(
+            (data['id'], data['current_bid'], data['bid_count'], data['seller']['username'], data['images']),
+            (self.auction.id, '10.00', 1, 'seller', None)
+        )
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        place_bid(self.auction.id, self.bidder, 25)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual((response.json()['auction']['current_bid'], response.json()['auction']['leader']), ('25.00', 'bidder'))
+
+        self.assertEqual(self.client.get('/api/v1/auctions/999999').status_code, 404)
+
+    def test_list_pages_and_conditional_get(self):
+        response = self.client.get('/api/v1/auctions')
+        body = response.json()
+        self.assertEqual([item['id'] for item in body['results']], [a.id for a in reversed(self.auctions)])
+        self.assertIsNone(body['next'])
+
+        self.assertEqual(self.client.get('/api/v1/auctions', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        place_bid(self.auctions[1].id, self.bidder, 30)
+        self.assertEqual(self.client.get('/api/v1/auctions', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/auctions?category=laptops').json()['results'], [])
+
+    def test_list_is_paginated_by_cursor(self):
+        for i in range(20):
+            make_auction(self.seller, title=f'Extra {i}')
+
+        first = self.client.get('/api/v1/auctions').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 23)
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(f'/api/v1/auctions/{self.auction.id}').status_code, 405)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        self.phone = make_auction(self.seller, title='Cached Phone')
+        self.laptop = make_auction(self.seller, title='Cached Laptop', category='laptops')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in ('/', '/auctions', '/categories', '/category/smartphones', '/auctions?sort=popular'):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.content, first.content)
+
+    def test_bids_purge_only_the_affected_pages(self):
+        for url in ('/auctions', '/category/smartphones', '/category/laptops', '/categories', '/'):
+            self.client.get(url)
+
+        place_bid(self.phone.id, self.bidder, 77)
+
+        self.assertContains(self.client.get('/auctions'), '1 bidder<')
+        self.assertContains(self.client.get('/category/smartphones'), '1 bidder<')
+        # The phone is featured on the home page
+        self.assertContains(self.client.get('/'), 'EGP77')
+        with self.assertNumQueries(0):
+            self.client.get('/category/laptops')
+            self.client.get('/categories')
+
+    def test_bids_on_auctions_not_featured_keep_the_home_page(self):
+        for title in ('Camera', 'Console', 'Monitor'):
+            make_auction(self.seller, title=title, starting_bid=Decimal('500.00'), category='cameras')
+        self.client.get('/')
+
+        place_bid(self.phone.id, self.bidder, 77)
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+        place_bid(self.phone.id, self.bidder, 900)
+        self.assertContains(self.client.get('/'), 'EGP900')
+
+    def test_moving_an_auction_purges_its_old_category(self):
+        self.assertContains(self.client.get('/category/smartphones'), 'Cached Phone')
+        self.phone.category = 'tablets'
+        self.phone.save()
+        self.assertNotContains(self.client.get('/category/smartphones'), 'Cached Phone')
+
+    def test_logged_in_users_are_not_served_cached_pages(self):
+        self.client.get('/auctions')
+        self.client.force_login(self.bidder)
+        self.assertContains(self.client.get('/auctions'), reverse('logout'))
+
+
+PAGE_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'pages': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': PAGE_CACHE_DIR},
+})
+class FilePageCacheTests(PageCacheTests):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(shutil.rmtree, PAGE_CACHE_DIR, ignore_errors=True)
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.viewer = User.objects.create_user('viewer', password='password123')
+        self.auction = make_auction(self.seller)
+        self.client.force_login(self.viewer)
+
+    def count_queries(self, url):
+        # Warm per-user caches (watched ids) so only the page's own queries are counted,
+        # but never cache comment threads, so the measured request still loads them
+        with override_settings(COMMENT_CACHE_TIMEOUT=0):
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def add_comments(self, count):
+        for i in range(count):
+            commenter = User.objects.create_user(f'commenter{Comment.objects.count()}', password='password123')
+            Comment.objects.create(auction=self.auction, user=commenter, message=f'Comment {i}')
+
+    def test_auction_page_query_count_does_not_grow_with_comments(self):
+        place_bid(self.auction.id, self.viewer, 20)
+        self.add_comments(1)
+        baseline = self.count_queries(f'/auction/{self.auction.id}')
+
+        self.add_comments(10)
+        self.assertEqual(self.count_queries(f'/auction/{self.auction.id}'), baseline)
+        self.assertContains(self.client.get(f'/auction/{self.auction.id}'), 'Comment 9')
+
+    def test_card_pages_query_count_does_not_grow_with_cards(self):
+        urls = ['/auctions', '/category/smartphones', '/my-auctions', '/watchlist', '/']
+        self.client.force_login(self.seller)
+        watch(self.seller, [self.auction.id])
+        baseline = [self.count_queries(url) for url in urls]
+
+        more = [make_auction(self.seller, title=f'Card {i}') for i in range(10)]
+        watch(self.seller, [auction.id for auction in more])
+        self.assertEqual([self.count_queries(url) for url in urls], baseline)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.viewer = User.objects.create_user('viewer', password='password123')
+        self.auction = make_auction(self.seller)
+        self.client.force_login(self.viewer)
+
+    def add_comments(self, count):
+        for i in range(count):
+            Comment.objects.create(auction=self.auction, user=self.viewer, message=f'Message #{i:03d}.')
+
+    def test_comment_count_is_denormalized(self):
+        self.add_comments(3)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.comment_count, 3)
+
+        Comment.objects.filter(auction=self.auction).first().delete()
+        Auction.objects.filter(id=self.auction.id).update(comment_count=50)
+        reconcile_counters()
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.comment_count, 2)
+
+    def test_first_page_inline_and_the_rest_from_the_endpoint(self):
+        total = COMMENTS_PER_PAGE * 2 + 5
+        self.add_comments(total)
+
+        response = self.client.get(f'/auction/{self.auction.id}')
+        self.assertContains(response, f'Comments ({total})')
+        self.assertContains(response, f'Message #{total - 1:03d}.')
+        self.assertNotContains(response, f'Message #{total - COMMENTS_PER_PAGE - 1:03d}.')
+        self.assertContains(response, 'load-more-comments')
+
+        url, seen = response.context['comments_next'], []
+        url = f'/auction/{self.auction.id}/comments?after={url}'
+        while url:
+            data = self.client.get(url).json()
+            seen.append(data['html'].count('Message #'))
+            url = data['next']
+        self.assertEqual(seen, [COMMENTS_PER_PAGE, 5])
+
+    def test_pages_are_cached_until_the_count_changes(self):
+        self.add_comments(2)
+        self.auction.refresh_from_db()
+        request = RequestFactory().get('/')
+        html, next_cursor = comment_page(request, self.auction)
+        with self.assertNumQueries(0):
+            self.assertEqual(comment_page(request, self.auction), (html, None))
+
+        self.client.post('/comment', {'auction_id': self.auction.id, 'comment': 'Fresh question'})
+        self.auction.refresh_from_db()
+        self.assertIn('Fresh question', comment_page(request, self.auction)[0])
+
+
+class PriceHistoryTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.bidder = User.objects.create_user('bidder', password='password123')
+        self.auction = make_auction(self.seller)
+        self.url = f'/api/v1/auctions/{self.auction.id}/price-history'
+
+    def rollups(self):
+        return list(PriceRollup.objects.filter(auction=self.auction).order_by('bucket').values_list(
+            'bucket', 'low', 'high', 'first_bid_at', 'last_bid_at', 'bid_count'
+        ))
+
+    def test_bids_are_timestamped_and_rolled_up(self):
+        before = timezone.now()
+        for amount in (20, 30, 45):
+            place_bid(self.auction.id, self.bidder, amount)
+
+        bids = list(Bid.objects.filter(auction=self.auction).order_by('id'))
+        self.assertTrue(all(bid.created_at >= before - timedelta(seconds=5) for bid in bids))
+        self.assertEqual([b.created_at for b in bids], sorted(b.created_at for b in bids))
+
+        rollups = self.rollups()
+        self.assertEqual(sum(row[5] for row in rollups), 4)
+        self.assertEqual((rollups[0][1], rollups[-1][2]), (Decimal('10.00'), Decimal('45.00')))
+
+        PriceRollup.objects.all().delete()
+        self.assertEqual(rebuild_price_history(), len(rollups))
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        xs = list(range(1000))
+        ys = [0.0] * 1000
+        ys[500] = 100.0
+        kept = lttb(xs, ys, 20)
+        self.assertEqual(len(kept), 20)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertIn(500, kept)
+        self.assertEqual(kept, sorted(kept))
+        self.assertEqual(lttb(xs[:5], ys[:5], 20), [0, 1, 2, 3, 4])
+
+    def test_endpoint_downsamples_bids_with_etag(self):
+        for amount in range(11, 61):
+            place_bid(self.auction.id, self.bidder, amount)
+
+        response = self.client.get(self.url + '?points=10')
+        body = response.json()
+        self.assertEqual((body['resolution'], len(body['points'])), (RESOLUTION_BIDS, 10))
+        self.assertEqual((body['points'][0][1], body['points'][-1][1]), ('10.00', '60.00'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url + '?points=10', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        place_bid(self.auction.id, self.bidder, 70)
+        response = self.client.get(self.url + '?points=10', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['points'][-1][1], '70.00')
+
+        self.assertEqual(self.client.get(self.url + '?points=many').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/auctions/999999/price-history').status_code, 404)
+
+    def test_busy_auctions_are_charted_from_rollups(self):
+        start = timezone.now() + timedelta(minutes=1)
+        Bid.objects.bulk_create([
+            Bid(auction=self.auction, user=self.bidder, amount=Decimal(20 + i), created_at=start + timedelta(minutes=10 * i))
+            for i in range(200)
+        ])
+        rebuild_price_history([self.auction.id])
+        Auction.objects.filter(id=self.auction.id).update(bid_count=RAW_BID_LIMIT + 1)
+        self.auction.refresh_from_db()
+
+        with self.assertNumQueries(1):
+            resolution, series = price_series(self.auction, 20)
+        self.assertEqual(resolution, RESOLUTION_BUCKETS)
+        self.assertLessEqual(len(series), 20)
+        self.assertEqual(series[-1], (start + timedelta(minutes=10 * 199), Decimal('219.00')))
+        self.assertEqual([amount for _, amount in series], sorted(amount for _, amount in series))
+
+
+class FacetBrowseTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user('seller', password='password123')
+        self.phone = make_auction(self.seller, title='Phone', price=Decimal('50.00'))
+        self.tablet = make_auction(self.seller, title='Tablet', category='tablets', price=Decimal('700.00'),
+                                   image_url='https://example.com/tablet.jpg')
+        self.laptop = make_auction(self.seller, title='Laptop', category='laptops', price=Decimal('3000.00'))
+
+    def snapshot(self):
+        return set(FacetCount.objects.filter(count__gt=0).values_list(
+            'category', 'price_band', 'is_close', 'has_image', 'count'
+        ))
+
+    def counts(self, query):
+        facets, total = facet_counts(parse_facets(QueryDict(query)))
+        return {param: {value: count for value, _, count, _ in options if count} for param, _, options in facets}, total
+
+    def test_counts_follow_auction_changes(self):
+        self.assertEqual(self.counts('')[1], 3)
+
+        close_auctions(Auction.objects.filter(id=self.phone.id))
+        self.tablet.price = Decimal('80.00')
+        self.tablet.save()
+        self.laptop.delete()
+
+        facets, total = self.counts('')
+        self.assertEqual(total, 2)
+        self.assertEqual(facets['status'], {'open': 1, 'closed': 1})
+        self.assertEqual(facets['price'], {'under-100': 2})
+        self.assertEqual(facets['image'], {'yes': 1, 'no': 1})
+
+        maintained = self.snapshot()
+        rebuild_facets()
+        self.assertEqual(self.snapshot(), maintained)
+
+    def test_each_facet_ignores_its_own_selection(self):
+        facets, total = self.counts('category=tablets&category=laptops&price=2500-plus&status=bogus')
+        self.assertEqual(total, 1)
+        # Other categories still show what selecting them would add
+        self.assertEqual(facets['category'], {'laptops': 1})
+        self.assertEqual(facets['price'], {'500-1000': 1, '2500-plus': 1})
+        self.assertEqual(facets['status'], {'open': 1})
+
+        facets, total = self.counts('category=smartphones&category=tablets')
+        self.assertEqual((total, facets['category']), (2, {'smartphones': 1, 'tablets': 1, 'laptops': 1}))
+
+    def test_browse_page_filters_listing(self):
+        response = self.client.get('/auctions', {'category': ['smartphones', 'tablets'], 'image': 'yes'})
+        self.assertEqual([auction.id for auction in response.context['auctions']], [self.tablet.id])
+        self.assertEqual(response.context['auctions'].estimated_total, 1)
+        # Selected values stay listed even when empty, unavailable ones are hidden
+        self.assertContains(response, 'name="category" value="smartphones" checked')
+        self.assertNotContains(response, 'name="category" value="laptops"')
+
+        response = self.client.get('/auctions', {'category': 'laptops', 'price': 'under-100'})
+        self.assertContains(response, 'No Matching Auctions')
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.home, name="home"),
@@ -8,16 +8,28 @@ urlpatterns = [
 
     # Custom Paths
     path("auction/<int:auction_id>", views.auction, name="auction"),
+    path("auction/<int:auction_id>/events", views.auction_events, name="auction_events"),
+    path("auction/<int:auction_id>/comments", views.auction_comments, name="auction_comments"),
+    path("auction/<int:auction_id>/image/<slug:size>.<slug:ext>", views.auction_image, name="auction_image"),
     path("bid", views.bid, name="bid"),
+    path("bid/batch", views.bid_batch, name="bid_batch"),
     path("create", views.create, name="create"),
     path("comment", views.comment, name="comment"),
     path("watchlist", views.watchlist, name="watchlist"),
+    path("watchlist/bulk", views.watchlist_bulk, name="watchlist_bulk"),
     path("remove", views.remove, name="remove"),
     path("categories", views.categories, name="categories"),
     path("category/<str:category>", views.page, name="page"),
+    path("search", views.search, name="search"),
     path("auction/<int:auction_id>/close", views.close, name="close"),
     path("my-auctions", views.my_auctions, name="my_auctions"),
 
+    # Read-only JSON API
+    path("api/v1/auctions", api.auction_list, name="api_auction_list"),
+    path("api/v1/auctions/<int:auction_id>", api.auction_detail, name="api_auction_detail"),
+    path("api/v1/auctions/<int:auction_id>/price-history", api.auction_price_history,
+         name="api_auction_price_history"),
+
     # Auction Owner Management
     path("auction/<int:auction_id>/delete", views.delete_auction, name="delete_auction")
 ]
\ No newline at end of file
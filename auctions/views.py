@@ -1,106 +1,184 @@
+import json
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse
-from django.db.models import Count
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-
-
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_POST
+from django.views.static import serve
+from django.db.models import Count, Q
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+
+
+from .bidding import MAX_BATCH_BIDS, place_bid, place_bids
+from .closing import close_auctions
+from .comments import comment_page
+from .events import auction_state, stream_auction_events
+from .facets import facet_counts, facet_querysets, parse_facets
+from .images import FORMATS, RENDITIONS, ensure_auction_derivative
+from .loaders import auction_detail, profile_loader
 from .forms import BidForm, CommentForm, AuctionForm
-from .models import Bid, Auction, Watchlist, Comment
+from .models import Auction, CategoryStats, ProxyBid, Watchlist, Comment, CATEGORY_CHOICES
+from .page_cache import (
+    ALL_CATEGORY_SCOPES, FEATURED_SCOPE, LISTING_SCOPE, cache_anonymous_page, category_scope, featured_auctions
+)
+from .pagination import AFTER_PARAM, CursorPage, paginate_auctions
+from .recommendations import related_auctions as related_auctions_for
+from .search import search_auctions
+from .watchlist import MAX_BULK_IDS, is_watching, unwatch, watch, watched_auction_ids
 from accounts.models import User
 
 
+@cache_anonymous_page(lambda: [LISTING_SCOPE, FEATURED_SCOPE])
 def home(request):
     # Homepage with featured content
-    # Get categories with auction counts
-    categories = Auction.objects.values('category').annotate(
-        count=Count('id')
-    ).order_by('-count')[:4]  # Get top 4 categories
+    # Get categories with auction counts from the category stats table
+    categories = CategoryStats.objects.filter(
+        total_count__gt=0
+    ).order_by('-total_count', 'category')[:4]  # Get top 4 categories
 
     # Get featured auctions (not closed, with highest bids)
-    featured_auctions = Auction.objects.filter(
-        is_close=False
-    ).order_by('-price')[:3]  # Get top 3 auctions by price
+    featured = featured_auctions()  # Get top 3 auctions by live price
 
     return render(request, "auctions/home.html", {
         "categories": categories,
-        "featured_auctions": featured_auctions
+        "featured_auctions": featured
     })
 
 
+@cache_anonymous_page(lambda: [LISTING_SCOPE] + ALL_CATEGORY_SCOPES)
 def index(request):
-    # Get all auctions ordered by creation date
-    auctions_list = Auction.objects.all().order_by('-created_at')
-
-    # Number of auctions per page
-    per_page = 12
-
-    # Create paginator object
-    paginator = Paginator(auctions_list, per_page)
-
-    # Get page number from request
-    page = request.GET.get('page', 1)
-
-    try:
-        # Get the auctions for the requested page
-        auctions = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page
-        auctions = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range, deliver last page
-        auctions = paginator.page(paginator.num_pages)
+    # Faceted browse: every facet count comes from the precomputed facet table
+    # in one query, so the total is exact without counting the auction table
+    selected = parse_facets(request.GET)
+    facets, total = facet_counts(selected)
+
+    # Matching auctions, newest or most watched first, one keyset page at a time
+    if total:
+        auctions = paginate_auctions(request, facet_querysets(selected), per_page=12, estimate_cap=None)
+    else:
+        auctions = CursorPage([], None, None, 0, False)
+    auctions.estimated_total = total
 
     return render(request, "auctions/index.html", {
         "auctions": auctions,
+        "facets": facets,
+        "filtered": bool(selected),
     })
 
 
 # Listing Page
 @login_required(login_url='/accounts/login/')
 def auction(request, auction_id):
-    # Retrieve auction details
-    auction = Auction.objects.get(id=auction_id)
+    # Retrieve auction details along with the seller and current leader (highest bidder)
+    auction = auction_detail(auction_id)
 
-    # Retrieve the highest bid on the auction
-    bid = Bid.objects.filter(auction=auction).order_by('-amount').first()
+    # Check whether the user watches this auction (indexed lookup, cached per user)
+    watchlisted = is_watching(request.user, auction.id)
 
-    # Retrieve the watchlisted auctions
-    watchlist = Watchlist.objects.filter(user=request.user).first()
-    watchlisted = auction in watchlist.auctions.all() if watchlist else False
+    # Retrieve the user's automatic bid on this auction, if any
+    proxy_bid = ProxyBid.objects.filter(auction=auction_id, user=request.user).first()
 
-    # Retrieve comments on the auction
-    comments = Comment.objects.filter(auction=auction_id)
+    # Render the newest page of comments (cached per comment count); older pages load on demand
+    profile_loader(request).prime([request.user])
+    comments_html, comments_next = comment_page(request, auction)
 
-    # Get related auctions (same category, excluding current auction, limit to 4)
-    related_auctions = Auction.objects.filter(
-        category=auction.category,
-        is_close=False
-    ).exclude(
-        id=auction_id
-    ).order_by('-created_at')[:4]
+    # Get related auctions (precomputed by content similarity, limit to 4)
+    related_auctions = related_auctions_for(auction, limit=4)
 
     return render(request, "auctions/auction.html", {
         "auction": auction,
-        "bid": bid,
         "watchlisted": watchlisted,
-        "comments": comments,
+        "proxy_bid": proxy_bid,
+        "comments_html": comments_html,
+        "comments_next": comments_next,
         "related_auctions": related_auctions,
         "BidForm": BidForm(),
         "CommentForm": CommentForm()
     })
 
 
+# Older comments, one page at a time (JSON with an HTML fragment)
+@login_required(login_url='/accounts/login/')
+def auction_comments(request, auction_id):
+    """Return {"html": rendered comments, "next": URL of the following page or null}."""
+    auction = Auction.objects.select_related('user').filter(id=auction_id).first()
+    if auction is None:
+        raise Http404("Auction not found.")
+
+    html, next_cursor = comment_page(request, auction, after=request.GET.get(AFTER_PARAM))
+    next_url = None
+    if next_cursor:
+        next_url = f"{reverse('auction_comments', args=(auction.id,))}?{urlencode({AFTER_PARAM: next_cursor})}"
+    return JsonResponse({'html': html, 'next': next_url})
+
+
+# Image renditions, generated on first request
+def auction_image(request, auction_id, size, ext):
+    """
+    Redirect to an image rendition in the media store, creating it on first hit.
+
+    External image_url images are downloaded and stored locally in the
+    background; until the copy exists, or if the origin cannot be reached,
+    the browser is sent to it directly.
+    """
+    fmt = next((fmt for fmt, (extension, options) in FORMATS.items() if extension == ext), None)
+    auction = Auction.objects.filter(id=auction_id).only('image', 'image_url', 'image_renditions').first()
+    if size not in RENDITIONS or fmt is None or auction is None or not (auction.image or auction.image_url):
+        raise Http404("Image not found.")
+
+    name = ensure_auction_derivative(auction, size, fmt)
+    if name is not None:
+        response = HttpResponseRedirect(default_storage.url(name))
+        patch_cache_control(response, public=True, max_age=settings.IMAGE_CACHE_MAX_AGE)
+    elif auction.image_url:
+        # Not cached, so browsers switch to the local copy once it exists
+        response = HttpResponseRedirect(auction.image_url)
+        patch_cache_control(response, no_cache=True)
+    else:
+        raise Http404("Image not found.")
+    return response
+
+
+# Media files in development, with the cache headers the web server sends for image renditions in production
+def serve_media(request, path, document_root=None):
+    response = serve(request, path, document_root=document_root)
+    if '/derivatives/' in f'/{path}':
+        patch_cache_control(response, public=True, max_age=settings.IMAGE_CACHE_MAX_AGE)
+    return response
+
+
+# Live bid stream (Server-Sent Events)
+@login_required(login_url='/accounts/login/')
+async def auction_events(request, auction_id):
+    """Stream new bids, price changes and closes for an auction to the browser."""
+    auction = await Auction.objects.select_related('leader').filter(id=auction_id).afirst()
+    if auction is None:
+        raise Http404("Auction not found.")
+
+    # Long-lived streams need ASGI; under WSGI send a snapshot and let the browser reconnect
+    events = stream_auction_events(auction.id, auction_state(auction), live=isinstance(request, ASGIRequest))
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # Close auction
 @login_required(login_url='/accounts/login/')
 def close(request, auction_id):
     if request.method == "POST":
-        # Update is_close attribute to be True
-        auction = Auction.objects.get(id=auction_id)
-        auction.is_close = True
-        auction.save()
+        # Close the auction, notify the owner and winner and publish the close
+        close_auctions(Auction.objects.filter(id=auction_id))
 
         # redirect to the auction pag
         return HttpResponseRedirect(reverse('auction', args=(auction_id,)))
@@ -116,33 +194,67 @@ def bid(request):
         # Create a form instance
         form = BidForm(request.POST)
 
-        # Get the auction object
-        auction = Auction.objects.get(id=auction_id)
-
-        # Get the highest bid for this auction
-        highest_bid = Bid.objects.filter(auction=auction).order_by('-amount').first()
-        current_bid_amount = highest_bid.amount if highest_bid else 0
-
         # Check form validation
         if form.is_valid():
-            # Isolate the bid value from the 'cleaned' version of form data
-            bid_input = form.cleaned_data['bid']
-
-            # Check if the new bid is greater than the current bid
-            if bid_input <= current_bid_amount:
-                messages.warning(request, "Your bid should be greater than the current bid.")
-                return HttpResponseRedirect(reverse('auction', args=(auction_id,)))
-
-            # Create a new bid
-            new_bid = Bid(amount=bid_input, auction=auction, user=request.user)
-            new_bid.save()
+            # Validate and commit the bid atomically against the current highest bid
+            result = place_bid(
+                auction_id,
+                request.user,
+                form.cleaned_data['bid'],
+                max_amount=form.cleaned_data.get('max_bid')
+            )
 
-            messages.success(request, "Your bid now is the current bid.")
+            if result.accepted:
+                messages.success(request, result.message)
+            else:
+                messages.warning(request, result.message)
             return HttpResponseRedirect(reverse('auction', args=(auction_id,)))
 
         else:
             # If the form is invalid, re-render the page with existing information.
-            return HttpResponseRedirect(reverse('auction', args=(auction_id)))
+            return HttpResponseRedirect(reverse('auction', args=(auction_id,)))
+
+
+# Batched bids (JSON)
+@require_POST
+def bid_batch(request):
+    """
+    Place many bids in one call.
+
+    Body: {"bids": [{"auction_id": 1, "amount": "12.50", "max_amount": "20.00",
+    "idempotency_key": "..."}]}; max_amount and idempotency_key are optional.
+    Each bid gets its own result, in the order submitted.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required', 'success': False}, status=401)
+
+    try:
+        items = json.loads(request.body)['bids']
+        items = [
+            {
+                'auction_id': int(item['auction_id']),
+                'amount': item.get('amount'),
+                'max_amount': item.get('max_amount'),
+                'idempotency_key': str(item['idempotency_key']) if item.get('idempotency_key') else None,
+            }
+            for item in items
+        ]
+    except (json.JSONDecodeError, KeyError, AttributeError, TypeError, ValueError):
+        return JsonResponse({
+            'error': 'Expected {"bids": [{"auction_id": id, "amount": amount}]}', 'success': False
+        }, status=400)
+
+    if not items or len(items) > MAX_BATCH_BIDS:
+        return JsonResponse({'error': f'Send between 1 and {MAX_BATCH_BIDS} bids', 'success': False}, status=400)
+    if any(item['idempotency_key'] and len(item['idempotency_key']) > 64 for item in items):
+        return JsonResponse({'error': 'Idempotency keys are at most 64 characters', 'success': False}, status=400)
+
+    results = place_bids(request.user, items)
+    return JsonResponse({
+        'success': True,
+        'accepted': sum(result['accepted'] for result in results),
+        'results': results
+    })
 
 
 # Comments
@@ -189,6 +301,7 @@ def create(request):
             category = form.cleaned_data['category']
             amount = form.cleaned_data['amount']
             image_url = form.cleaned_data.get('image_url', '')
+            duration = form.cleaned_data.get('duration')
 
             # Create auction object
             auction = Auction(
@@ -196,6 +309,7 @@ def create(request):
                 description=description,
                 price=price,
                 category=category,
+                ends_at=timezone.now() + timedelta(days=duration) if duration else None,
                 user=request.user
             )
 
@@ -213,9 +327,8 @@ def create(request):
 
             auction.save()
 
-            # Create initial bid object
-            bid = Bid(amount=amount, auction=auction, user=request.user)
-            bid.save()
+            # Create initial bid object and seed the auction's current bid
+            place_bid(auction.id, request.user, amount)
 
             # redirect to auction page
             messages.success(request, "Auction Created Successfully")
@@ -241,18 +354,11 @@ def watchlist(request):
         # Store auction id
         auction_id = request.POST["auction_id"]
 
-        # Access the auction by it's id
-        auction = Auction.objects.get(pk=auction_id)
-
-        # Get the user's watchlist or create one if it doesn't exist
-        watchlist, created = Watchlist.objects.get_or_create(user=request.user)
-
-        # Check if  the auction is exist or not
-        if auction in watchlist.auctions.all():
+        # Add the auction, unless it is already in the user's watchlist
+        if not watch(request.user, [auction_id]):
             messages.warning(request, "Auction is already in your watchlist")
             return HttpResponseRedirect(reverse('auction', args=(auction_id,)))
         else:
-            watchlist.auctions.add(auction)
             messages.success(request, "Auction added to watchlist")
             return HttpResponseRedirect(reverse('watchlist'))
 
@@ -268,6 +374,34 @@ def watchlist(request):
         })
 
 
+# Bulk watch/unwatch (JSON)
+@require_POST
+def watchlist_bulk(request):
+    """Add and remove many auctions in one call: {"add": [ids], "remove": [ids]}."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required', 'success': False}, status=401)
+
+    try:
+        data = json.loads(request.body)
+        add_ids = [int(auction_id) for auction_id in data.get('add', [])]
+        remove_ids = [int(auction_id) for auction_id in data.get('remove', [])]
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return JsonResponse({'error': 'Expected {"add": [ids], "remove": [ids]}', 'success': False}, status=400)
+
+    if len(add_ids) + len(remove_ids) > MAX_BULK_IDS:
+        return JsonResponse({'error': f'At most {MAX_BULK_IDS} auctions per request', 'success': False}, status=400)
+
+    added = watch(request.user, add_ids) if add_ids else []
+    removed = unwatch(request.user, remove_ids) if remove_ids else []
+
+    return JsonResponse({
+        'success': True,
+        'added': added,
+        'removed': removed,
+        'watched_count': len(watched_auction_ids(request.user))
+    })
+
+
 # Remove auction from watchlist
 @login_required(login_url='/accounts/login/')
 def remove(request):
@@ -275,12 +409,8 @@ def remove(request):
         # Store auction id
         auction_id = request.POST["auction_id"]
 
-        # Access the auction by it's id
-        auction = Auction.objects.get(pk=auction_id)
-
         # Remove the auction from the user's watchlist
-        watchlist = Watchlist.objects.get(user=request.user)
-        watchlist.auctions.remove(auction)
+        unwatch(request.user, [auction_id])
 
         # Return to the watchlist list
         messages.success(request, "Auction removed from your watchlist")
@@ -288,10 +418,11 @@ def remove(request):
 
 
 # Categories
+@cache_anonymous_page(lambda: [LISTING_SCOPE])
 def categories(request):
-    # Retrieve the unique categories from the database with auction counts
-    categories = Auction.objects.values('category').annotate(
-        count=Count('id')
+    # Retrieve the categories with auction counts from the category stats table
+    categories = CategoryStats.objects.filter(
+        total_count__gt=0
     ).order_by('category')
 
     # Render the categories page
@@ -301,18 +432,42 @@ def categories(request):
 
 
 # Render category page based on his type
+@cache_anonymous_page(lambda category: [category_scope(category)])
 def page(request, category):
-    # Get auctions in this category
-    auctions = Auction.objects.filter(category=category).order_by('-created_at')
-
-    # Get count of auctions in this category
-    auction_count = auctions.count()
+    # Get auctions in this category, newest or most watched first, one keyset page at a time
+    auctions = paginate_auctions(request, Auction.objects.filter(category=category), per_page=12)
 
     # Active listings in that category
     return render(request, "auctions/page.html", {
         "auctions": auctions,
+        "category": category
+    })
+
+
+# Search
+def search(request):
+    """Full-text search over auction titles and descriptions."""
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category', '')
+    status = request.GET.get('status', '')
+
+    # Ignore unknown filter values instead of returning nothing
+    if category not in dict(CATEGORY_CHOICES):
+        category = ''
+    if status not in ('open', 'closed'):
+        status = ''
+
+    # Ranked results, counted and fetched one page at a time
+    results = search_auctions(query, category=category or None, status=status or None)
+    paginator = Paginator(results, 12)
+    auctions = paginator.get_page(request.GET.get('page'))
+
+    return render(request, "auctions/search.html", {
+        "auctions": auctions,
+        "query": query,
         "category": category,
-        "auction_count": auction_count
+        "status": status,
+        "category_choices": CATEGORY_CHOICES
     })
 
 
@@ -320,17 +475,22 @@ def page(request, category):
 @login_required(login_url='/accounts/login/')
 def my_auctions(request):
     """View user's created auctions."""
-    # Get all auctions created by the current user
-    auctions = Auction.objects.filter(user=request.user).order_by('-created_at')
+    # Get the auctions created by the current user, one keyset page at a time
+    user_auctions = Auction.objects.filter(user=request.user)
+    auctions = paginate_auctions(request, user_auctions, per_page=12, estimate_cap=None)
 
-    # Count of user's auctions
-    auction_count = auctions.count()
+    # Totals for the stats bar in a single aggregate query
+    stats = user_auctions.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_close=False)),
+        closed=Count('id', filter=Q(is_close=True))
+    )
 
     # Render the my auctions page
     return render(request, "auctions/my_auctions.html", {
         "auctions": auctions,
         "title": "My Auctions",
-        "auction_count": auction_count
+        "stats": stats
     })
 
 
@@ -0,0 +1,85 @@
+"""
+Watchlist membership and bulk watch/unwatch.
+
+Membership checks use the indexed (watchlist_id, auction_id) pairs of the
+Watchlist.auctions through table instead of loading the whole watchlist.
+When WATCHLIST_CACHE_TIMEOUT is set, each user's watched auction ids are
+also cached as one set and invalidated from the m2m_changed signal. The
+cache must be shared by every worker, so it is off with the default
+per-process cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .invalidation import invalidate_now_and_on_commit
+from .models import Auction, Watchlist
+
+
+WatchedAuction = Watchlist.auctions.through
+
+# Largest number of auction ids accepted by one watch()/unwatch() call
+MAX_BULK_IDS = 500
+
+
+def cache_key(user_id):
+    return f'watchlist:ids:{user_id}'
+
+
+def cache_enabled():
+    return settings.WATCHLIST_CACHE_TIMEOUT > 0
+
+
+def invalidate_watched_ids(user_ids):
+    """Forget the cached watched ids of the given users."""
+    if cache_enabled():
+        keys = [cache_key(user_id) for user_id in user_ids]
+        invalidate_now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def watched_auction_ids(user):
+    """Return the set of auction ids the user is watching."""
+    if cache_enabled():
+        ids = cache.get(cache_key(user.id))
+        if ids is not None:
+            return ids
+
+    ids = frozenset(
+        WatchedAuction.objects.filter(watchlist__user=user).values_list('auction_id', flat=True)
+    )
+    if cache_enabled():
+        cache.set(cache_key(user.id), ids, settings.WATCHLIST_CACHE_TIMEOUT)
+    return ids
+
+
+def is_watching(user, auction_id):
+    """Check whether the user is watching an auction without loading their watchlist."""
+    if not user.is_authenticated:
+        return False
+    if cache_enabled():
+        return int(auction_id) in watched_auction_ids(user)
+    return WatchedAuction.objects.filter(watchlist__user=user, auction_id=auction_id).exists()
+
+
+def watch(user, auction_ids):
+    """Add auctions to the user's watchlist, returning the sorted ids newly added (unknown ids are ignored)."""
+    watchlist, created = Watchlist.objects.get_or_create(user=user)
+    existing = set(Auction.objects.filter(id__in=auction_ids).values_list('id', flat=True))
+    already = set(
+        WatchedAuction.objects.filter(watchlist=watchlist, auction_id__in=existing).values_list('auction_id', flat=True)
+    )
+    added = sorted(existing - already)
+    if added:
+        watchlist.auctions.add(*added)
+    return added
+
+
+def unwatch(user, auction_ids):
+    """Remove auctions from the user's watchlist, returning the sorted ids removed."""
+    watchlist = Watchlist.objects.filter(user=user).first()
+    if watchlist is None:
+        return []
+    removed = sorted(
+        WatchedAuction.objects.filter(watchlist=watchlist, auction_id__in=auction_ids).values_list('auction_id', flat=True)
+    )
+    if removed:
+        watchlist.auctions.remove(*removed)
+    return removed
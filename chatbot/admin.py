@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .kb_index import invalidate_database_index
 from .models import ChatConversation, ChatMessage, ChatbotKnowledgeBase, ChatbotSettings
 
 
@@ -30,6 +31,7 @@ class ChatbotKnowledgeBaseAdmin(admin.ModelAdmin):
     list_filter = ['language', 'is_active', 'created_at']
     search_fields = ['category']
     readonly_fields = ['created_at', 'updated_at']
+    actions = ['activate_entries', 'deactivate_entries']
 
     fieldsets = (
         (None, {
@@ -45,6 +47,19 @@ class ChatbotKnowledgeBaseAdmin(admin.ModelAdmin):
         }),
     )
 
+    # Bulk updates send no signals, so the chatbot's cached copy is invalidated here
+    @admin.action(description='Activate selected entries')
+    def activate_entries(self, request, queryset):
+        updated = queryset.update(is_active=True)
+        invalidate_database_index()
+        self.message_user(request, f'{updated} entries activated.')
+
+    @admin.action(description='Deactivate selected entries')
+    def deactivate_entries(self, request, queryset):
+        updated = queryset.update(is_active=False)
+        invalidate_database_index()
+        self.message_user(request, f'{updated} entries deactivated.')
+
 
 @admin.register(ChatbotSettings)
 class ChatbotSettingsAdmin(admin.ModelAdmin):
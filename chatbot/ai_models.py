@@ -1,33 +1,31 @@
-import os
+"""
+AI models of the chatbot, loaded on first use.
+
+torch, transformers and sentence_transformers take seconds to import and
+hundreds of MB of memory, and the URLconf imports this module in every
+process, management commands included. They are therefore only looked up
+here (importlib.util.find_spec() does not import them) and imported by
+load_sentence_model(), when the first chat request starts, and by
+load_models(), when a request first falls back to the conversational model,
+or by warmup(). Each is attempted once per process, so missing dependencies
+cost nothing after the first request. Keep it that way: `manage.py benchmark_startup`
+fails when loading the URLconf imports any of them.
+"""
 import logging
+from importlib.util import find_spec
 
-# Try to import AI dependencies, handle gracefully if not available
-try:
-    import torch
-    TORCH_AVAILABLE = True
-except ImportError:
-    TORCH_AVAILABLE = False
-
-try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-
-try:
-    import nltk
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
+from .text_processor import NLTK_AVAILABLE, load_nltk
 
 logger = logging.getLogger(__name__)
 
+# Sentence transformer used for semantic similarity
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def dependencies_available(*modules) -> bool:
+    """Check that optional dependencies are installed, without importing them"""
+    return all(find_spec(module) is not None for module in modules)
+
 
 class ChatModels:
     """Manages AI models for the chatbot"""
@@ -43,20 +41,14 @@ class ChatModels:
 
     def __init__(self):
         if not self._models_loaded:
-            if TORCH_AVAILABLE:
-                self.device = "cuda" if torch.cuda.is_available() else "cpu"
-                logger.info(f"Using device: {self.device}")
-            else:
-                self.device = "cpu"
-                logger.warning("PyTorch not available, using CPU fallback")
-
-            # Initialize models to None - they will be loaded on first use
+            # Models and the device are set up on first use, not during startup
+            self.device = None
             self.tokenizer = None
             self.model = None
             self.sentence_model = None
-
-            self.initialize_nltk()
-            # Don't load models during startup - load them when needed
+            # Loads already attempted, successful or not
+            self._models_attempted = False
+            self._sentence_model_attempted = False
             self._models_loaded = True
 
     def initialize_nltk(self):
@@ -64,45 +56,53 @@ class ChatModels:
         if not NLTK_AVAILABLE:
             logger.warning("NLTK not available, skipping initialization")
             return
-
-        try:
-            nltk_dir = os.path.expanduser("~/nltk_data")
-            if not os.path.exists(nltk_dir):
-                os.makedirs(nltk_dir)
-
-            # Download required NLTK data
-            nltk.download('punkt', quiet=True, download_dir=nltk_dir)
-            nltk.download('stopwords', quiet=True, download_dir=nltk_dir)
-            logger.info("NLTK data initialized successfully")
-        except Exception as e:
-            logger.warning(f"NLTK initialization failed: {e}")
+        load_nltk()
+
+    def initialize_device(self):
+        """Pick the device the models run on"""
+        if self.device is not None:
+            return self.device
+        if dependencies_available('torch'):
+            import torch
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Using device: {self.device}")
+        else:
+            self.device = "cpu"
+            logger.warning("PyTorch not available, using CPU fallback")
+        return self.device
+
+    def warmup(self):
+        """Load NLTK data and every model now instead of on the first chat request"""
+        self.initialize_nltk()
+        self.load_models()
+        return self.is_available()
 
     def load_models(self):
-        """Load AI models"""
-        # Initialize models to None
-        self.tokenizer = None
-        self.model = None
-        self.sentence_model = None
+        """Load AI models, once per process; returns whether they are available"""
+        if self._models_attempted:
+            return self.is_available()
+        self._models_attempted = True
 
-        if not (TORCH_AVAILABLE and TRANSFORMERS_AVAILABLE and SENTENCE_TRANSFORMERS_AVAILABLE):
+        if not dependencies_available('torch', 'transformers', 'sentence_transformers'):
             logger.warning("AI dependencies not available, models will not be loaded")
-            return
+            return False
 
         try:
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
             # Load conversational model
             model_name = "microsoft/DialoGPT-small"
             logger.info(f"Loading conversational model: {model_name}")
 
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.device)
+            self.model = AutoModelForCausalLM.from_pretrained(model_name).to(self.initialize_device())
 
             # Add padding token if not present
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
 
             # Load sentence transformer for semantic similarity
-            logger.info("Loading sentence transformer model")
-            self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.load_sentence_model()
 
             logger.info("All models loaded successfully")
 
@@ -111,7 +111,26 @@ class ChatModels:
             # Fallback: set models to None
             self.tokenizer = None
             self.model = None
+        return self.is_available()
+
+    def load_sentence_model(self):
+        """Load only the sentence transformer, once per process; returns it or None"""
+        if self._sentence_model_attempted:
+            return self.sentence_model
+        self._sentence_model_attempted = True
+        if not dependencies_available('torch', 'sentence_transformers'):
+            logger.warning("Sentence transformers not available, sentence model will not be loaded")
+            return None
+
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            logger.info("Loading sentence transformer model")
+            self.sentence_model = SentenceTransformer(SENTENCE_MODEL_NAME)
+        except Exception as e:
+            logger.error(f"Failed to load sentence model: {e}")
             self.sentence_model = None
+        return self.sentence_model
 
     def generate_response(self, input_text, max_length=100):
         """Generate response using the conversational model"""
@@ -127,7 +146,9 @@ class ChatModels:
             input_ids = self.tokenizer.encode(input_text + self.tokenizer.eos_token, return_tensors='pt').to(self.device)
 
             # Generate response
-            if TORCH_AVAILABLE:
+            if dependencies_available('torch'):
+                import torch
+
                 with torch.no_grad():
                     output = self.model.generate(
                         input_ids,
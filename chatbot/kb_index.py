@@ -0,0 +1,250 @@
+"""
+Precomputed knowledge base index for matching user questions.
+
+Scoring a question example by example meant one sentence model call per
+example, each encoding both the question and the example, so a question
+cost about 2 x (number of examples) forward passes. KnowledgeBaseIndex
+encodes and L2-normalizes every example once into a matrix; a question is
+then encoded once and scored against all examples with a single
+matrix-vector product. Without a sentence model the preprocessed word sets
+of the examples are kept instead for the word-overlap fallback.
+
+The matrices of the static knowledge bases are read from the embedding
+store (see kb_store) when it was written by the same model from the same
+examples, and encoded then stored otherwise.
+
+The index of the database knowledge base (ChatbotKnowledgeBase rows) is
+kept per process under a version stamp in the CHATBOT_KB_VERSION_CACHE
+cache, which the model's post_save/post_delete signals and the admin bulk
+actions bump. Each worker reads the stamp at most every
+CHATBOT_KB_VERSION_TTL seconds, so messages cost no query, and the rows are
+only read and encoded again after they changed. Queryset updates send no
+signals and must call invalidate_database_index() themselves.
+"""
+import logging
+import time
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from auctions.invalidation import invalidate_now_and_on_commit
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from .kb_matcher import ExampleMatcher
+from .kb_store import load_embeddings, model_fingerprint, save_embeddings
+from .models import ChatbotKnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+# Cache key of the version stamp of the database knowledge base
+DATABASE_VERSION_KEY = 'chatbot:knowledge-base:version'
+
+# Scores of questions matching an example's text exactly or by containment
+EXACT_MATCH_SCORE = 1.0
+PARTIAL_MATCH_SCORE = 0.8
+
+
+class KnowledgeBaseIndex:
+    """Examples of a knowledge base with their precomputed vectors"""
+
+    def __init__(self, entries: Sequence[Tuple[object, Sequence[str]]], text_processor, encode: bool = True):
+        """
+        Args:
+            entries: (key, examples) pairs, key being returned for matches of its examples
+            text_processor: TextProcessor used to preprocess and encode texts
+            encode: Encode the examples now; otherwise matrix is left for the caller to set
+        """
+        self.sentence_model = text_processor.sentence_model
+        self.keys = []
+        self.examples = []
+        self.processed = []
+        for key, examples in entries:
+            for example in examples:
+                self.keys.append(key)
+                self.examples.append(example.lower().strip())
+                self.processed.append(text_processor.preprocess_text(example))
+
+        self.token_sets = [set(text.split()) for text in self.processed]
+        self.matrix = self.encode(self.processed) if encode and self.processed else None
+
+    def encode(self, texts: List[str]):
+        """Return L2-normalized embeddings of texts, or None without a sentence model"""
+        if not self.sentence_model or not NUMPY_AVAILABLE:
+            return None
+        try:
+            vectors = np.asarray(self.sentence_model.encode(texts), dtype=np.float32).reshape(len(texts), -1)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+            return vectors
+        except Exception as e:
+            logger.warning(f"Error encoding knowledge base texts: {e}")
+            return None
+
+    @cached_property
+    def matcher(self) -> ExampleMatcher:
+        """Exact and partial text matcher of the examples, compiled on first use"""
+        return ExampleMatcher(self.examples)
+
+    def similarities(self, processed_input: str) -> List[float]:
+        """Semantic similarity of a preprocessed question to every example"""
+        if self.matrix is not None:
+            query = self.encode([processed_input])
+            if query is not None:
+                return (self.matrix @ query[0]).tolist()
+
+        # Word overlap (Jaccard) fallback, as TextProcessor.simple_similarity()
+        words = set(processed_input.split())
+        return [
+            len(words & tokens) / len(words | tokens) if words and tokens else 0.0
+            for tokens in self.token_sets
+        ]
+
+    def search(self, user_input: str, processed_input: str, top_k: int = 1,
+               match_text: bool = True) -> List[Tuple[object, float]]:
+        """
+        Find the keys whose examples best match a question.
+
+        Args:
+            user_input: The question as typed
+            processed_input: The question after TextProcessor.preprocess_text()
+            top_k: Number of distinct keys to return
+            match_text: Also score exact (EXACT_MATCH_SCORE) and partial
+                (PARTIAL_MATCH_SCORE) text matches of the examples
+
+        Returns:
+            Up to top_k (key, score) pairs, best first; an exact match is
+            returned on its own
+        """
+        if not self.keys:
+            return []
+
+        scores = self.similarities(processed_input)
+        if match_text:
+            user_input_lower = user_input.lower().strip()
+            exact = self.matcher.exact.get(user_input_lower)
+            if exact is not None:
+                return [(self.keys[exact], EXACT_MATCH_SCORE)]
+            for row in self.matcher.partial_matches(user_input_lower):
+                scores[row] = max(scores[row], PARTIAL_MATCH_SCORE)
+
+        # Best score first, earlier examples first among equal scores
+        ranked = sorted(range(len(scores)), key=lambda row: -scores[row])
+        matches = []
+        seen = set()
+        for row in ranked:
+            key = self.keys[row]
+            if key not in seen:
+                seen.add(key)
+                matches.append((key, float(scores[row])))
+                if len(matches) == top_k:
+                    break
+        return matches
+
+
+# Indexes of the static knowledge bases, per language
+_static_indexes: Dict[str, KnowledgeBaseIndex] = {}
+
+
+def _static_entries(knowledge_base: Dict) -> List[Tuple[str, List[str]]]:
+    return [(category, data["examples"]) for category, data in knowledge_base.items()]
+
+
+def static_index(language: str, knowledge_base: Dict, text_processor) -> KnowledgeBaseIndex:
+    """
+    Return the index of a static knowledge base, building it on first use.
+
+    The index is rebuilt when the sentence model changes (e.g. once it has
+    been loaded), so its vectors always come from the model in use. They are
+    memory-mapped from the embedding store when it is up to date; otherwise
+    they are encoded and the store is rewritten for the other workers.
+    """
+    index: Optional[KnowledgeBaseIndex] = _static_indexes.get(language)
+    if index is None or index.sentence_model is not text_processor.sentence_model:
+        index = KnowledgeBaseIndex(_static_entries(knowledge_base), text_processor, encode=False)
+        fingerprint = model_fingerprint(index.sentence_model)
+        index.matrix = load_embeddings(language, index.processed, fingerprint)
+        if index.matrix is None and index.processed:
+            index.matrix = index.encode(index.processed)
+            if index.matrix is not None and fingerprint:
+                try:
+                    save_embeddings(language, index.keys, index.examples, index.processed, index.matrix, fingerprint)
+                except Exception as e:
+                    logger.warning(f"Error writing knowledge base embedding store: {e}")
+        _static_indexes[language] = index
+    return index
+
+
+def store_static_embeddings(language: str, knowledge_base: Dict, text_processor) -> Optional[str]:
+    """Encode a static knowledge base and write its store, returning the manifest path or None."""
+    index = KnowledgeBaseIndex(_static_entries(knowledge_base), text_processor)
+    fingerprint = model_fingerprint(index.sentence_model)
+    if index.matrix is None or not fingerprint:
+        return None
+    path = save_embeddings(language, index.keys, index.examples, index.processed, index.matrix, fingerprint)
+    _static_indexes[language] = index
+    return path
+
+
+# (version stamp, index, responses per category) of the database knowledge base, per language
+_database_indexes: Dict[str, Tuple[int, KnowledgeBaseIndex, Dict[str, List[str]]]] = {}
+
+# (time.monotonic() when read, version stamp) last read by this process
+_database_version: Optional[Tuple[float, int]] = None
+
+
+def database_version() -> int:
+    """Return the version stamp of the database knowledge base, reusing the last one read for a few seconds"""
+    global _database_version
+    now = time.monotonic()
+    if _database_version and now - _database_version[0] < settings.CHATBOT_KB_VERSION_TTL:
+        return _database_version[1]
+
+    cache = caches[settings.CHATBOT_KB_VERSION_CACHE]
+    version = cache.get(DATABASE_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a stamp lost to eviction never repeats an old one
+        cache.add(DATABASE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATABASE_VERSION_KEY)
+    _database_version = (now, version)
+    return version
+
+
+def _bump_database_version():
+    global _database_version
+    cache = caches[settings.CHATBOT_KB_VERSION_CACHE]
+    try:
+        cache.incr(DATABASE_VERSION_KEY)
+    except ValueError:
+        cache.set(DATABASE_VERSION_KEY, time.time_ns(), timeout=None)
+    # This process sees its own changes at once, the others within CHATBOT_KB_VERSION_TTL
+    _database_version = None
+
+
+def invalidate_database_index():
+    """Make every process reload the database knowledge base."""
+    invalidate_now_and_on_commit(_bump_database_version)
+
+
+def database_index(language: str, text_processor) -> Tuple[KnowledgeBaseIndex, Dict[str, List[str]]]:
+    """Return (index, responses) for the active database knowledge base entries of a language."""
+    # Read before the rows, so a change made while loading triggers another load
+    version = database_version()
+    cached = _database_indexes.get(language)
+    if cached and cached[0] == version and cached[1].sentence_model is text_processor.sentence_model:
+        return cached[1], cached[2]
+
+    entries = list(
+        ChatbotKnowledgeBase.objects.filter(language=language, is_active=True)
+        .values_list('category', 'examples', 'responses')
+    )
+    index = KnowledgeBaseIndex([(category, examples) for category, examples, _ in entries], text_processor)
+    responses = {category: category_responses for category, _, category_responses in entries}
+    _database_indexes[language] = (version, index, responses)
+    return index, responses
@@ -0,0 +1,106 @@
+"""
+Compiled exact and partial text matching of knowledge base examples.
+
+A question matched the examples of a knowledge base by text when it equals
+one of them, contains one or is contained in one, which used to be checked
+example by example on every question. ExampleMatcher compiles the
+normalized examples once:
+
+* a dict from example to its first row answers exact matches,
+* an Aho-Corasick automaton finds every example contained in a question in
+  a single pass over the question, whatever the number of examples,
+* the examples joined into one string find the examples containing a
+  question with str.find(), visiting only the examples that match.
+"""
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Sequence, Set
+
+# Joins the examples of the corpus, so an occurrence of a text without it
+# lies within a single example
+SEPARATOR = "\x00"
+
+
+class ExampleMatcher:
+    """Exact and substring matcher over normalized (lowercased, stripped) examples"""
+
+    def __init__(self, examples: Sequence[str]):
+        self.examples = list(examples)
+        self.exact: Dict[str, int] = {}
+        for row, example in enumerate(self.examples):
+            self.exact.setdefault(example, row)
+
+        # Aho-Corasick automaton: goto transitions, failure links, rows ending
+        # at each node and the nearest node along the failure links with rows
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail = [0]
+        self.outputs: List[List[int]] = [[]]
+        for row, example in enumerate(self.examples):
+            node = 0
+            for char in example:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[node][char] = child
+                node = child
+            self.outputs[node].append(row)
+
+        self.output_link = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                suffix = self.fail[child]
+                self.output_link[child] = suffix if self.outputs[suffix] and suffix else self.output_link[suffix]
+
+        self.corpus = SEPARATOR.join(self.examples)
+        self.starts = []
+        offset = 0
+        for example in self.examples:
+            self.starts.append(offset)
+            offset += len(example) + len(SEPARATOR)
+
+    def contained_in(self, text: str) -> Set[int]:
+        """Rows of the examples that occur in text"""
+        # Empty examples occur in any text
+        rows = set(self.outputs[0])
+        node = 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            match = node if self.outputs[node] else self.output_link[node]
+            while match:
+                rows.update(self.outputs[match])
+                match = self.output_link[match]
+        return rows
+
+    def containing(self, text: str) -> Set[int]:
+        """Rows of the examples that text occurs in"""
+        if not text:
+            return set(range(len(self.examples)))
+        if SEPARATOR in text:
+            return {row for row, example in enumerate(self.examples) if text in example}
+
+        rows = set()
+        position = self.corpus.find(text)
+        while position != -1:
+            row = bisect_right(self.starts, position) - 1
+            rows.add(row)
+            if row + 1 == len(self.starts):
+                break
+            # The next example that could contain text starts after this one
+            position = self.corpus.find(text, self.starts[row + 1])
+        return rows
+
+    def partial_matches(self, text: str) -> Set[int]:
+        """Rows of the examples that occur in text or that text occurs in"""
+        return self.contained_in(text) | self.containing(text)
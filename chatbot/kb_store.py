@@ -0,0 +1,175 @@
+"""
+On-disk store of the static knowledge base example embeddings.
+
+Encoding every example is the slowest part of building a KnowledgeBaseIndex
+and each worker process used to repeat it. `manage.py populate_knowledge_base`
+writes the normalized embedding matrix of each language to a versioned .npy
+file under CHATBOT_EMBEDDINGS_DIR, next to a JSON manifest holding the row
+metadata (key and example of every row), the fingerprint of the model that
+encoded them and a hash of the preprocessed examples. Workers open the
+matrix with np.load(mmap_mode='r'), so it is not re-encoded and every
+process on the host shares the same pages.
+
+A store whose model fingerprint or example hash does not match is stale:
+the index is encoded in memory as before and the store is rewritten.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the store or of its manifest changes
+FORMAT_VERSION = 1
+
+# Sentence encoded to tell models apart, rounded to absorb float noise between devices
+PROBE_TEXT = "knowledge base embedding store fingerprint"
+PROBE_DECIMALS = 4
+
+# Fingerprint of each sentence model in use, per model object
+_fingerprints = {}
+
+
+def model_fingerprint(sentence_model) -> Optional[str]:
+    """Return a hash identifying the embeddings a sentence model produces, or None"""
+    if not sentence_model or not NUMPY_AVAILABLE:
+        return None
+    cached = _fingerprints.get(id(sentence_model))
+    if cached and cached[0] is sentence_model:
+        return cached[1]
+    try:
+        probe = np.asarray(sentence_model.encode([PROBE_TEXT]), dtype=np.float32).reshape(-1)
+    except Exception as e:
+        logger.warning(f"Error fingerprinting sentence model: {e}")
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(f"{FORMAT_VERSION}:{type(sentence_model).__module__}.{type(sentence_model).__name__}".encode())
+    digest.update(f":{probe.size}:".encode())
+    # + 0.0 turns -0.0 into 0.0
+    digest.update((np.round(probe, PROBE_DECIMALS) + 0.0).tobytes())
+    fingerprint = digest.hexdigest()
+    _fingerprints[id(sentence_model)] = (sentence_model, fingerprint)
+    return fingerprint
+
+
+def examples_hash(processed: Sequence[str]) -> str:
+    """Hash of the preprocessed examples an embedding matrix was encoded from"""
+    return hashlib.sha256(json.dumps(list(processed), ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def manifest_path(language: str) -> str:
+    """Path of the manifest describing the store of a language"""
+    return os.path.join(settings.CHATBOT_EMBEDDINGS_DIR, f"kb-{language}.json")
+
+
+def load_embeddings(language: str, processed: Sequence[str], fingerprint: Optional[str]):
+    """
+    Open the stored embeddings of a language read-only and memory-mapped.
+
+    Args:
+        language: Language of the knowledge base
+        processed: Preprocessed examples, in index row order
+        fingerprint: model_fingerprint() of the sentence model in use
+
+    Returns:
+        The (examples x dimensions) float32 matrix, or None when the store is
+        missing, unreadable or stale
+    """
+    if not fingerprint or not NUMPY_AVAILABLE:
+        return None
+    try:
+        with open(manifest_path(language), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Error reading knowledge base embedding manifest: {e}")
+        return None
+
+    if (manifest.get('format_version') != FORMAT_VERSION
+            or manifest.get('model_fingerprint') != fingerprint
+            or manifest.get('examples_hash') != examples_hash(processed)):
+        logger.info(f"Knowledge base embedding store for '{language}' is stale")
+        return None
+
+    try:
+        matrix = np.load(os.path.join(settings.CHATBOT_EMBEDDINGS_DIR, manifest['matrix']), mmap_mode='r')
+    except Exception as e:
+        logger.warning(f"Error loading knowledge base embeddings: {e}")
+        return None
+    if matrix.dtype != np.float32 or matrix.shape != (len(processed), manifest.get('dimensions')):
+        logger.warning(f"Knowledge base embedding store for '{language}' does not match its manifest")
+        return None
+    return matrix
+
+
+def _replace_atomically(path: str, write) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, 'wb') as output:
+            write(output)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save_embeddings(language: str, keys: List, examples: List[str], processed: Sequence[str],
+                    matrix, fingerprint: str) -> str:
+    """
+    Write the embeddings of a language, replacing any older version.
+
+    The versioned matrix is written before the manifest pointing to it, both
+    through a rename, so readers never see a partial store.
+
+    Args:
+        language: Language of the knowledge base
+        keys: Key of each row
+        examples: Example text of each row
+        processed: Preprocessed example of each row, which the rows encode
+        matrix: L2-normalized embeddings, one row per example
+        fingerprint: model_fingerprint() of the model that encoded them
+
+    Returns:
+        The path of the manifest
+    """
+    directory = settings.CHATBOT_EMBEDDINGS_DIR
+    os.makedirs(directory, exist_ok=True)
+    content_hash = examples_hash(processed)
+    matrix_name = f"kb-{language}-v{FORMAT_VERSION}-{fingerprint[:12]}-{content_hash[:12]}.npy"
+    _replace_atomically(
+        os.path.join(directory, matrix_name),
+        lambda output: np.save(output, np.ascontiguousarray(matrix, dtype=np.float32))
+    )
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'language': language,
+        'model_fingerprint': fingerprint,
+        'examples_hash': content_hash,
+        'matrix': matrix_name,
+        'dimensions': int(matrix.shape[1]),
+        'rows': [{'key': str(key), 'example': example} for key, example in zip(keys, examples)],
+    }
+    path = manifest_path(language)
+    _replace_atomically(
+        path, lambda output: output.write(json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+    )
+
+    # Processes still mapping an older version keep reading it until they reload
+    prefix = f"kb-{language}-v"
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith('.npy') and name != matrix_name:
+            os.remove(os.path.join(directory, name))
+    return path
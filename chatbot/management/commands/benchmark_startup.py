@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Dependencies of the chatbot models that must only be imported on first use
+HEAVY_MODULES = ('torch', 'transformers', 'sentence_transformers', 'nltk', 'sklearn')
+
+# Run in a fresh interpreter: set Django up and load the URLconf, as every
+# worker and management command does, then report what that cost
+STARTUP_SCRIPT = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+heavy = set(sys.argv[1:])
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': sorted(name for name in sys.modules if name.split('.')[0] in heavy),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Time Django setup and URLconf loading in fresh interpreters, failing if it exceeds '
+        'the budget or imports the chatbot model dependencies'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=2000,
+            help='Largest acceptable median startup time in milliseconds (default: 2000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Interpreters started (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'commerce.settings'))
+        runs = []
+        for _ in range(options['repeat']):
+            result = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT, *HEAVY_MODULES],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if result.returncode:
+                raise CommandError(f'Startup failed:\n{result.stderr}')
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        median = statistics.median(run['ms'] for run in runs)
+        rss = max(run['rss_mb'] for run in runs)
+        heavy = sorted({name.split('.')[0] for run in runs for name in run['heavy']})
+        self.stdout.write(
+            f'startup median {median:7.1f} ms   max {max(run["ms"] for run in runs):7.1f} ms   '
+            f'peak RSS {rss:6.1f} MB'
+        )
+
+        budget = options['budget_ms']
+        if heavy:
+            raise CommandError(f'Startup imported {", ".join(heavy)}; import them on first use instead')
+        if median > budget:
+            raise CommandError(f'Startup took {median:.1f} ms, over the {budget:g} ms budget')
+        self.stdout.write(self.style.SUCCESS(f'Successfully started within the {budget:g} ms budget'))
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from chatbot.models import ChatbotKnowledgeBase
 from chatbot.knowledge_base import KNOWLEDGE_BASE_AR, KNOWLEDGE_BASE_EN
+from chatbot.kb_index import store_static_embeddings
+from chatbot.text_processor import TextProcessor
 
 
 class Command(BaseCommand):
@@ -12,6 +14,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing knowledge base before populating',
         )
+        parser.add_argument(
+            '--skip-embeddings',
+            action='store_true',
+            help='Do not load the sentence model to write the knowledge base embedding store',
+        )
 
     def handle(self, *args, **options):
         if options['clear']:
@@ -101,9 +108,27 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f'  Setting exists: {setting["key"]}')
 
+        if not options['skip_embeddings']:
+            self.build_embeddings()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully populated knowledge base with '
                 f'{len(KNOWLEDGE_BASE_AR)} Arabic and {len(KNOWLEDGE_BASE_EN)} English categories'
             )
         )
+
+    def build_embeddings(self):
+        """Encode the examples of both knowledge bases into the on-disk embedding store."""
+        from chatbot.ai_models import chat_models
+
+        self.stdout.write('Building knowledge base embeddings...')
+        text_processor = TextProcessor(chat_models.load_sentence_model())
+        for language, knowledge_base in (('ar', KNOWLEDGE_BASE_AR), ('en', KNOWLEDGE_BASE_EN)):
+            path = store_static_embeddings(language, knowledge_base, text_processor)
+            if path is None:
+                self.stdout.write(self.style.WARNING(
+                    '  Sentence model not available, embeddings will be encoded by each worker'
+                ))
+                return
+            self.stdout.write(f'  Wrote: {path}')
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .kb_index import invalidate_database_index
+from .models import ChatbotKnowledgeBase
+
+
+@receiver(post_save, sender=ChatbotKnowledgeBase)
+@receiver(post_delete, sender=ChatbotKnowledgeBase)
+def knowledge_base_changed(sender, instance, **kwargs):
+    """Make the workers reload the database knowledge base."""
+    invalidate_database_index()
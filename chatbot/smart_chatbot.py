@@ -5,9 +5,10 @@ import uuid
 from typing import Dict, List, Tuple, Optional
 
 from .ai_models import chat_models
+from .kb_index import database_index, static_index
 from .text_processor import TextProcessor
 from .knowledge_base import KNOWLEDGE_BASE_AR, KNOWLEDGE_BASE_EN
-from .models import ChatConversation, ChatMessage, ChatbotKnowledgeBase
+from .models import ChatConversation, ChatMessage
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,8 @@ class SmartChatBot:
     def __init__(self, session_id: str = None, user=None):
         self.session_id = session_id or str(uuid.uuid4())
         self.user = user
-        self.text_processor = TextProcessor(chat_models.sentence_model)
+        # The sentence model is loaded by the first chat request
+        self.text_processor = TextProcessor(chat_models.load_sentence_model())
         self.conversation = self.get_or_create_conversation()
         self.min_confidence_threshold = 0.4
 
@@ -57,53 +59,17 @@ class SmartChatBot:
         """Search knowledge base for best matching response"""
         try:
             knowledge_base = self.get_knowledge_base(language)
+            index = static_index(language, knowledge_base, self.text_processor)
             processed_input = self.text_processor.preprocess_text(user_input)
-            user_input_lower = user_input.lower().strip()
-
-            best_match = None
-            highest_score = 0
-            best_category = None
-
-            # First, try exact or partial matches for better accuracy
-            for category, data in knowledge_base.items():
-                for example in data["examples"]:
-                    example_lower = example.lower().strip()
-
-                    # Check for exact match
-                    if user_input_lower == example_lower:
-                        highest_score = 1.0
-                        best_match = category
-                        best_category = category
-                        break
-
-                    # Check for partial match (contains)
-                    if user_input_lower in example_lower or example_lower in user_input_lower:
-                        partial_score = 0.8
-                        if partial_score > highest_score:
-                            highest_score = partial_score
-                            best_match = category
-                            best_category = category
-
-                    # Use semantic similarity
-                    similarity = self.text_processor.get_semantic_similarity(
-                        processed_input,
-                        self.text_processor.preprocess_text(example)
-                    )
-
-                    if similarity > highest_score:
-                        highest_score = similarity
-                        best_match = category
-                        best_category = category
-
-                if highest_score == 1.0:  # Found exact match, break early
-                    break
-
-            if highest_score > self.min_confidence_threshold:
-                responses = knowledge_base[best_match]["responses"]
-                response = random.choice(responses)
-                return response, highest_score, best_category
-
-            return None, highest_score, None
+
+            # Exact and partial matches score highest, then semantic similarity
+            matches = index.search(user_input, processed_input)
+            if matches and matches[0][1] > self.min_confidence_threshold:
+                category, score = matches[0]
+                response = random.choice(knowledge_base[category]["responses"])
+                return response, score, category
+
+            return None, matches[0][1] if matches else 0, None
 
         except Exception as e:
             logger.error(f"Error searching knowledge base: {e}")
@@ -113,32 +79,17 @@ class SmartChatBot:
         """Search database knowledge base for responses"""
         try:
             processed_input = self.text_processor.preprocess_text(user_input)
-            kb_entries = ChatbotKnowledgeBase.objects.filter(
-                language=language,
-                is_active=True
-            )
-
-            best_match = None
-            highest_score = 0
-            best_category = None
-
-            for entry in kb_entries:
-                for example in entry.examples:
-                    similarity = self.text_processor.get_semantic_similarity(
-                        processed_input,
-                        self.text_processor.preprocess_text(example)
-                    )
 
-                    if similarity > highest_score:
-                        highest_score = similarity
-                        best_match = entry
-                        best_category = entry.category
+            # Entries are loaded and encoded again only after they changed
+            index, responses = database_index(language, self.text_processor)
+            matches = index.search(user_input, processed_input, match_text=False)
 
-            if best_match and highest_score > self.min_confidence_threshold:
-                response = random.choice(best_match.responses)
-                return response, highest_score, best_category
+            if matches and matches[0][1] > self.min_confidence_threshold:
+                category, score = matches[0]
+                response = random.choice(responses[category])
+                return response, score, category
 
-            return None, highest_score, None
+            return None, matches[0][1] if matches else 0, None
 
         except Exception as e:
             logger.error(f"Error searching database knowledge base: {e}")
@@ -147,7 +98,8 @@ class SmartChatBot:
     def generate_ai_response(self, user_input: str, language: str) -> str:
         """Generate response using AI model"""
         try:
-            if chat_models.is_available():
+            # The conversational model is loaded on first fallback
+            if chat_models.load_models():
                 response = chat_models.generate_response(user_input)
                 if response and len(response.strip()) > 0:
                     return response
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import ai_models, kb_index
+from .kb_index import EXACT_MATCH_SCORE, PARTIAL_MATCH_SCORE, KnowledgeBaseIndex, database_index, static_index
+from .kb_store import manifest_path
+from .kb_matcher import ExampleMatcher
+from .knowledge_base import KNOWLEDGE_BASE_AR, KNOWLEDGE_BASE_EN
+from .models import ChatbotKnowledgeBase
+from .smart_chatbot import SmartChatBot
+from .text_processor import TextProcessor
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words stand-in for a sentence model, counting encode() calls."""
+
+    def __init__(self, dimensions=64):
+        self.dimensions = dimensions
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(len(texts))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, sum(map(ord, word)) % self.dimensions] += 1
+        return vectors
+
+
+class KnowledgeBaseIndexTests(TestCase):
+    def test_examples_are_encoded_once_and_questions_once(self):
+        encoder = HashingEncoder()
+        processor = TextProcessor(encoder)
+        index = KnowledgeBaseIndex([(category, data["examples"]) for category, data in KNOWLEDGE_BASE_EN.items()], processor)
+        self.assertEqual(encoder.calls, [len(index.keys)])
+
+        question = processor.preprocess_text("what payment methods can I use")
+        scores = index.similarities(question)
+        self.assertEqual(encoder.calls[1:], [1])
+
+        # Same cosine similarities as encoding each pair separately
+        for row, example in enumerate(index.examples):
+            pair = encoder.encode([question, processor.preprocess_text(example)])
+            norms = np.linalg.norm(pair, axis=1)
+            expected = float(pair[0] @ pair[1] / (norms[0] * norms[1])) if norms.all() else 0.0
+            self.assertAlmostEqual(scores[row], expected, places=5)
+
+    def test_matches_agree_with_pairwise_fallback(self):
+        processor = TextProcessor()
+        index = static_index('en', KNOWLEDGE_BASE_EN, processor)
+        self.assertIs(static_index('en', KNOWLEDGE_BASE_EN, processor), index)
+
+        for question in ("how do I place a bid on an item", "forgot password help", "shipping cost to cairo"):
+            processed = processor.preprocess_text(question)
+            best = max(
+                (processor.simple_similarity(processed, processor.preprocess_text(example)), category)
+                for category, data in KNOWLEDGE_BASE_EN.items() for example in data["examples"]
+            )
+            (category, score), = index.search(question, processed, match_text=False)
+            self.assertAlmostEqual(score, best[0])
+
+    def test_exact_and_partial_matches(self):
+        processor = TextProcessor()
+        index = KnowledgeBaseIndex([('greeting', ['Hello there']), ('bye', ['goodbye'])], processor)
+        self.assertEqual(index.search('hello there', 'hello'), [('greeting', EXACT_MATCH_SCORE)])
+        self.assertEqual(index.search('goodbye friend', 'goodbye friend', top_k=2)[0], ('bye', PARTIAL_MATCH_SCORE))
+        self.assertEqual(KnowledgeBaseIndex([], processor).search('hi', 'hi'), [])
+
+    def test_chatbot_answers_from_both_knowledge_bases(self):
+        bot = SmartChatBot()
+        response, score, category = bot.search_knowledge_base(KNOWLEDGE_BASE_EN["greetings"]["examples"][0], 'en')
+        self.assertEqual((category, score), ("greetings", EXACT_MATCH_SCORE))
+        self.assertIn(response, KNOWLEDGE_BASE_EN["greetings"]["responses"])
+
+        ChatbotKnowledgeBase.objects.create(
+            category='returns', language='en', examples=['return policy for a refund'], responses=['30 days.']
+        )
+        self.assertEqual(
+            bot.search_database_knowledge_base('refund return policy', 'en'), ('30 days.', 1.0, 'returns')
+        )
+
+
+def pairwise_text_search(index, user_input, processed_input, top_k=1):
+    """KnowledgeBaseIndex.search() as it matched texts before the compiled matcher"""
+    scores = index.similarities(processed_input)
+    user_input_lower = user_input.lower().strip()
+    for row, example in enumerate(index.examples):
+        if user_input_lower == example:
+            return [(index.keys[row], EXACT_MATCH_SCORE)]
+        if user_input_lower in example or example in user_input_lower:
+            scores[row] = max(scores[row], PARTIAL_MATCH_SCORE)
+    ranked = sorted(range(len(scores)), key=lambda row: -scores[row])
+    matches = []
+    for row in ranked:
+        if index.keys[row] not in [key for key, _ in matches]:
+            matches.append((index.keys[row], float(scores[row])))
+    return matches[:top_k]
+
+
+class ExampleMatcherTests(TestCase):
+    def test_matches_agree_with_substring_checks(self):
+        rng = random.Random(0)
+        examples = ['he', 'she', 'his', 'hers', 'h', 'ushers', 'she', ''] + [
+            ''.join(rng.choice('ahesr ') for _ in range(rng.randint(1, 8))) for _ in range(200)
+        ]
+        matcher = ExampleMatcher(examples)
+        for text in ['', 'ushers', 'a\x00she'] + [
+            ''.join(rng.choice('ahesr ') for _ in range(rng.randint(0, 12))) for _ in range(300)
+        ]:
+            self.assertEqual(matcher.contained_in(text), {row for row, example in enumerate(examples) if example in text})
+            self.assertEqual(matcher.containing(text), {row for row, example in enumerate(examples) if text in example})
+        self.assertEqual(matcher.exact['she'], 1)
+
+    def test_knowledge_base_categories_are_unchanged(self):
+        processor = TextProcessor()
+        for language, knowledge_base in (('en', KNOWLEDGE_BASE_EN), ('ar', KNOWLEDGE_BASE_AR)):
+            index = static_index(language, knowledge_base, processor)
+            examples = [example for data in knowledge_base.values() for example in data["examples"]]
+            questions = [question for example in examples for question in (
+                example, example.upper() + '  ', example[:len(example) // 2], example[len(example) // 3:],
+                f"please {example} thanks", example.split()[-1] if example.split() else example,
+            )] + ["", "hi", "what is the weather on mars", "bid", "مرحبا"]
+            for question in questions:
+                processed = processor.preprocess_text(question)
+                self.assertEqual(
+                    index.search(question, processed, top_k=3),
+                    pairwise_text_search(index, question, processed, top_k=3),
+                    question
+                )
+
+
+class EmbeddingStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(CHATBOT_EMBEDDINGS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(kb_index._static_indexes.clear)
+
+    def fresh_worker(self, encoder):
+        kb_index._static_indexes.clear()
+        return static_index('en', KNOWLEDGE_BASE_EN, TextProcessor(encoder))
+
+    def test_workers_map_the_stored_matrix_instead_of_encoding(self):
+        built = self.fresh_worker(HashingEncoder())
+        with open(manifest_path('en'), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(len(manifest['rows']), len(built.keys))
+        self.assertEqual(manifest['rows'][0], {'key': built.keys[0], 'example': built.examples[0]})
+
+        encoder = HashingEncoder()
+        loaded = self.fresh_worker(encoder)
+        # Only the fingerprint probe is encoded
+        self.assertEqual(encoder.calls, [1])
+        self.assertIsInstance(loaded.matrix, np.memmap)
+        np.testing.assert_array_equal(loaded.matrix, built.matrix)
+
+        question = "how do I place a bid"
+        processed = TextProcessor().preprocess_text(question)
+        self.assertEqual(loaded.search(question, processed, top_k=3), built.search(question, processed, top_k=3))
+
+    def test_stale_fingerprint_rebuilds_the_store(self):
+        self.fresh_worker(HashingEncoder(dimensions=64))
+        encoder = HashingEncoder(dimensions=32)
+        index = self.fresh_worker(encoder)
+        self.assertIn(len(index.keys), encoder.calls)
+        self.assertEqual(index.matrix.shape, (len(index.keys), 32))
+
+        # The older version is replaced
+        matrices = [name for name in os.listdir(self.directory) if name.endswith('.npy')]
+        self.assertEqual(len(matrices), 1)
+        encoder = HashingEncoder(dimensions=32)
+        self.fresh_worker(encoder)
+        self.assertEqual(encoder.calls, [1])
+
+    def test_without_sentence_model_nothing_is_stored(self):
+        index = self.fresh_worker(None)
+        self.assertIsNone(index.matrix)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class DatabaseKnowledgeBaseCacheTests(TestCase):
+    def setUp(self):
+        self.addCleanup(kb_index._database_indexes.clear)
+        self.addCleanup(setattr, kb_index, '_database_version', None)
+        self.entry = ChatbotKnowledgeBase.objects.create(
+            category='returns', language='en', examples=['return policy for a refund'], responses=['30 days.']
+        )
+        self.processor = TextProcessor()
+
+    def test_entries_are_loaded_once_until_they_change(self):
+        index, responses = database_index('en', self.processor)
+        self.assertEqual(responses, {'returns': ['30 days.']})
+        with self.assertNumQueries(0):
+            self.assertIs(database_index('en', self.processor)[0], index)
+
+        self.entry.responses = ['Within 14 days.']
+        self.entry.save()
+        index, responses = database_index('en', self.processor)
+        self.assertEqual(responses, {'returns': ['Within 14 days.']})
+
+        self.entry.delete()
+        self.assertEqual(database_index('en', self.processor)[0].keys, [])
+
+    def test_changes_from_other_workers_are_seen_once_the_stamp_is_read_again(self):
+        database_index('en', self.processor)
+        # Another worker saving the entry: only the table and the stamp cache are shared
+        with mock.patch('chatbot.signals.invalidate_database_index'):
+            self.entry.responses = ['Store credit only.']
+            self.entry.save()
+        caches[settings.CHATBOT_KB_VERSION_CACHE].incr(kb_index.DATABASE_VERSION_KEY)
+        self.assertEqual(database_index('en', self.processor)[1], {'returns': ['30 days.']})
+
+        with mock.patch.object(kb_index.time, 'monotonic', return_value=time.monotonic() + 60):
+            self.assertEqual(database_index('en', self.processor)[1], {'returns': ['Store credit only.']})
+
+    def test_admin_actions_invalidate_the_cached_entries(self):
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(admin_user)
+        database_index('en', self.processor)
+
+        self.client.post(reverse('admin:chatbot_chatbotknowledgebase_changelist'), {
+            'action': 'deactivate_entries', '_selected_action': [self.entry.pk],
+        })
+        self.assertFalse(ChatbotKnowledgeBase.objects.get(pk=self.entry.pk).is_active)
+        self.assertEqual(database_index('en', self.processor)[1], {})
+
+
+class StartupTests(TestCase):
+    def test_startup_does_not_import_model_dependencies(self):
+        out = StringIO()
+        # Timing is left to the benchmark itself; this guards the lazy imports
+        call_command('benchmark_startup', repeat=1, budget_ms=60000, stdout=out)
+        self.assertIn('Successfully started', out.getvalue())
+
+
+class LazyModelLoadingTests(TestCase):
+    def setUp(self):
+        # A fresh registry instead of the process-wide singleton
+        self.models = object.__new__(ai_models.ChatModels)
+        self.models.__init__()
+        patcher = mock.patch('chatbot.smart_chatbot.chat_models', self.models)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chat_request_loads_the_models_when_installed(self):
+        encoder = HashingEncoder()
+        tokenizer = mock.MagicMock(pad_token='<pad>')
+        tokenizer.decode.return_value = 'Happy to help!'
+        installed = {
+            'torch': SimpleNamespace(cuda=SimpleNamespace(is_available=lambda: False), no_grad=mock.MagicMock),
+            'transformers': SimpleNamespace(
+                AutoTokenizer=mock.Mock(from_pretrained=mock.Mock(return_value=tokenizer)),
+                AutoModelForCausalLM=mock.MagicMock(),
+            ),
+            'sentence_transformers': SimpleNamespace(SentenceTransformer=mock.Mock(return_value=encoder)),
+        }
+        with mock.patch.object(ai_models, 'find_spec', return_value=object()), \
+                mock.patch.dict(sys.modules, installed):
+            bot = SmartChatBot()
+            self.assertIs(bot.text_processor.sentence_model, encoder)
+            self.assertEqual(bot.generate_ai_response('hello', 'en'), 'Happy to help!')
+            SmartChatBot()
+        installed['sentence_transformers'].SentenceTransformer.assert_called_once()
+        installed['transformers'].AutoTokenizer.from_pretrained.assert_called_once()
+
+    def test_missing_dependencies_are_looked_up_once(self):
+        with mock.patch.object(ai_models, 'find_spec', return_value=None) as find_spec:
+            for _ in range(3):
+                bot = SmartChatBot()
+                self.assertIsNone(bot.text_processor.sentence_model)
+                self.assertIn(bot.generate_ai_response('hello', 'en'), [
+                    "Sorry, I didn't understand your question. Could you rephrase it?",
+                    "I apologize, I'm not sure how to answer that question.",
+                    "Could you please clarify your question?",
+                ])
+        self.assertEqual(find_spec.call_count, 2)
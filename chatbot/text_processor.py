@@ -1,6 +1,8 @@
+import os
 import string
 import re
 import logging
+from importlib.util import find_spec
 from typing import List
 
 # Try to import optional dependencies
@@ -10,21 +12,44 @@ try:
 except ImportError:
     NUMPY_AVAILABLE = False
 
-try:
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-
-try:
-    from nltk.tokenize import word_tokenize
-    from nltk.corpus import stopwords
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
+# sklearn and nltk are slow to import, so they are imported on first use
+SKLEARN_AVAILABLE = find_spec('sklearn') is not None
+NLTK_AVAILABLE = find_spec('nltk') is not None
 
 logger = logging.getLogger(__name__)
 
+# The nltk module once imported and its data downloaded
+_nltk = None
+
+
+def load_nltk():
+    """Import NLTK and download the data it needs, once per process"""
+    global _nltk
+    if _nltk is not None or not NLTK_AVAILABLE:
+        return _nltk
+
+    try:
+        import nltk
+        import nltk.corpus
+        import nltk.tokenize
+    except ImportError as e:
+        logger.warning(f"NLTK could not be imported: {e}")
+        return None
+
+    try:
+        nltk_dir = os.path.expanduser("~/nltk_data")
+        if not os.path.exists(nltk_dir):
+            os.makedirs(nltk_dir)
+
+        # Download required NLTK data
+        nltk.download('punkt', quiet=True, download_dir=nltk_dir)
+        nltk.download('stopwords', quiet=True, download_dir=nltk_dir)
+        logger.info("NLTK data initialized successfully")
+    except Exception as e:
+        logger.warning(f"NLTK initialization failed: {e}")
+    _nltk = nltk
+    return _nltk
+
 
 class TextProcessor:
     """Handles text processing and semantic similarity calculations"""
@@ -36,7 +61,9 @@ class TextProcessor:
     def get_stopwords(self):
         """Get stopwords with fallback"""
         try:
-            if NLTK_AVAILABLE:
+            nltk = load_nltk()
+            if nltk:
+                stopwords = nltk.corpus.stopwords
                 english_stops = set(stopwords.words('english'))
                 try:
                     arabic_stops = set(stopwords.words('arabic'))
@@ -59,8 +86,9 @@ class TextProcessor:
     def tokenize_text(self, text: str) -> List[str]:
         """Tokenize text into words"""
         try:
-            if NLTK_AVAILABLE:
-                return word_tokenize(text.lower())
+            nltk = load_nltk()
+            if nltk:
+                return nltk.tokenize.word_tokenize(text.lower())
             else:
                 # Fallback tokenization
                 text = text.lower()
@@ -100,6 +128,8 @@ class TextProcessor:
             if not self.sentence_model or not SKLEARN_AVAILABLE:
                 return self.simple_similarity(text1, text2)
 
+            from sklearn.metrics.pairwise import cosine_similarity
+
             # Use sentence transformer for semantic similarity
             embeddings = self.sentence_model.encode([text1, text2])
             similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
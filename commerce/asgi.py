@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
 application = get_asgi_application()
+
+# Load the chatbot models in each worker before it serves requests
+if settings.CHATBOT_WARMUP:
+    from chatbot.ai_models import chat_models
+    chat_models.warmup()
@@ -88,6 +88,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent bids
+            # queue on the lock instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # The concurrent bidding tests (auctions.tests.ConcurrentBidTests) run
+        # several threads, each on its own connection, and need real SQLite
+        # file locking to serialize their writes. The shared-cache in-memory
+        # default test database does not provide it, so tests use a file
+        # (ignored by git) that is created and destroyed by each test run.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
@@ -135,6 +149,72 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Live auction events (Server-Sent Events)
+# Use 'auctions.events.DatabaseBroker' when running several ASGI workers
+AUCTION_EVENT_BROKER = os.environ.get('AUCTION_EVENT_BROKER', 'auctions.events.InProcessBroker')
+
+# Seconds a rendered page of auction comments is cached (auctions.comments)
+COMMENT_CACHE_TIMEOUT = int(os.environ.get('COMMENT_CACHE_TIMEOUT', 300))
+
+# Seconds a downsampled price history is cached (auctions.price_history)
+PRICE_HISTORY_CACHE_TIMEOUT = int(os.environ.get('PRICE_HISTORY_CACHE_TIMEOUT', 300))
+
+# Full-page cache of the public listing pages for anonymous visitors (see auctions.page_cache).
+# 'locmem' keeps pages per process (single worker only); 'file' shares them between
+# the workers of a host; any other value is used as a cache backend path.
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'locmem')
+PAGE_CACHE_LOCATION = os.environ.get('PAGE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'pages'))
+# Seconds a cached page is kept; 0 disables the page cache
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        }.get(PAGE_CACHE_BACKEND, PAGE_CACHE_BACKEND),
+        'LOCATION': 'pages' if PAGE_CACHE_BACKEND == 'locmem' else PAGE_CACHE_LOCATION,
+        'TIMEOUT': PAGE_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Seconds to cache each user's watched auction ids in the default cache (0 disables the cache).
+# Off by default while that cache is per process, as other workers would keep stale ids
+WATCHLIST_CACHE_TIMEOUT = int(os.environ.get(
+    'WATCHLIST_CACHE_TIMEOUT',
+    0 if CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache' else 300
+))
+
+# Embeddings of the chatbot knowledge base examples, written by populate_knowledge_base
+# and memory-mapped by every worker (see chatbot.kb_store)
+CHATBOT_EMBEDDINGS_DIR = os.environ.get('CHATBOT_EMBEDDINGS_DIR', os.path.join(BASE_DIR, 'cache', 'chatbot'))
+
+# Cache holding the version stamp of the chatbot's database knowledge base, which the
+# ChatbotKnowledgeBase signals and admin actions bump. It must be shared by every worker,
+# like the "pages" cache with PAGE_CACHE_BACKEND=file
+CHATBOT_KB_VERSION_CACHE = os.environ.get('CHATBOT_KB_VERSION_CACHE', 'pages')
+# Seconds a worker reuses the stamp it read before reading it again
+CHATBOT_KB_VERSION_TTL = float(os.environ.get('CHATBOT_KB_VERSION_TTL', 5))
+
+# Load the chatbot models (torch, transformers, NLTK data) when a worker starts
+# instead of on the first chat request that needs them
+CHATBOT_WARMUP = os.environ.get('CHATBOT_WARMUP', 'False') == 'True'
+
+# External Auction.image_url images are downloaded once and served locally
+REMOTE_IMAGE_TIMEOUT = float(os.environ.get('REMOTE_IMAGE_TIMEOUT', 10))
+REMOTE_IMAGE_MAX_BYTES = int(os.environ.get('REMOTE_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+REMOTE_IMAGE_RETRY_AFTER = int(os.environ.get('REMOTE_IMAGE_RETRY_AFTER', 3600))
+# Refuse origins on private/loopback addresses unless explicitly allowed
+REMOTE_IMAGE_ALLOW_PRIVATE = os.environ.get('REMOTE_IMAGE_ALLOW_PRIVATE', 'False') == 'True'
+
+# Cache lifetime of images served by the auction image view. The web server serving
+# MEDIA_URL must send it for the renditions under "derivatives/" (see auctions.images)
+IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE', 60 * 60 * 24 * 365))
+
 # Stripe Settings (Test Mode)
 STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
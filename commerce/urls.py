@@ -18,6 +18,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from auctions.views import serve_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("auctions.urls")),
@@ -30,4 +32,4 @@ urlpatterns = [
 
 # Add media files serving in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
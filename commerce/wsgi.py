@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
 application = get_wsgi_application()
+
+# Load the chatbot models in each worker before it serves requests
+if settings.CHATBOT_WARMUP:
+    from chatbot.ai_models import chat_models
+    chat_models.warmup()
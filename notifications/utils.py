@@ -91,13 +91,12 @@ def create_auction_ended_notification(auction):
         content_object=auction
     )
     
-    # Notify the winner if there are bids
-    highest_bid = auction.bids.order_by('-amount').first()
-    if highest_bid:
+    # Notify the winner if anyone outbid the owner's starting bid
+    if auction.leader_id and auction.leader_id != auction.user_id:
         create_notification(
-            user=highest_bid.user,
+            user=auction.leader,
             title="Auction Won",
-            message=f"Congratulations! You won the auction for '{auction.title}' with a bid of ${highest_bid.amount}.",
+            message=f"Congratulations! You won the auction for '{auction.title}' with a bid of ${auction.current_bid}.",
             notification_type='auction_won',
             level='success',
             link=f"/auction/{auction.id}",
@@ -105,6 +104,66 @@ def create_auction_ended_notification(auction):
         )
 
 
+def create_auction_ended_notifications(auctions):
+    """
+    Create auction ended notifications for many auctions at once.
+
+    Sends the same notifications as create_auction_ended_notification() but
+    loads preferences and inserts notifications in bulk, for batch closers.
+
+    Args:
+        auctions: Closed auctions (owner and leader are read by id only)
+
+    Returns:
+        The number of notifications created
+    """
+    if not auctions:
+        return 0
+
+    pending = []
+    for auction in auctions:
+        link = f"/auction/{auction.id}"
+        pending.append(Notification(
+            user_id=auction.user_id,
+            title="Your Auction Has Ended",
+            message=f"Your auction '{auction.title}' has ended.",
+            notification_type='auction_ended',
+            level='info',
+            link=link,
+            object_id=auction.id
+        ))
+        if auction.leader_id and auction.leader_id != auction.user_id:
+            pending.append(Notification(
+                user_id=auction.leader_id,
+                title="Auction Won",
+                message=f"Congratulations! You won the auction for '{auction.title}' with a bid of ${auction.current_bid}.",
+                notification_type='auction_won',
+                level='success',
+                link=link,
+                object_id=auction.id
+            ))
+
+    # Load every recipient's preferences in one query, creating missing ones
+    user_ids = {notification.user_id for notification in pending}
+    preferences = {
+        preference.user_id: preference
+        for preference in NotificationPreference.objects.filter(user_id__in=user_ids)
+    }
+    missing = [NotificationPreference(user_id=user_id) for user_id in user_ids - preferences.keys()]
+    for preference in NotificationPreference.objects.bulk_create(missing):
+        preferences[preference.user_id] = preference
+
+    content_type = ContentType.objects.get_for_model(auctions[0])
+    notifications = []
+    for notification in pending:
+        if preferences[notification.user_id].should_send_app_notification(notification.notification_type):
+            notification.content_type = content_type
+            notifications.append(notification)
+
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    return len(notifications)
+
+
 def create_comment_notification(comment):
     """Create a notification for a new comment."""
     auction = comment.auction
@@ -28,8 +28,7 @@ def payment_process(request, auction_id):
         return redirect('auction', auction_id=auction_id)
 
     # Check if the user is the winner
-    highest_bid = auction.bids.order_by('-amount').first()
-    if not highest_bid or highest_bid.user != request.user:
+    if auction.leader_id != request.user.id:
         messages.error(request, "Only the auction winner can make a payment.")
         return redirect('auction', auction_id=auction_id)
 
@@ -51,7 +50,7 @@ def payment_process(request, auction_id):
         payment = Payment.objects.create(
             user=request.user,
             auction=auction,
-            amount=highest_bid.amount,
+            amount=auction.current_bid,
             status='pending'
         )
 